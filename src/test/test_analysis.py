@@ -0,0 +1,168 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for the static analysis of delta functions, pruning and minimizing should never
+change what a machine does.
+'''
+import unittest
+import random
+from tm.turing_machine import *
+from test_compiled import all_strings
+
+
+class TestPrune(unittest.TestCase):
+
+    def test_machines(self):
+        for path in ("../tm/tm_files/m3", "../tm/tm_files/m4", "../tm/tm_files/m5"):
+            tm = TM()
+            tm.init(path)
+            expected = [tm.run(input, True) for input in all_strings('01', 7)]
+            tm.prune()
+            results = [tm.run(input, True) for input in all_strings('01', 7)]
+            self.assertEqual([(r, r.steps) for r in results],
+                             [(r, r.steps) for r in expected])
+        # m5 copies 0s to tape 2 and 1s to tape 3, and nothing else
+        report = tm.prune()
+        self.assertEqual((report.states, report.transitions), ([], []))
+        self.assertEqual(report.symbols, [[], [Symbol('1')], [Symbol('0')]])
+
+    def test_dead(self):
+        tm = TM(init_source="""
+        q0 0 q3 0 r
+        q0 1 q_reject 1 r
+        q3 1 q_accept 1 r
+        q3 .0 q4 0 r
+        q4 0 q3 0 r
+        q5 0 q0 0 r
+        q1 0 q3 0 r
+        """)
+        self.assertEqual(tm.get_states(), ['q0', 'q1', 'q2', 'q3', 'q4', 'q5'])
+        self.assertEqual([d.goto_state for d in tm.get_state_deltas('q3')], ['q1', 'q4'])
+        dead = [tm.delta_functions[i] for i in (3, 4, 5, 6)]
+        report = tm.prune()
+        # .0 is never written, q4 is only reached on it, q5 never, and the accept
+        # state takes no steps
+        self.assertEqual(report.transitions, dead)
+        self.assertEqual(report.states, ['q4', 'q5'])
+        self.assertEqual(len(tm.delta_functions), 3)
+        self.assertEqual(tm.get_states(), ['q0', 'q1', 'q2', 'q3'])
+        self.assertEqual(tm.get_state_deltas('q4'), [])
+        self.assertEqual(tm.run('01', True), 'accept')
+        # nothing more to prune
+        self.assertEqual(tm.prune().transitions, [])
+
+    def test_input_symbols(self):
+        source = "q0 0 q0 0 r\nq0 .0 q0 0 r\nq0 B q1 B s"
+        tm = TM(init_source=source)
+        self.assertEqual(len(tm.prune().transitions), 1)
+        tm = TM(init_source=source)
+        report = tm.prune([Symbol('0'), Symbol('0', '.')])
+        self.assertEqual(report.transitions, [])
+        self.assertEqual(tm.run([Symbol('0', '.'), Symbol('0')], True), 'accept')
+
+    def test_nondeterministic(self):
+        # both choices can be taken, so both are kept
+        tm = TM(init_source="q0 0 q0 0 r\nq0 0 q3 1 r\nq3 B q1 B s\nq0 B q2 B s")
+        self.assertEqual(tm.prune().transitions, [])
+        self.assertFalse(tm.is_deterministic())
+        self.assertEqual(tm.run_ntm('00'), 'accept')
+
+
+class TestMinimize(unittest.TestCase):
+
+    def check_same(self, tm, inputs, max_steps=None):
+        expected = [tm.run(input, True, max_steps=max_steps, keep_tapes=True)
+                    for input in inputs]
+        merged = tm.minimize()
+        results = [tm.run(input, True, max_steps=max_steps, keep_tapes=True)
+                    for input in inputs]
+        self.assertEqual([(r, r.steps, [str(t) for t in r.tapes]) for r in results],
+                         [(r, r.steps, [str(t) for t in r.tapes]) for r in expected])
+        return merged
+
+    def test_merge(self):
+        # even number of 0s, with q5 a copy of q3, and q4 and q6 copies of q0
+        tm = TM(init_source="""
+        q0 0 q3 0 r
+        q0 B q1 B s
+        q3 0 q4 0 r
+        q4 0 q5 0 r
+        q4 B q1 B s
+        q5 0 q6 0 r
+        q6 0 q3 0 r
+        q6 B q_accept B s
+        q3 1 q2 1 r
+        """)
+        merged = self.check_same(tm, list(all_strings('01', 8)))
+        self.assertEqual(merged, {'q4': 'q0', 'q5': 'q3', 'q6': 'q0'})
+        self.assertEqual(tm.get_states(), ['q0', 'q1', 'q2', 'q3'])
+        self.assertEqual(tm.minimize(), {})
+
+    def test_keeps_tapes(self):
+        # same moves, but different symbols written, or a different rejecting
+        # transition, are not merged
+        tm = TM(init_source="""
+        q0 0 q3 0 r
+        q0 1 q4 1 r
+        q3 0 q1 1 r
+        q4 0 q1 0 r
+        q0 B q5 B r
+        q5 0 q2 1 r
+        """)
+        self.assertEqual(self.check_same(tm, list(all_strings('01', 4))), {})
+        tm = TM(init_source="q0 0 q3 0 r\nq0 1 q4 1 r\nq3 0 q1 0 r\nq4 0 q1 0 r\nq4 1 q2 1 r")
+        self.assertEqual(self.check_same(tm, list(all_strings('01', 4))), {'q4': 'q3'})
+
+    def test_machines(self):
+        for path in ("../tm/tm_files/m3", "../tm/tm_files/m4", "../tm/tm_files/m5"):
+            tm = TM()
+            tm.init(path)
+            self.check_same(tm, list(all_strings('01', 6)))
+
+    def test_random(self):
+        rng = random.Random(24)
+        symbols = ['0', '1', 'B']
+        for _ in range(40):
+            lines = []
+            for state in range(3, 10):
+                for symbol in symbols:
+                    if rng.random() < 0.8:
+                        name = 'q0' if state == 3 else 'q%d' % state
+                        lines.append('%s %s q%d %s %s' % (name, symbol, rng.choice([1, 2] + range(4, 10)),
+                                                          rng.choice(symbols), rng.choice('lrs')))
+            tm = TM(init_source='\n'.join(lines))
+            self.check_same(tm, list(all_strings('01', 5)), max_steps=200)
+
+    def test_large(self):
+        # two copies of a chain of 5000 states that accepts 0^5000
+        lines = []
+        for copy in (0, 1):
+            for i in range(5000):
+                state = 3 + copy * 5000 + i
+                goto = 'q_accept' if i == 4999 else 'q%d' % (state + 1)
+                lines.append('q%d 0 %s 0 r' % (state, goto))
+        lines.append('q0 0 q4 0 r\nq0 1 q5004 0 r')
+        # not left in the user's cache directory
+        cache_dir, TM.CACHE_DIR = TM.CACHE_DIR, None
+        try:
+            tm = TM(init_source='\n'.join(lines))
+        finally:
+            TM.CACHE_DIR = cache_dir
+        merged = tm.minimize()
+        self.assertEqual(len(merged), 5000)
+        self.assertEqual(merged['q5004'], 'q4')
+        self.assertEqual(tm.run('0' * 5000, True), 'accept')
+        self.assertEqual(tm.run('1' + '0' * 4999, True), 'accept')
+
+    def test_nondeterministic(self):
+        tm = TM(init_source="q0 0 q0 0 r\nq0 0 q3 1 r")
+        self.assertRaises(TmException, tm.minimize)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for the compiled TM, results should always agree with TM.run().
+'''
+import unittest
+import itertools
+from tm.turing_machine import *
+
+
+def all_strings(alphabet, max_len):
+    """Generator of all strings over alphabet up to length max_len."""
+    for n in range(max_len + 1):
+        for chars in itertools.product(alphabet, repeat=n):
+            yield ''.join(chars)
+
+
+class TestCompiledTM(unittest.TestCase):
+
+    def check_machine(self, path, max_len):
+        tm = TM()
+        tm.init(path)
+        ctm = tm.compile()
+        for input in all_strings('01', max_len):
+            self.assertEqual(ctm.run(input), tm.run(input, True), input)
+
+    def test_m3(self):
+        self.check_machine("../tm/tm_files/m3", 8)
+
+    def test_m4(self):
+        self.check_machine("../tm/tm_files/m4", 8)
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        ctm = tm.compile()
+        self.assertEqual(ctm.run('0' * 100 + '1' * 100), 'accept')
+        self.assertEqual(ctm.run('0' * 100 + '1' * 99), 'reject')
+
+    def test_m5(self):
+        self.check_machine("../tm/tm_files/m5", 8)
+
+    def test_rle(self):
+        for path in ("../tm/tm_files/m3", "../tm/tm_files/m4"):
+            tm = TM()
+            tm.init(path)
+            ctm = tm.compile()
+            for input in all_strings('01', 8):
+                result = ctm.run(input)
+                steps = ctm.steps
+                self.assertEqual(ctm.run(input, rle=True), result, input)
+                self.assertEqual(ctm.steps, steps, input)
+        n = 10000
+        self.assertEqual(ctm.run('0' * n + '1' * n, rle=True), 'accept')
+        self.assertEqual(ctm.steps, 2 * n * n + 3 * n + 1)
+
+    def test_rle_never_halts(self):
+        tm = TM(init_source="q0 0 q0 0 r\nq0 1 q0 1 r\nq0 B q0 B r")
+        self.assertRaises(TmException, tm.compile().run, '0110', True)
+        tm = TM(init_source="q0 0 q0 0 s")
+        self.assertRaises(TmException, tm.compile().run, '0', True)
+
+    def test_bad_input(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m3")
+        self.assertRaises(TmException, tm.compile().run, '012')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for TM.enumerate_language(), which should give the same results as running
+each input on its own.
+'''
+import unittest
+import random
+import StringIO
+import sys
+from tm.turing_machine import *
+from tm.paged import PagedTape
+from test_compiled import all_strings
+
+
+class TestEnumerateLanguage(unittest.TestCase):
+
+    def check_same(self, tm, n, max_steps=None, tape_class=None):
+        results = list(tm.enumerate_language(n, '01', max_steps, tape_class, True))
+        self.assertEqual(sorted([input for input, _ in results]), sorted(all_strings('01', n)))
+        for input, result in results:
+            expected = tm.run(input, True, max_steps=max_steps, keep_tapes=True)
+            self.assertEqual((result, result.steps, result.tape_cells, result.tape_extents,
+                              result.limit),
+                             (expected, expected.steps, expected.tape_cells,
+                              expected.tape_extents, expected.limit), input)
+            if result.tapes is not None:
+                self.assertEqual([str(t) for t in result.tapes],
+                                 [str(t) for t in expected.tapes])
+        return results
+
+    def test_machines(self):
+        for name in ('m1', 'm2', 'm3', 'm4', 'm5'):
+            tm = TM()
+            tm.init("../tm/tm_files/" + name)
+            self.check_same(tm, 7)
+        self.check_same(tm, 5, tape_class=PagedTape)
+
+    def test_shared(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m1")
+        results = self.check_same(tm, 3)
+        self.assertEqual([input for input, _ in results],
+                         ['', '0', '00', '000', '001', '01', '010', '011',
+                          '1', '10', '100', '101', '11', '110', '111'])
+        # one step decides each input, and the inputs starting with 0 or 1 share it
+        stats = tm.enable_stats()
+        list(tm.enumerate_language(10, '01'))
+        self.assertEqual(stats.get_steps(), 3)
+        self.assertEqual([r.tapes is None for _, r in results[:3]], [False, False, True])
+        self.assertEqual(str(results[1][1].tapes[0]),
+                         str(tm.run('0', True, keep_tapes=True).tapes[0]))
+
+    def test_symbols(self):
+        source = "q0 .0 q0 .0 r\nq0 0 q0 0 r\nq0 B q1 B s"
+        tm = TM(init_source=source)
+        symbols = [Symbol('0', '.'), Symbol('0')]
+        # .0 has to be in the tape alphabet to be written as input
+        self.assertRaises(TmException, list, tm.enumerate_language(2, symbols))
+        tm = TM(init_source='tape_alphabets = [[("B"), ("0"), ("0", ".")]]\n' + source)
+        results = list(tm.enumerate_language(2, symbols))
+        self.assertEqual(results[2][0], [Symbol('0', '.'), Symbol('0', '.')])
+        self.assertEqual([r for _, r in results], ['accept'] * 7)
+
+    def test_limits(self):
+        # loops on inputs with a 1 at an even position, after reading to the end
+        tm = TM(init_source="""
+        q0 0 q3 0 r
+        q0 1 q4 1 r
+        q3 0 q0 0 r
+        q3 1 q0 1 r
+        q4 B q4 B s
+        q4 0 q4 0 r
+        q4 1 q4 1 r
+        q0 B q1 B s
+        q3 B q2 B s
+        """)
+        results = dict(self.check_same(tm, 6, max_steps=4))
+        self.assertEqual((results['1'], results['1'].steps), ('limit', 4))
+        self.check_same(tm, 6, max_steps=20)
+        self.check_same(tm, 3, max_steps=0)
+
+    def test_random(self):
+        rng = random.Random(25)
+        symbols = ['0', '1', 'B']
+        for _ in range(30):
+            lines = []
+            for state in range(3, 8):
+                for symbol in symbols:
+                    if rng.random() < 0.8:
+                        name = 'q0' if state == 3 else 'q%d' % state
+                        lines.append('%s %s q%d %s %s' % (name, symbol,
+                                                          rng.choice([1, 2] + range(4, 8)),
+                                                          rng.choice(symbols),
+                                                          rng.choice('lrs')))
+            tm = TM(init_source='\n'.join(lines))
+            self.check_same(tm, 5, max_steps=50)
+
+    def test_main_language(self):
+        stdout, sys.stdout = sys.stdout, StringIO.StringIO()
+        try:
+            main(['prog', '-f', '../tm/tm_files/m3', '-l', '2'])
+            lines = sys.stdout.getvalue().splitlines()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual([line.split('\t')[:2] for line in lines],
+                         [['', 'reject'], ['0', 'reject'], ['00', 'reject'], ['01', 'accept'],
+                          ['1', 'accept'], ['10', 'reject'], ['11', 'accept']])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for nondeterministic runs of a TM.
+'''
+import unittest
+import random
+from tm.turing_machine import *
+from test_compiled import all_strings
+
+# { w | w contains 11 }, guessing where the 11 starts
+contains_11 = """q0 0 q0 0 r
+q0 1 q3 1 r
+q0 1 q0 1 r
+q3 1 q1 1 r"""
+
+
+class TestNtm(unittest.TestCase):
+
+    def test_nondeterministic(self):
+        tm = TM(init_source=contains_11)
+        self.assertFalse(tm.is_deterministic())
+        self.assertEqual(len(tm.get_transitions('q0', [Symbol('1')])), 2)
+        for input in all_strings('01', 8):
+            result = tm.run_ntm(input)
+            self.assertEqual(result, 'accept' if '11' in input else 'reject', input)
+            if result == 'accept':
+                self.assertEqual(result.steps, input.index('11') + 2)
+        # the deterministic run only follows the last transition
+        self.assertEqual(tm.run('0110', True), 'reject')
+        result = tm.run_ntm('0101011', workers=2)
+        self.assertEqual((result, result.steps), ('accept', 7))
+        self.assertEqual([d.frontier for d in result.depths], [1, 2, 1, 2, 1, 2, 0])
+
+    def test_deterministic(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m5")
+        self.assertTrue(tm.is_deterministic())
+        for input in all_strings('01', 7):
+            expected = tm.run(input, True)
+            result = tm.run_ntm(input)
+            self.assertEqual((result, result.steps), (expected, expected.steps), input)
+
+    def test_left_of_input(self):
+        # heads at -1 and -2 must not be taken as the same, though hash(-1) == hash(-2)
+        tm = TM(init_source="q0 0 q3 0 l\nq3 B q4 1 r\nq4 0 q0 0 l\nq0 1 q0 1 l\n"
+                "q0 B q1 B r")
+        result = tm.run_ntm('0')
+        self.assertEqual((result, result.steps), ('accept', 5))
+        self.assertEqual(result.depths[-1].hit_rate, 0.0)
+        # deterministic machines that halt give the same results as run()
+        rng = random.Random(15)
+        symbols = ['0', '1', 'B']
+        for _ in range(100):
+            lines = []
+            for state in range(3, 7):
+                for symbol in symbols:
+                    name = 'q0' if state == 3 else 'q%d' % state
+                    lines.append('%s %s q%d %s %s' % (name, symbol,
+                                                      rng.choice([1, 2] + range(4, 7)),
+                                                      rng.choice(symbols), rng.choice('lr')))
+            tm = TM(init_source='\n'.join(lines))
+            for input in all_strings('01', 3):
+                expected = tm.run(input, True, max_steps=50)
+                if expected != 'limit':
+                    result = tm.run_ntm(input, max_steps=60)
+                    self.assertEqual((result, result.steps), (expected, expected.steps))
+
+    def test_limits(self):
+        # all branches repeat configurations
+        tm = TM(init_source="q0 0 q0 0 r\nq0 B q3 B l\nq3 0 q3 0 l\nq3 B q0 B r")
+        result = tm.run_ntm('00')
+        self.assertEqual(result, 'reject')
+        self.assertEqual(result.depths[-1].hit_rate, 1.0)
+        # number of branches doubles every step
+        tm = TM(init_source="q0 0 q0 0 r\nq0 0 q0 1 r\nq0 B q0 B r")
+        result = tm.run_ntm('0' * 20, max_frontier=100)
+        self.assertEqual((result, result.limit, result.steps), ('limit', 'max_frontier', 7))
+        result = tm.run_ntm('0' * 20, max_steps=5)
+        self.assertEqual((result, result.limit, result.depths[-1].frontier),
+                         ('limit', 'max_steps', 32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for bit-packed tapes, runs should always agree with plain tapes.
+'''
+import unittest
+from tm.turing_machine import *
+from tm.packed import PackedTape
+
+
+class TestPackedTape(unittest.TestCase):
+
+    def test_runs(self):
+        for machine, input in (("../tm/tm_files/m4", '0' * 50 + '1' * 50), 
+                               ("../tm/tm_files/m5", '0' * 40 + '1' * 40 + '0' * 40),
+                               ("../tm/tm_files/m5", '0110')):
+            tm = TM()
+            tm.init(machine)
+            plain = Execution(tm, input)
+            packed = Execution(tm, input, tape_class=PackedTape)
+            expected = plain.run(True)
+            result = tm.run(input, True, tape_class=PackedTape)
+            packed.run(True)
+            self.assertEqual((result, result.steps, result.tape_cells), 
+                             (expected, expected.steps, expected.tape_cells))
+            self.assertEqual([t.get_configuration() for t in packed.tapes], 
+                             [t.get_configuration() for t in plain.tapes])
+            self.assertEqual(packed.get_str_state(), plain.get_str_state())
+        # fingerprints for loop detection
+        tm = TM(init_source="q0 0 q0 0 r\nq0 B q3 B l\nq3 0 q3 0 l\nq3 B q0 B r")
+        result = Execution(tm, '0' * 30, tape_class=PackedTape).run(True, detect_loops=True)
+        self.assertEqual((result, result.cycle_period), ('loop', 62))
+
+    def test_packing(self):
+        blank = Symbol('B')
+        tape = PackedTape([blank, Symbol('0'), Symbol('1')], blank)
+        tape.init_input([Symbol('0')] * 4000)
+        # 2 bits per cell, with headroom of half the input on each end
+        self.assertEqual(tape.get_num_bytes(), 8000 // 4 + 1)
+        # write across the whole tape and off the left end
+        for i in range(4000):
+            tape.do(Symbol('0'), Symbol('1'), Tape.RIGHT)
+        for i in range(4100):
+            tape.do(tape.current_symbol(), tape.current_symbol(), Tape.LEFT)
+        tape.do(blank, Symbol('0'), Tape.STAY)
+        self.assertEqual(tape.get_position(), -100)
+        self.assertEqual(tape.get_configuration(), 
+                         (-100, -100, tuple([Symbol('0')] + [blank] * 99 + [Symbol('1')] * 4000)))
+        fork = tape.fork()
+        fork.do(Symbol('0'), Symbol('1'), Tape.STAY)
+        self.assertEqual(tape.current_symbol(), Symbol('0'))
+        # new alphabet with more symbols, contents are kept
+        tape.alphabet = [blank] + [Symbol(c) for c in '0123456789']
+        self.assertEqual(tape.get_position(), -100)
+        self.assertEqual(tape.current_symbol(), Symbol('0'))
+        self.assertEqual(tape.get_configuration()[2][-1], Symbol('1'))
+        tape.do(Symbol('0'), Symbol('9'), Tape.STAY)
+        self.assertEqual(tape.current_symbol(), Symbol('9'))
+        self.assertRaises(TmException, tape.init_input, [Symbol('x')])
+
+
+if __name__ == "__main__":
+    unittest.main()
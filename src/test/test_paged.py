@@ -0,0 +1,92 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for copy-on-write paged tapes, runs should always agree with plain tapes.
+'''
+import unittest
+import random
+from tm.turing_machine import *
+from tm.paged import PagedTape
+
+
+def configuration(execution):
+    return (execution.state, execution.step_count, 
+            [t.get_configuration() for t in execution.tapes], 
+            [t.contents for t in execution.tapes], [t.head_pos for t in execution.tapes])
+
+
+class TestPagedTape(unittest.TestCase):
+
+    def test_runs(self):
+        for machine, input in (("../tm/tm_files/m4", '0' * 200 + '1' * 200), 
+                               ("../tm/tm_files/m5", '0' * 150 + '1' * 150 + '0' * 150),
+                               ("../tm/tm_files/m5", '')):
+            tm = TM()
+            tm.init(machine)
+            plain = Execution(tm, input)
+            paged = Execution(tm, input, tape_class=PagedTape)
+            self.assertTrue(isinstance(paged.tapes[0], PagedTape))
+            expected = plain.run(True)
+            result = paged.run(True)
+            self.assertEqual((result, result.steps, result.tape_cells), 
+                             (expected, expected.steps, expected.tape_cells))
+            self.assertEqual(configuration(paged), configuration(plain))
+        tm = TM(init_source="q0 0 q0 0 r\nq0 B q3 B l\nq3 0 q3 0 l\nq3 B q0 B r")
+        result = Execution(tm, '0' * 300, tape_class=PagedTape).run(True, detect_loops=True)
+        self.assertEqual((result, result.cycle_period), ('loop', 602))
+
+    def test_fork(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m5")
+        input = '0' * 300 + '1' * 300 + '0' * 300
+        paged = Execution(tm, input, tape_class=PagedTape)
+        plain = Execution(tm, input)
+        rng = random.Random(1)
+        forks = []
+        for _ in range(50):
+            n = rng.randint(1, 5000)
+            paged.advance(n)
+            plain.advance(n)
+            forks.append((paged.fork(), plain.fork()))
+        for paged_fork, plain_fork in forks:
+            self.assertEqual(configuration(paged_fork), configuration(plain_fork))
+            paged_fork.advance(3000)
+            plain_fork.advance(3000)
+            self.assertEqual(configuration(paged_fork), configuration(plain_fork))
+        self.assertEqual(configuration(paged), configuration(plain))
+
+    def test_pages_shared(self):
+        alphabet = [Symbol('B'), Symbol('0'), Symbol('1')]
+        tape = PagedTape(alphabet, Symbol('B'))
+        tape.init_input([Symbol('0')] * (10 * PagedTape.PAGE_SIZE))
+        self.assertEqual(tape.get_num_pages(), 10)
+        fork = tape.fork()
+        self.assertEqual((tape.get_num_pages(), fork.get_num_pages()), (0, 0))
+        # a write copies only its page, and the other tape doesn't see it
+        fork.do(Symbol('0'), Symbol('1'), Tape.RIGHT)
+        fork.do(Symbol('0'), Symbol('1'), Tape.LEFT)
+        self.assertEqual((tape.get_num_pages(), fork.get_num_pages()), (0, 1))
+        self.assertEqual(fork.contents[:3], [Symbol('1'), Symbol('1'), Symbol('0')])
+        self.assertEqual(tape.contents[:3], [Symbol('0')] * 3)
+        self.assertEqual(fork.current_symbol(), Symbol('1'))
+        self.assertEqual(tape.current_symbol(), Symbol('0'))
+        # long chains of forks
+        for i in range(3 * PagedTape.MAX_DEPTH):
+            tape.do(tape.current_symbol(), Symbol('1'), Tape.RIGHT)
+            tape = tape.fork()
+        self.assertEqual(tape.contents[:3 * PagedTape.MAX_DEPTH + 1], 
+                         [Symbol('1')] * 3 * PagedTape.MAX_DEPTH + [Symbol('0')])
+        # plain tapes fork by copying
+        plain = Tape(alphabet, Symbol('B'), [Symbol('0')] * 3)
+        plain_fork = plain.fork()
+        plain_fork.do(Symbol('0'), Symbol('1'), Tape.RIGHT)
+        self.assertEqual(plain.contents, [Symbol('0')] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for the step counters of TM.enable_stats().
+'''
+import unittest
+import StringIO
+import csv
+import os
+import sys
+import tempfile
+from tm.turing_machine import *
+from tm.stats import TmStats
+from test_compiled import all_strings
+
+
+class TestTmStats(unittest.TestCase):
+
+    def setUp(self):
+        self.tm = TM()
+        self.tm.init("../tm/tm_files/m4")
+
+    def test_counts(self):
+        tm = self.tm
+        self.assertEqual(tm.stats, None)
+        stats = tm.enable_stats()
+        result = tm.run('000111', True)
+        self.assertEqual(stats.get_steps(), result.steps)
+        self.assertEqual(sum(stats.transitions.values()), result.steps)
+        self.assertEqual(stats.get_reject_count(), 0)
+        self.assertEqual(stats.states['q0'], 1)
+        count, label = stats.top_transitions(1)[0]
+        self.assertEqual(count, max(stats.transitions.values()))
+        self.assertTrue(label in [str(d) for d in tm.delta_functions])
+        # m4 has no transition from q0 on 1
+        stats.clear()
+        self.assertEqual(tm.run('10', True), 'reject')
+        self.assertEqual((stats.get_steps(), stats.get_reject_count()), (1, 1))
+        self.assertEqual(stats.rejects, {('q0', ('1',)): 1})
+        # stopped counting
+        tm.stats = None
+        tm.run('000111', True)
+        self.assertEqual(stats.get_steps(), 1)
+
+    def test_merge(self):
+        inputs = list(all_strings('01', 6))
+        tm = self.tm
+        stats = tm.enable_stats()
+        results = list(tm.run_many(inputs, workers=1))
+        self.assertEqual(stats.get_steps(), sum([r.steps for r in results]))
+        # workers' counters are merged back, and what the caller had counted before
+        # isn't counted again in them
+        tm.run('000111', True)
+        before = stats.get_steps()
+        list(tm.run_many(inputs, workers=2))
+        self.assertEqual(stats.get_steps(), before + sum([r.steps for r in results]))
+        serial = TmStats(tm)
+        tm.stats = serial
+        for input in inputs:
+            tm.run(input, True)
+        parallel = tm.enable_stats()
+        list(tm.run_many(inputs, workers=2))
+        self.assertEqual((parallel.transitions, parallel.states, parallel.rejects),
+                         (serial.transitions, serial.states, serial.rejects))
+        total = TmStats(tm)
+        total.merge(serial)
+        total.merge(parallel)
+        self.assertEqual(total.get_steps(), 2 * serial.get_steps())
+        other = TM(init_source="q0 0 q1 0 r")
+        self.assertRaises(TmException, total.merge, TmStats(other))
+
+    def test_export(self):
+        tm = self.tm
+        stats = tm.enable_stats()
+        for input in ['000111', '0011', '10', '']:
+            tm.run(input, True)
+        loaded = TmStats.from_json(stats.to_json())
+        self.assertEqual((loaded.labels, loaded.transitions, loaded.states, loaded.rejects),
+                         (stats.labels, stats.transitions, stats.states, stats.rejects))
+        out = StringIO.StringIO()
+        stats.write_csv(out)
+        rows = list(csv.reader(StringIO.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['kind', 'state', 'index', 'transition', 'count'])
+        counts = {}
+        for kind, state, index, transition, count in rows[1:]:
+            counts[kind] = counts.get(kind, 0) + int(count)
+        self.assertEqual(counts, {'transition': sum(stats.transitions.values()),
+                                  'reject': stats.get_reject_count(),
+                                  'state': stats.get_steps()})
+        self.assertEqual(rows[1][1:4], [stats.label_states[int(rows[1][2])], rows[1][2],
+                                        stats.labels[int(rows[1][2])]])
+
+    def test_main_stats(self):
+        fd, path = tempfile.mkstemp('.csv')
+        os.close(fd)
+        stdout, sys.stdout = sys.stdout, StringIO.StringIO()
+        try:
+            main(['prog', '-f', '../tm/tm_files/m4', '-r', '000111', '--stats', path])
+            rows = list(csv.reader(open(path)))
+        finally:
+            sys.stdout = stdout
+            os.remove(path)
+        self.assertEqual(sum([int(r[4]) for r in rows if r[0] == 'state']), 28)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for binary execution traces.
+'''
+import unittest
+import os
+import tempfile
+from tm.turing_machine import *
+from tm.trace import record_trace, TraceReader, REJECT_TRANSITION
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def configuration(self, tm):
+        return (tm.state, [(t.get_position(), t.get_position() - t.head_pos, t.contents) 
+                           for t in tm.tapes])
+
+    def check_trace(self, path, input):
+        """Compare every step and configuration in trace with running machine."""
+        tm = TM()
+        tm.init(path)
+        steps = record_trace(tm, input, self.path, keyframe_interval=7)
+        reader = TraceReader(self.path)
+        self.assertEqual(reader.num_steps, steps)
+        self.assertEqual(len(reader.index), steps // 7 + 1)
+        tm.reset(input)
+        self.assertEqual(reader.configuration(0), self.configuration(tm))
+        for n in range(1, steps + 1):
+            delta = tm.step()
+            transition, written, moves = reader.step(n)
+            if delta in tm.delta_functions:
+                self.assertEqual(tm.delta_functions[transition], delta)
+            else:
+                self.assertEqual(transition, REJECT_TRANSITION)
+            self.assertEqual([reader.symbols[c] for c in written], delta.outputs)
+            self.assertEqual(list(moves), delta.directions)
+            self.assertEqual(reader.configuration(n), self.configuration(tm))
+        self.assertTrue(tm.is_halted())
+        self.assertRaises(TmException, reader.configuration, steps + 1)
+        self.assertRaises(TmException, reader.configuration, -1)
+        # steps start at 1
+        for n in (0, -1, steps + 1):
+            try:
+                reader.step(n)
+                self.fail("no TmException for step %d" % n)
+            except TmException, e:
+                self.assertTrue(("no step %d," % n) in str(e), str(e))
+        reader.close()
+
+    def test_m4(self):
+        self.check_trace("../tm/tm_files/m4", '0' * 10 + '1' * 10)
+
+    def test_m5(self):
+        self.check_trace("../tm/tm_files/m5", '0001110000')
+
+    def test_max_steps(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        self.assertEqual(record_trace(tm, '000111', self.path, max_steps=5), 5)
+        reader = TraceReader(self.path)
+        self.assertEqual(reader.num_steps, 5)
+        state, tapes = reader.configuration(5)
+        self.assertEqual(state, 'q3')
+        self.assertEqual(tapes[0][0], 5)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,15 @@ Created on Oct 23, 2010
 @author: drogers
 '''
 import unittest
+import StringIO
+import sys
+import os
+import tempfile
+import threading
+import mmap
+import shutil
+import marshal
+import array
 from tm.turing_machine import *
 
 
@@ -134,6 +143,10 @@ class TestTMParts(unittest.TestCase):
         self.tapes[0].head_pos = 4
         expected = ['     . . .  ', ' 0 1 0 0>1 B', '     ^   ^ ^']
         self.assertEqual(self.tapes[0].get_string_contents('>'), expected)
+        # window
+        expected = [' . . .', ' 0 0>1', ' ^   ^']
+        self.assertEqual(self.tapes[0].get_string_contents('>', 2, 5), expected)
+        self.assertEqual(self.tapes[0].get_string_contents('>', 3, 6)[1], ' 0>1 B')
         
 #        print "contents:" 
 #        for s in self.tape.contents:
@@ -145,6 +158,25 @@ class TestTMParts(unittest.TestCase):
 #            print line
         
 
+    def test_tape_growth(self):
+        tape = Tape()
+        tape.init_input([Symbol('0')])
+        for _ in range(1000):
+            tape.do(tape.current_symbol(), Symbol('1'), Tape.LEFT)
+        self.assertEqual(tape.head_pos, 0)
+        self.assertEqual(len(tape.contents), 1001)
+        self.assertEqual(tape.contents[0], Symbol('B'))
+        self.assertEqual(tape.contents[-1], Symbol('1'))
+        for _ in range(1001):
+            tape.do(tape.current_symbol(), Symbol('0'), Tape.RIGHT)
+        self.assertEqual(tape.head_pos, 1001)
+        self.assertEqual(tape.current_symbol(), Symbol('B'))
+        self.assertEqual(tape.contents, [Symbol('0')] * 1001 + [Symbol('B')])
+        tape.do(Symbol('B'), Symbol('1'), Tape.LEFT)
+        tape.head_pos = 0
+        self.assertEqual(tape.get_string_contents('>'), 
+                         ['>' + ' '.join(['0'] * 1001) + ' 1'])
+
     def test_delta_funcs(self):
         s = "q0  0    q3 .0 r"
         d1 = DeltaFunc(self.tm)
@@ -194,6 +226,165 @@ q3  .1    q7 B s
         expected = [Symbol(*s) for s in tape_alpha]
         self.assertEqual(self.tm.tapes[0].alphabet, expected)
 
+    def test_init_errors(self):
+        def error_line(source):
+            try:
+                TM(init_source=source)
+            except TmParseError, e:
+                return e.lineno
+            self.fail("no TmParseError: %s" % source)
+        # nothing is executed
+        self.assertEqual(error_line('description = __import__("os").getcwd()\nq0 0 q1 0 r'), 1)
+        self.assertEqual(error_line('# comment\nfoo = 1\nq0 0 q1 0 r'), 2)
+        self.assertEqual(error_line('num_tapes = "2"'), 1)
+        self.assertEqual(error_line('alphabet = [(\'0\'), (\'1\')\n\nq0 0 q1 0 r'), 1)
+        self.assertEqual(error_line('num_tapes = 2\ntape_alphabets = [\n[(\'B\')]\n]'), 2)
+        self.assertEqual(error_line('q0 0 q1 0 r\n\nq0 1 q1 1'), 3)
+        self.assertEqual(error_line('q0 0 q1 0 r\nq0 1 q1 1 up'), 2)
+        self.assertEqual(error_line('q0 0 q1 0 r\nq0 1 x1 1 r'), 2)
+        self.assertEqual(error_line('q0 0 q1 0 r\nq0 1 q1 0xyz r'), 2)
+        # fields after the directions are ignored, as a trailing comment or otherwise
+        tm = TM(init_source='q0 0 q1 0 r  # 0 -> accept\nq0 1 q2 # s extra\nq0 B q2 B s s')
+        self.assertEqual([str(d) for d in tm.delta_functions],
+                         [str(d) for d in TM(init_source='q0 0 q1 0 r\nq0 1 q2 # s\n'
+                                             'q0 B q2 B s').delta_functions])
+        self.assertEqual(tm.run('0'), 'accept')
+        # values over several lines, with comments and trailing commas
+        tm = TM(init_source="""
+        num_tapes = 2   # two
+        blank_symbol = Symbol('_')
+        tape_alphabets = [
+        # input tape
+        [('_'), ('0'), ('0', '.'),],
+        [('_'), Symbol('1', None, '*')]
+        ]
+        q0 0 _ q_accept .0 1* r s
+        """)
+        self.assertEqual(tm.num_tapes, 2)
+        self.assertEqual([t.blank for t in tm.tapes], [Symbol('_')] * 2)
+        self.assertEqual(tm.tapes[1].alphabet, [Symbol('_'), Symbol('1', None, '*')])
+        d = tm.delta_functions[0]
+        self.assertEqual((d.goto_state, d.outputs, d.directions),
+                         (tm.accept_state, [Symbol('0', '.'), Symbol('1', None, '*')],
+                          [Tape.RIGHT, Tape.STAY]))
+
+    def test_init_large(self):
+        # 10000 states, 30000 delta functions
+        lines = ['description = "big"']
+        for i in range(3, 10003):
+            lines.append('q%d 0 q%d 1 r\nq%d 1 q%d 0 l\nq%d B q_accept B s'
+                         % (i, i + 1, i, i + 1, i))
+        lines[1] = lines[1].replace('q3', 'q0', 3)
+        cache_dir, TM.CACHE_DIR = TM.CACHE_DIR, None
+        try:
+            tm = TM(init_source='\n'.join(lines))
+        finally:
+            TM.CACHE_DIR = cache_dir
+        self.assertEqual(len(tm.delta_functions), 30000)
+        self.assertEqual(tm.run('0101', True), 'accept')
+
+    def test_init_view_settings(self):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, 'view_cells = 5\nhead_pos_indicator = "^"\nq0 0 q0 0 r\nq0 B q1 B s\n')
+        os.close(fd)
+        try:
+            tm = TM(init_source=path)
+        finally:
+            os.remove(path)
+        # not set back to the defaults
+        self.assertEqual((tm.view_cells, tm.head_pos_indicator), (5, '^'))
+        self.assertEqual((TM().view_cells, TM().head_pos_indicator), (36, '>'))
+        execution = Execution(tm, '0' * 20)
+        execution.advance(10)
+        # a window of 5 cells, with the head marked by ^
+        self.assertEqual(''.join(execution.get_str_state()[0].split()[1:]), '00^000')
+
+    def test_init_cache(self):
+        lines = ['description = "cached"', 'num_tapes = 2', 'blank_symbol = Symbol("_")',
+                 'view_cells = 12',
+                 "tape_alphabets = [[('_'), ('0'), ('0', '.')], [('_'), ('1')]]"]
+        for i in range(3, 1003):
+            lines.append('q%d 0 _ q%d .0 1 r r\nq%d _ _ q_accept _ _ s l' % (i, i + 1, i))
+        lines[5] = lines[5].replace('q3', 'q0', 2)
+        source = '\n'.join(lines)
+        cache_dir, TM.CACHE_DIR = TM.CACHE_DIR, tempfile.mkdtemp()
+        parse_deltas = TM._parse_deltas
+        try:
+            tm = TM(init_source=source)
+            path = TM().get_cache_path(source)
+            self.assertTrue(os.path.isfile(path))
+            # loaded from the cache, without parsing
+            def fail(*args):
+                self.fail("parsed")
+            TM._parse_deltas = fail
+            cached = TM(init_source=source)
+            TM._parse_deltas = parse_deltas
+            for attr in ('description', 'num_tapes', 'blank_symbol', 'accept_state',
+                         'view_cells'):
+                self.assertEqual(getattr(cached, attr), getattr(tm, attr))
+            self.assertEqual([t.alphabet for t in cached.tapes], [t.alphabet for t in tm.tapes])
+            self.assertEqual([t.blank for t in cached.tapes], [Symbol('_')] * 2)
+            self.assertEqual(cached.view_cells, 12)
+            self.assertEqual([str(d) for d in cached.delta_functions], 
+                             [str(d) for d in tm.delta_functions])
+            result = cached.run('000', True)
+            self.assertEqual((result, result.steps), ('accept', 4))
+            # a damaged cache file is parsed again, and replaced
+            open(path, 'wb').write('garbage')
+            self.assertEqual(len(TM(init_source=source).delta_functions), 2000)
+            self.assertNotEqual(open(path, 'rb').read(), 'garbage')
+            # and so is one that unmarshals but doesn't fit together
+            good = open(path, 'rb').read()
+            data = marshal.loads(good)
+            far = array.array('I', [10 ** 6] * data[4]).tostring()
+            damaged = [good[:len(good) // 2],
+                       data[:4] + (data[4] + 1,) + data[5:],
+                       data[:6] + (far,) + data[7:],
+                       data[:3] + (data[3][:-1],) + data[4:],
+                       data[:3] + ([('0', None, None, 'x')] + data[3][1:],) + data[4:],
+                       data[:9] + (array.array('b', [5] * len(data[9])).tostring(),),
+                       (data[0], data[1] + [('num_tapes', 3)]) + data[2:],
+                       (data[0], [('num_tapes', 'two')] + data[1]) + data[2:]]
+            for i, bad in enumerate(damaged):
+                if not isinstance(bad, str):
+                    bad = marshal.dumps(bad)
+                open(path, 'wb').write(bad)
+                # nothing is changed by a failed load
+                plain = TM()
+                self.assertFalse(plain._load_cache(path), i)
+                self.assertEqual((plain.num_tapes, len(plain.tapes), plain.description,
+                                  plain.tapes[0].blank), (1, 1, '', Symbol('B')))
+                self.assertEqual(plain.tapes, plain.execution.tapes)
+                reparsed = TM(init_source=source)
+                self.assertEqual([str(d) for d in reparsed.delta_functions], 
+                                 [str(d) for d in tm.delta_functions])
+                self.assertEqual(reparsed.run('000', True), 'accept')
+                self.assertEqual(open(path, 'rb').read(), good)
+            # a changed source isn't read from the old file
+            changed = TM(init_source=source.replace('"cached"', '"changed"'))
+            self.assertEqual(changed.description, 'changed')
+            self.assertEqual(len(os.listdir(TM.CACHE_DIR)), 2)
+            # too short to cache
+            TM(init_source="q0 0 q1 0 r")
+            self.assertEqual(len(os.listdir(TM.CACHE_DIR)), 2)
+        finally:
+            TM._parse_deltas = parse_deltas
+            shutil.rmtree(TM.CACHE_DIR)
+            TM.CACHE_DIR = cache_dir
+
+    def test_delta_index(self):
+        self.assertEqual(hash(Symbol('0', '.')), hash(Symbol('0', '.')))
+        self.tm.load_delta_functions("q0  0    q3 .0 r\nq3  .1    q7 B s")
+        self.tm.state = 'q3'
+        d = self.tm.get_delta_func([Symbol('1', '.')])
+        self.assertEqual(d.goto_state, 'q7')
+        self.assertEqual(d.outputs, [Symbol('B')])
+        # no transition, so rejecting transition generated once and cached
+        d1 = self.tm.get_delta_func([Symbol('0')])
+        self.assertEqual(d1.goto_state, self.tm.reject_state)
+        self.assertEqual(d1.directions, [Tape.RIGHT])
+        self.assertTrue(d1 is self.tm.get_delta_func([Symbol('0')]))
+
 
 class TestTMs(unittest.TestCase):
 
@@ -236,6 +427,324 @@ class TestTMs(unittest.TestCase):
         expected = "reject"
         self.assertEqual(result, expected)
 
+    def test_detect_loops(self):
+        tm = TM(init_source="q0 0 q3 0 r\nq3 B q4 B l\nq4 0 q3 0 r")
+        result = tm.run('0', True, detect_loops=True)
+        self.assertEqual(result, 'loop')
+        self.assertEqual((result.cycle_start, result.cycle_period), (1, 2))
+        # marks tape before looping
+        tm = TM(init_source="""q0 0 q3 1 r
+q0 1 q0 1 r
+q3 0 q3 0 r
+q3 1 q3 1 r
+q3 B q4 B l
+q4 0 q4 0 l
+q4 1 q4 1 l
+q4 B q3 B r""")
+        result = tm.run('0010', True, detect_loops=True)
+        self.assertEqual(result, 'loop')
+        self.assertEqual((result.cycle_start, result.cycle_period), (1, 10))
+        # halting machines not affected
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        result = tm.run('000111', True, detect_loops=True)
+        self.assertEqual(result, 'accept')
+        ctm = tm.compile()
+        ctm.run('000111')
+        self.assertEqual(result.steps, ctm.steps)
+
+    def test_detect_loops_resumed(self):
+        # loops from step 1 with period 2, and the marking machine from step 1 with 10
+        for source, input, period in (("q0 0 q3 0 r\nq3 B q4 B l\nq4 0 q3 0 r", '0', 2),
+                                      ("q0 0 q3 1 r\nq0 1 q0 1 r\nq3 0 q3 0 r\n"
+                                       "q3 1 q3 1 r\nq3 B q4 B l\nq4 0 q4 0 l\n"
+                                       "q4 1 q4 1 l\nq4 B q3 B r", '0010', 10)):
+            tm = TM(init_source=source)
+            # detecting from part way through a run
+            for n in (1, 5, 7, 40):
+                execution = Execution(tm, input)
+                execution.advance(n)
+                result = execution.run(True, detect_loops=True, max_steps=1000)
+                self.assertEqual((result, result.cycle_start, result.cycle_period),
+                                 ('loop', 1, period), n)
+            # and from a checkpoint
+            fd, path = tempfile.mkstemp()
+            os.close(fd)
+            try:
+                result = tm.run(input, True, max_steps=7, checkpoint=path,
+                                checkpoint_interval=7)
+                self.assertEqual(result, 'limit')
+                result = tm.resume(path, True, detect_loops=True, max_steps=1000)
+                self.assertEqual((result, result.cycle_start, result.cycle_period),
+                                 ('loop', 1, period))
+            finally:
+                os.remove(path)
+        # the cycle start is looked for by running from the input, which doesn't loop here,
+        # so the search stops rather than running on
+        execution = Execution(tm, input)
+        execution.advance(5)
+        execution.input_symbols = [Symbol('1')]
+        self.assertRaises(TmException, execution.run, True, True, 1000)
+
+    def test_limits(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        result = tm.run('000111', True, max_steps=5)
+        self.assertEqual(result, 'limit')
+        self.assertEqual((result.limit, result.steps), ('max_steps', 5))
+        # halting on the last allowed step is not a limit
+        steps = tm.run('000111', True).steps
+        self.assertEqual(tm.run('000111', True, max_steps=steps), 'accept')
+        result = tm.run('000111', True, max_tape_cells=6)
+        self.assertEqual((result, result.limit, result.tape_cells), ('limit', 'max_tape_cells', 7))
+        tm = TM(init_source="q0 0 q0 0 r\nq0 B q0 B r")
+        result = tm.run('0', True, deadline=0.01)
+        self.assertEqual((result, result.limit), ('limit', 'deadline'))
+        self.assertTrue(result.steps > 0)
+
+    def test_main_limits(self):
+        out = StringIO.StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            main(['prog', '-f', '../tm/tm_files/m4', '-r', '--max-steps', '5', '000111'])
+            main(['prog', '-f', '../tm/tm_files/m4', '-r', '--max-steps', '500', '000111'])
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(out.getvalue().splitlines(), 
+                         ['limit', 'max_steps exceeded after 5 steps', 'accept'])
+
+    def test_main_stream(self):
+        out = StringIO.StringIO()
+        stdout, stdin, stderr = sys.stdout, sys.stdin, sys.stderr
+        sys.stdout, sys.stderr = out, StringIO.StringIO()
+        fd, path = tempfile.mkstemp()
+        os.write(fd, '000111\n0011\r\n\n012\n')
+        os.close(fd)
+        try:
+            sys.stdin = StringIO.StringIO('000111\n0011\r\n\n012\n')
+            main(['prog', '-f', '../tm/tm_files/m4', '-s', '--max-steps', '20'])
+            main(['prog', '-f', '../tm/tm_files/m4', '-s', '-j', '2', path])
+        finally:
+            sys.stdout, sys.stdin, sys.stderr = stdout, stdin, stderr
+            os.remove(path)
+        self.assertEqual(out.getvalue().splitlines(), 
+                         ['1\tlimit\t20\t7', '2\taccept\t15\t5', '3\taccept\t1\t2', 
+                          '4\terror\t2\t3',
+                          '1\taccept\t28\t7', '2\taccept\t15\t5', '3\taccept\t1\t2', 
+                          '4\terror\t2\t3'])
+
+    def test_steps(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m3")
+        records = list(tm.steps('01'))
+        self.assertEqual([r.step for r in records], [1, 2, 3, 4])
+        self.assertEqual([r.state for r in records], ['q0', 'q0', 'q0', 'q3'])
+        self.assertEqual(records[2].head_positions, (1,))
+        self.assertEqual(records[3].written, (Symbol('1'),))
+        self.assertEqual(records[3].delta.goto_state, tm.accept_state)
+        self.assertTrue(tm.is_halted())
+        tm.reset('0000')
+        self.assertEqual(tm.advance(3), 3)
+        self.assertEqual(tm.tapes[0].get_position(), 3)
+        self.assertEqual(tm.advance(100), 3)
+        self.assertEqual(tm.state, tm.reject_state)
+
+    def test_executions(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        a = Execution(tm, '000111')
+        b = Execution(tm, '0011')
+        # interleaved, each keeps its own configuration
+        while not (a.is_halted() and b.is_halted()):
+            a.advance(1)
+            b.advance(1)
+        self.assertEqual((a.state, b.state), (tm.accept_state, tm.accept_state))
+        self.assertEqual(a.step_count, tm.run('000111', True).steps)
+        self.assertEqual(b.step_count, tm.run('0011', True).steps)
+        # runs don't change the machine's own execution
+        tm.reset('01')
+        tm.run('0' * 20 + '1' * 20, True)
+        self.assertEqual((tm.state, tm.step_count), (tm.start_state, 0))
+        # concurrent runs in threads
+        inputs = ['0' * n + '1' * m for n in range(8) for m in range(n - 1, n + 2) if m >= 0]
+        results = {}
+        def run(input):
+            results[input] = tm.run(input, True)
+        threads = [threading.Thread(target=run, args=(input,)) for input in inputs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for input in inputs:
+            self.assertEqual(results[input], tm.run(input, True))
+            self.assertEqual(results[input].steps, tm.run(input, True).steps)
+
+    def test_run_many(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        inputs = ['0' * n + '1' * m for n in range(6) for m in range(6)] + ['0012', '01']
+        expected = [tm.run(input, True, max_steps=50) for input in inputs[:-2]]
+        for workers in (1, 2):
+            results = list(tm.run_many(iter(inputs), workers, max_steps=50))
+            self.assertEqual(results[:-2], expected)
+            self.assertEqual([r.steps for r in results[:-2]], [r.steps for r in expected])
+            # a bad input symbol is an error result, not the end of the worker
+            self.assertEqual(results[-2], 'error')
+            self.assertTrue('bad instruction' in results[-2].error)
+            self.assertEqual(results[-1], 'accept')
+        self.assertRaises(TmException, tm.run, '0012', True)
+
+    def test_buffer_input(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        fd, path = tempfile.mkstemp()
+        os.write(fd, '0' * 40 + '1' * 40)
+        os.close(fd)
+        f = open(path, 'rb')
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for input in ('000111', '0101', '', '0' * 40 + '1' * 40):
+                expected = tm.run(input, True)
+                buffers = [bytearray(input), memoryview(input), buffer(input)]
+                if len(input) == len(data):
+                    buffers.append(data)
+                for b in buffers:
+                    result = tm.run(b, True)
+                    self.assertEqual((result, result.steps, result.tape_cells),
+                                     (expected, expected.steps, expected.tape_cells))
+                    self.assertEqual(tm.compile().run(b), expected)
+            # input is decoded a page at a time as it is read
+            execution = Execution(tm, data)
+            execution.advance(10)
+            self.assertEqual(execution.tapes[0].get_num_pages(), 1)
+            self.assertEqual(execution.tapes[0].get_configuration()[2][:3], 
+                             (Symbol('0', '.'), Symbol('0'), Symbol('0')))
+            self.assertEqual(execution.get_input_symbols()[-1], Symbol('1'))
+            self.assertEqual(execution.run(True), 'accept')
+            self.assertEqual(tm.run(bytearray('001'), True, tape_class=Tape), 'reject')
+        finally:
+            data.close()
+            f.close()
+            os.remove(path)
+
+    def test_result_tapes(self):
+        # transducer, complements its input
+        tm = TM(init_source="q0 0 q0 1 r\nq0 1 q0 0 r\nq0 B q1 B s")
+        result = tm.run('0110', True)
+        self.assertEqual((result.verdict, result.steps, result.tape_extents),
+                         ('accept', 5, (5,)))
+        self.assertTrue(result.elapsed >= 0)
+        # tapes are only kept if asked for
+        self.assertEqual(result.tapes, None)
+        result = tm.run('0110', True, keep_tapes=True)
+        contents = result.tapes[0]
+        self.assertEqual((str(contents), len(contents), contents.first, contents.head),
+                         ('1001', 4, 0, 4))
+        self.assertEqual(contents.get_symbols(),
+                         [Symbol('1'), Symbol('0'), Symbol('0'), Symbol('1')])
+        results = list(tm.run_many(['01', ''], workers=2, keep_tapes=True))
+        self.assertEqual([str(r.tapes[0]) for r in results], ['10', ''])
+        self.assertEqual(list(tm.run_many(['01'], workers=1))[0].tapes, None)
+        # an all blank tape is empty
+        self.assertEqual(str(tm.run('', True, keep_tapes=True).tapes[0]), '')
+        tm.init("../tm/tm_files/m5")
+        result = tm.run('001100', True, keep_tapes=True)
+        self.assertEqual([str(t) for t in result.tapes], ['001100', '00', '11'])
+        self.assertEqual(result.tape_extents, (8, 4, 5))
+        self.assertEqual(sum(result.tape_extents), result.tape_cells)
+
+    def test_result_tapes_lazy(self):
+        tm = TM(init_source="q0 0 q0 0 r\nq0 1 q0 0 r\nq0 B q3 B l\nq3 0 q1 1 s")
+        execution = Execution(tm, '1' * 50)
+        result = execution.run(True, keep_tapes=True)
+        contents = result.tapes[0]
+        # read from a fork of the tape when first asked for
+        self.assertEqual(contents._contents, None)
+        execution.reset('1')
+        self.assertEqual((str(contents), contents.first, contents.head),
+                         ('0' * 49 + '1', 0, 49))
+        self.assertEqual(contents._tape, None)
+        # in chunks, trimming blanks at both ends
+        tm = TM(init_source="q0 0 q0 B r\nq0 1 q3 1 r\nq3 0 q3 0 r\nq3 B q1 B r")
+        chunk, TapeContents.READ_CHUNK = TapeContents.READ_CHUNK, 7
+        try:
+            for input in ['0' * 20 + '1' + '0' * 20, '0' * 20, '1']:
+                result = tm.run(input, True, keep_tapes=True)
+                contents = result.tapes[0]
+                self.assertEqual((str(contents), contents.first, contents.head),
+                                 (input.lstrip('0'), input.find('1') if '1' in input
+                                  else len(input) + 1, len(input) + 1))
+        finally:
+            TapeContents.READ_CHUNK = chunk
+        # a buffer input is kept in a paged tape, which isn't copied or decoded to keep it
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        input = '0' * 300 + '1' * 300
+        result = tm.run(bytearray(input), True, keep_tapes=True)
+        self.assertEqual(result.tapes[0].get_symbols(),
+                         tm.run(input, True, keep_tapes=True).tapes[0].get_symbols())
+        self.assertEqual(len(result.tapes[0]), 600)
+
+    def test_long_tape_output(self):
+        tm = TM()
+        tm.init("../tm/tm_files/m4")
+        out = StringIO.StringIO()
+        stdout, sys.stdout = sys.stdout, out
+        try:
+            result = tm.run('0' * 30 + '1' * 30)
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(result, 'accept')
+        lines = out.getvalue().splitlines()
+        self.assertEqual(max([len(line) for line in lines if line.startswith('q')]), 
+                         7 + 2 * tm.view_cells)
+        self.assertTrue('q3      0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0>1 1 1 1 1 1 1 1 1 1 1 1 1 1 1 1 1 1' 
+                        in lines)
+
+    def test_checkpoint(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            for machine, input in (("../tm/tm_files/m4", '0' * 10 + '1' * 10),
+                                   ("../tm/tm_files/m5", '0' * 10 + '1' * 10 + '0' * 10)):
+                tm = TM()
+                tm.init(machine)
+                expected = tm.run(input, True)
+                result = tm.run(input, True, max_steps=25, checkpoint=path, checkpoint_interval=10)
+                self.assertEqual((result, result.steps), ('limit', 25))
+                # new process
+                tm = TM()
+                tm.init(machine)
+                result = tm.resume(path, True)
+                self.assertEqual(result, expected)
+                self.assertEqual(result.steps, expected.steps)
+            tm = TM()
+            tm.init("../tm/tm_files/m4")
+            self.assertRaises(TmException, tm.load_checkpoint, path)
+            # checkpoints are saved every positive number of steps
+            for interval in (None, 0, -5, 2.5, '10'):
+                self.assertRaises(TmException, tm.run, '0011', True, checkpoint=path,
+                                  checkpoint_interval=interval)
+            tm.run('0' * 10 + '1' * 10, True, max_steps=25, checkpoint=path, 
+                   checkpoint_interval=10)
+            self.assertEqual(tm.resume(path, True, checkpoint_interval=None).steps, 
+                             tm.run('0' * 10 + '1' * 10, True).steps)
+            # damaged files are rejected, and leave the execution as it was
+            good = marshal.load(open(path, 'rb'))
+            damaged = [good[:7], ('x',) + good[1:], good[:2] + ('q3', -1) + good[4:],
+                       good[:4] + ([('0', None)],) + good[5:], good[:5] + ('Q',) + good[6:],
+                       good[:6] + ('\xff',) + good[7:], good[:7] + ([],),
+                       good[:7] + ([(0, 'x', '')],), good[:7] + ([(0, 0)],), [1, 2]]
+            for i, bad in enumerate(damaged):
+                marshal.dump(bad, open(path, 'wb'))
+                execution = Execution(tm, '01')
+                self.assertRaises(TmException, execution.load_checkpoint, path)
+                self.assertEqual((execution.state, execution.step_count, 
+                                  execution.tapes[0].get_configuration()),
+                                 ('q0', 0, (0, 0, (Symbol('0'), Symbol('1')))), i)
+        finally:
+            os.remove(path)
+
     # m4 M decides 0^n1^n
     def test_m4(self):
         tm = TM()
@@ -0,0 +1,53 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Tests for the NumPy lockstep engine, results should always agree with TM.run().
+'''
+import unittest
+from tm.turing_machine import *
+from test_compiled import all_strings
+try:
+    from tm.vectorized import VectorizedTM
+except ImportError:
+    VectorizedTM = None
+
+
+@unittest.skipIf(VectorizedTM is None, 'needs numpy')
+class TestVectorizedTM(unittest.TestCase):
+
+    def check_machine(self, path, inputs, max_steps=None):
+        tm = TM()
+        tm.init(path)
+        results = VectorizedTM(tm.compile()).run(inputs, max_steps)
+        for input, result in zip(inputs, results):
+            expected = tm.run(input, True, max_steps=max_steps)
+            self.assertEqual((result, result.steps, result.tape_cells, result.limit),
+                             (expected, expected.steps, expected.tape_cells, expected.limit),
+                             input)
+
+    def test_m3(self):
+        self.check_machine("../tm/tm_files/m3", list(all_strings('01', 8)))
+
+    def test_m4(self):
+        self.check_machine("../tm/tm_files/m4", list(all_strings('01', 8)) +
+                           ['0' * 40 + '1' * 40])
+
+    def test_m5(self):
+        self.check_machine("../tm/tm_files/m5", list(all_strings('01', 8)))
+
+    def test_limit(self):
+        self.check_machine("../tm/tm_files/m4", list(all_strings('01', 6)), max_steps=20)
+        # runs off the left end of the tape forever
+        tm = TM(init_source="q0 0 q0 0 l\nq0 B q0 B l")
+        results = VectorizedTM(tm.compile()).run(['0', '', '1'], max_steps=100)
+        self.assertEqual(results, ['limit', 'limit', 'reject'])
+        self.assertEqual([r.tape_cells for r in results], [101, 101, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Static analysis of the delta functions of a TM.
+
+find_live() works out which delta functions can ever be taken, from the start state,
+together with which symbols can ever be on each tape.  A delta function can be taken
+if its state can be reached and each of its input symbols can be on its tape.  A
+tape can hold the blank, the input symbols if it is the input tape, and whatever the
+delta functions that can be taken write on it.  Reaching a state or writing a symbol
+can make more delta functions live, so this is a worklist search to a fixed point,
+over the delta functions grouped by state, see TM.state_deltas.  Each delta function
+is looked at once for its state, and once more for each input symbol it waits for.
+
+Where symbols are written isn't followed, only whether they are written at all, so
+this can keep delta functions that can't really be taken, but never drops one that
+can.
+
+equivalent_states() finds the states of a deterministic TM that behave the same: on
+the same input symbols they write the same symbols, make the same moves, and go to
+states that behave the same.  It starts with the states grouped by what they write
+and how they move for each input symbols, with the accept and reject states on
+their own, and refines the groups with Hopcroft's algorithm: a group is split when
+only some of its states go to a given group on some input symbols.  A delta function
+that does what the generated rejecting transition would, see TM.get_transition(), is
+taken as the same as none.  Merging equivalent states, see TM.minimize(), gives a
+machine that takes the same steps on every input, with the same tapes.
+
+Usage:
+    report = tm.prune()
+    report.transitions   # -> DeltaFuncs removed
+    merged = tm.minimize()   # -> {state: state it was merged into}
+'''
+
+import collections
+
+from turing_machine import DeltaFunc, Tape, TmException
+
+# What TM.prune() removed:
+# states - states other than the start, accept and reject states that can't be reached,
+#     in the order of TM.get_states()
+# transitions - DeltaFuncs that can't be taken, in the order of TM.delta_functions
+# symbols - for each tape, list of its alphabet's symbols that can never be on it,
+#     these are not removed from the alphabets
+PruneReport = collections.namedtuple('PruneReport', 'states transitions symbols')
+
+
+def find_live(tm, input_symbols=None):
+    """Returns (set of states that can be reached, set of DeltaFuncs that can be taken,
+    list of the set of symbols that can be on each tape), see the module doc.
+    @param input_symbols: symbols the input can have, default is tm.alphabet
+    """
+    if input_symbols is None:
+        input_symbols = tm.alphabet
+    possible = [set([tm.blank_symbol]) for _ in tm.tapes]
+    possible[0].update(input_symbols)
+    halting = (tm.accept_state, tm.reject_state)
+    reached = set()
+    live = set()
+    # (tape number, symbol) -> delta functions of reached states waiting for symbol
+    waiting = {}
+    states = [tm.start_state]
+    deltas = []
+    while states or deltas:
+        if states:
+            state = states.pop()
+            if not state in reached:
+                reached.add(state)
+                # halted machines take no more steps
+                if not state in halting:
+                    deltas.extend(tm.get_state_deltas(state))
+            continue
+        delta = deltas.pop()
+        missing = [t for t, symbol in enumerate(delta.inputs) if not symbol in possible[t]]
+        if missing:
+            waiting.setdefault((missing[0], delta.inputs[missing[0]]), []).append(delta)
+            continue
+        live.add(delta)
+        if not delta.goto_state in reached:
+            states.append(delta.goto_state)
+        for t, symbol in enumerate(delta.outputs):
+            if not symbol in possible[t]:
+                possible[t].add(symbol)
+                deltas.extend(waiting.pop((t, symbol), []))
+    return reached, live, possible
+
+def prune(tm, input_symbols=None):
+    """Remove the delta functions of tm that can't be taken, see TM.prune().
+    @return: PruneReport
+    """
+    reached, live, possible = find_live(tm, input_symbols)
+    # the start, accept and reject states are always kept, the reject state is reached
+    # by the generated rejecting transitions
+    states = [s for s in tm.get_states()[3:] if not s in reached]
+    removed = [d for d in tm.delta_functions if not d in live]
+    if removed:
+        tm.delta_functions = [d for d in tm.delta_functions if d in live]
+        tm.build_delta_index()
+    symbols = [[s for s in tape.alphabet if not s in possible[t]]
+               for t, tape in enumerate(tm.tapes)]
+    return PruneReport(states, removed, symbols)
+
+
+def equivalent_states(tm):
+    """Returns dict of state -> the first state equivalent to it, in the order of
+    TM.get_states() then of first use as goto state, for every state of tm, see the
+    module doc.
+    @raise TmException: if tm is not deterministic
+    """
+    if not tm.is_deterministic():
+        raise TmException("equivalent_states(): machine is not deterministic")
+    states = tm.get_states()
+    # states that are only gone to
+    seen = set(states)
+    for d in tm.delta_functions:
+        if not d.goto_state in seen:
+            seen.add(d.goto_state)
+            states.append(d.goto_state)
+    halting = (tm.accept_state, tm.reject_state)
+    # group states by what they do, and list the (input symbols, state) going to each
+    groups = {}
+    predecessors = {}
+    for state in states:
+        if state in halting:
+            signature = state
+        else:
+            local = []
+            for d in tm.get_state_deltas(state):
+                inputs = tuple(d.inputs)
+                if (d.goto_state == tm.reject_state and d.outputs == d.inputs
+                    and d.directions == [Tape.RIGHT] * tm.num_tapes):
+                    continue
+                local.append((inputs, tuple(d.outputs), tuple(d.directions)))
+                predecessors.setdefault(d.goto_state, []).append((inputs, state))
+            signature = frozenset(local)
+        groups.setdefault(signature, []).append(state)
+    blocks = [set(group) for group in groups.values()]
+    block_of = {}
+    for i, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = i
+
+    waiting = range(len(blocks))
+    is_waiting = set(waiting)
+    while waiting:
+        splitter = waiting.pop()
+        is_waiting.discard(splitter)
+        # input symbols -> states that go into the splitter on them
+        into = {}
+        for state in blocks[splitter]:
+            for inputs, predecessor in predecessors.get(state, []):
+                into.setdefault(inputs, set()).add(predecessor)
+        for sources in into.values():
+            touched = {}
+            for state in sources:
+                touched.setdefault(block_of[state], set()).add(state)
+            for i, inside in touched.items():
+                if len(inside) == len(blocks[i]):
+                    continue
+                blocks[i] -= inside
+                blocks.append(inside)
+                new = len(blocks) - 1
+                for state in inside:
+                    block_of[state] = new
+                if i in is_waiting or len(inside) <= len(blocks[i]):
+                    waiting.append(new)
+                    is_waiting.add(new)
+                else:
+                    waiting.append(i)
+                    is_waiting.add(i)
+
+    first = {}
+    for state in states:
+        first.setdefault(block_of[state], state)
+    return dict([(state, first[block_of[state]]) for state in states])
+
+def minimize(tm):
+    """Merge equivalent states of tm, see TM.minimize().
+    @return: dict of each state merged away -> the state it was merged into
+    """
+    equivalent = equivalent_states(tm)
+    merged = dict([(s, e) for s, e in equivalent.items() if s != e])
+    if merged:
+        tm.delta_functions = [DeltaFunc(tm, d.start_state, d.inputs,
+                                        equivalent[d.goto_state], d.outputs, d.directions)
+                              for d in tm.delta_functions if not d.start_state in merged]
+        tm.build_delta_index()
+    return merged
@@ -0,0 +1,380 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Compiled, integer encoded form of a TM for fast execution.
+
+States and tape symbols are given small integer ids, and the transitions are kept
+in flat tables indexed by:
+
+    state * |Gamma|^k + code_0 + code_1 * |Gamma| + .. + code_k-1 * |Gamma|^(k-1)
+
+where k is the number of tapes, Gamma is the union of all the tape alphabets, and
+code_i is the code of the symbol under the head of tape i.  Every entry of the table
+is filled, missing transitions get the rejecting transition that TM.get_delta_func()
+would generate, so the run loop never has to look at Symbol, DeltaFunc or Tape
+objects.
+
+Note that the tables have |Q| * |Gamma|^k entries, so this is meant for machines with
+a handful of tapes and reasonably small alphabets.
+
+Usage:
+    ctm = tm.compile()
+    ctm.run('000111')   # -> 'accept'
+
+For single tape machines that sweep over long runs of the same symbol there is also
+a run-length encoded tape mode, see RleTape:
+    ctm.run('0' * 10**6 + '1' * 10**6, rle=True)
+'''
+
+from turing_machine import BUFFER_TYPES, Tape, TmException
+
+class CompiledTM(object):
+    """Integer encoded TM.  State ids: accept = 0, reject = 1, start = 2 (unless start
+    is also accept or reject), the rest in the order of TM.get_states().  Symbol codes
+    index self.symbols.
+    """
+    ACCEPT = 0
+    REJECT = 1
+
+    def __init__(self, tm):
+        """Compile tm, which should already have its delta functions loaded.
+        @param tm: TM
+        @raise TmException: if a delta function writes a symbol that is not in the
+            alphabet of its tape
+        """
+        self.num_tapes = tm.num_tapes
+
+        # states
+        self.states = [tm.accept_state, tm.reject_state]
+        self.state_ids = {tm.accept_state: CompiledTM.ACCEPT,
+                          tm.reject_state: CompiledTM.REJECT}
+        for state in tm.get_states() + [d.goto_state for d in tm.delta_functions]:
+            if not state in self.state_ids:
+                self.state_ids[state] = len(self.states)
+                self.states.append(state)
+        self.start = self.state_ids[tm.start_state]
+
+        # symbols, Gamma is union of tape alphabets
+        self.symbols = []
+        self.codes = {}
+        for symbol in [tm.blank_symbol] + [s for t in tm.tapes for s in t.alphabet]:
+            if not symbol in self.codes:
+                self.codes[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        self.blank = self.codes[tm.blank_symbol]
+        # input characters -> codes, for plain string input
+        self.char_codes = {}
+        for symbol, code in self.codes.items():
+            self.char_codes[str(symbol)] = code
+        # codes allowed on each tape
+        tape_codes = [set([self.codes[s] for s in t.alphabet]) for t in tm.tapes]
+
+        num_symbols = len(self.symbols)
+        self.num_symbols = num_symbols
+        # |Gamma|^k
+        self.stride = num_symbols ** self.num_tapes
+        size = len(self.states) * self.stride
+
+        # transition tables, default is reject without changing tape, moving right
+        self.next_state = [CompiledTM.REJECT] * size
+        self.writes = []
+        self.moves = []
+        for i in range(self.num_tapes):
+            per = num_symbols ** i
+            # symbol read on tape i for each table index
+            self.writes.append([(j // per) % num_symbols for j in range(size)])
+            self.moves.append([Tape.RIGHT] * size)
+
+        for d in tm.delta_functions:
+            symbols_index = self._symbols_index(d.inputs)
+            if symbols_index < 0:
+                # reads a symbol no tape can hold, can never fire
+                continue
+            index = self.state_ids[d.start_state] * self.stride + symbols_index
+            # later delta functions replace earlier ones, as in TM.delta_index
+            self.next_state[index] = self.state_ids[d.goto_state]
+            for i in range(self.num_tapes):
+                code = self.codes.get(d.outputs[i])
+                if code is None or not code in tape_codes[i]:
+                    raise TmException("CompiledTM: %s writes symbol not in tape %d alphabet"
+                                      % (d, i))
+                self.writes[i][index] = code
+                self.moves[i][index] = d.directions[i]
+
+        # steps taken in last run
+        self.steps = 0
+
+    def _symbols_index(self, symbols):
+        """Returns the symbol part of the table index for list of Symbols, or -1
+        if any of them are not in Gamma.
+        """
+        index, per = 0, 1
+        for symbol in symbols:
+            code = self.codes.get(symbol, -1)
+            if code < 0:
+                return -1
+            index += code * per
+            per *= self.num_symbols
+        return index
+
+    def encode_input(self, input_string):
+        """Returns list of codes for input string.
+        @param input_string: string, each character a symbol, or list of Symbols, or one
+            of BUFFER_TYPES
+        @raise TmException: if a character/symbol is not in Gamma
+        """
+        try:
+            if isinstance(input_string, BUFFER_TYPES):
+                input_string = str(bytearray(input_string[:]))
+            if isinstance(input_string, basestring):
+                return [self.char_codes[c] for c in input_string]
+            return [self.codes[s] for s in input_string]
+        except KeyError as e:
+            raise TmException("CompiledTM: input symbol not in any tape alphabet: %s" % e)
+
+    def run(self, input_string, rle=False):
+        """Run on input_string, with the same results as TM.run() in quiet mode.
+        Number of steps taken is left in self.steps.
+        @param input_string: string or list of Symbols
+        @param rle: if True, use run-length encoded tape with macro steps, see _run_rle()
+        @return: "accept", or "reject"
+        @raise TmException: in rle mode, for a multitape machine, or if a macro step
+            shows that the machine will never halt
+        """
+        codes = self.encode_input(input_string)
+        if rle:
+            if self.num_tapes != 1:
+                raise TmException("CompiledTM: rle mode is for single tape machines only")
+            state = self._run_rle(codes)
+        elif self.num_tapes == 1:
+            state = self._run_single(codes)
+        else:
+            state = self._run_multi(codes)
+        if state == CompiledTM.ACCEPT:
+            return 'accept'
+        return 'reject'
+
+    def _run_single(self, codes):
+        """Run loop for single tape machines, returns halting state id.
+        The tape is a list of codes that grows geometrically off either end.
+        """
+        blank = self.blank
+        tape = codes if codes else [blank]
+        size = len(tape)
+        pos = 0
+        state = self.start
+        steps = 0
+        num_symbols = self.num_symbols
+        next_state = self.next_state
+        writes = self.writes[0]
+        moves = self.moves[0]
+        while state > 1:
+            i = state * num_symbols + tape[pos]
+            tape[pos] = writes[i]
+            state = next_state[i]
+            pos += moves[i]
+            steps += 1
+            if pos < 0:
+                tape[0:0] = [blank] * size
+                pos += size
+                size += size
+            elif pos == size:
+                tape.extend([blank] * size)
+                size += size
+        self.steps = steps
+        return state
+
+    def _run_rle(self, codes):
+        """Run loop for single tape machine using an RleTape, returns halting state id.
+        When the transition for the current state and symbol writes the same symbol,
+        stays in the same state and moves the head, the machine must move across the
+        rest of the run of that symbol, so that is done in one macro step, adding the
+        length of the run crossed to the step count.
+        """
+        tape = RleTape(codes, self.blank)
+        state = self.start
+        steps = 0
+        num_symbols = self.num_symbols
+        next_state = self.next_state
+        writes = self.writes[0]
+        moves = self.moves[0]
+        symbols = tape.symbols
+        while state > 1:
+            symbol = symbols[tape.run]
+            i = state * num_symbols + symbol
+            if next_state[i] == state and writes[i] == symbol:
+                if moves[i] == Tape.STAY:
+                    raise TmException("CompiledTM: machine never halts, stays in state %s "
+                                      "on symbol %s" % (self.states[state], self.symbols[symbol]))
+                steps += tape.skip(moves[i])
+            else:
+                tape.write(writes[i])
+                tape.move(moves[i])
+                state = next_state[i]
+                steps += 1
+        self.steps = steps
+        return state
+
+    def _run_multi(self, codes):
+        """Run loop for multitape machines, returns halting state id.
+        """
+        blank = self.blank
+        k = self.num_tapes
+        tapes = [codes if codes else [blank]] + [[blank] for _ in range(1, k)]
+        positions = [0] * k
+        state = self.start
+        steps = 0
+        num_symbols = self.num_symbols
+        stride = self.stride
+        next_state = self.next_state
+        writes = self.writes
+        moves = self.moves
+        tape_range = range(k)
+        reverse_range = range(k-1, -1, -1)
+        while state > 1:
+            i = 0
+            for t in reverse_range:
+                i = i * num_symbols + tapes[t][positions[t]]
+            i += state * stride
+            for t in tape_range:
+                tape = tapes[t]
+                pos = positions[t]
+                tape[pos] = writes[t][i]
+                pos += moves[t][i]
+                if pos < 0:
+                    size = len(tape)
+                    tape[0:0] = [blank] * size
+                    pos += size
+                elif pos == len(tape):
+                    tape.extend([blank] * len(tape))
+                positions[t] = pos
+            state = next_state[i]
+            steps += 1
+        self.steps = steps
+        return state
+
+
+class RleTape(object):
+    """Run-length encoded tape of symbol codes for CompiledTM.  The known tape is kept
+    as parallel lists of symbols and counts of maximal runs, so neighbouring runs never
+    have the same symbol.  The head is at cell offset of run number run.  Operations
+    are linear in the number of runs, not the number of cells.
+    """
+    def __init__(self, codes, blank):
+        """@param codes: list of symbol codes, the input
+        @param blank: code of blank symbol
+        """
+        self.blank = blank
+        self.symbols = []
+        self.counts = []
+        for code in codes:
+            if self.symbols and self.symbols[-1] == code:
+                self.counts[-1] += 1
+            else:
+                self.symbols.append(code)
+                self.counts.append(1)
+        if not self.symbols:
+            self.symbols.append(blank)
+            self.counts.append(1)
+        self.run = 0
+        self.offset = 0
+
+    def current(self):
+        """Returns code under head."""
+        return self.symbols[self.run]
+
+    def write(self, code):
+        """Write code at head, splitting and merging runs as necessary."""
+        symbols, counts, r = self.symbols, self.counts, self.run
+        if symbols[r] == code:
+            return
+        count = counts[r]
+        o = self.offset
+        if count == 1:
+            symbols[r] = code
+            if r + 1 < len(symbols) and symbols[r+1] == code:
+                counts[r] += counts[r+1]
+                del symbols[r+1], counts[r+1]
+            if r > 0 and symbols[r-1] == code:
+                self.offset = counts[r-1]
+                counts[r-1] += counts[r]
+                del symbols[r], counts[r]
+                self.run = r - 1
+        elif o == 0:
+            counts[r] -= 1
+            if r > 0 and symbols[r-1] == code:
+                counts[r-1] += 1
+                self.run = r - 1
+                self.offset = counts[r-1] - 1
+            else:
+                symbols.insert(r, code)
+                counts.insert(r, 1)
+        elif o == count - 1:
+            counts[r] -= 1
+            self.run = r + 1
+            self.offset = 0
+            if r + 1 < len(symbols) and symbols[r+1] == code:
+                counts[r+1] += 1
+            else:
+                symbols.insert(r+1, code)
+                counts.insert(r+1, 1)
+        else:
+            # split run in three
+            symbols[r+1:r+1] = [code, symbols[r]]
+            counts[r+1:r+1] = [1, count - o - 1]
+            counts[r] = o
+            self.run = r + 1
+            self.offset = 0
+
+    def move(self, direction):
+        """Move head one cell in direction, adding blanks to the known tape at the ends.
+        """
+        if direction == Tape.RIGHT:
+            if self.offset + 1 < self.counts[self.run]:
+                self.offset += 1
+            elif self.run + 1 < len(self.symbols):
+                self.run += 1
+                self.offset = 0
+            elif self.symbols[-1] == self.blank:
+                self.counts[-1] += 1
+                self.offset += 1
+            else:
+                self.symbols.append(self.blank)
+                self.counts.append(1)
+                self.run += 1
+                self.offset = 0
+        elif direction == Tape.LEFT:
+            if self.offset > 0:
+                self.offset -= 1
+            elif self.run > 0:
+                self.run -= 1
+                self.offset = self.counts[self.run] - 1
+            elif self.symbols[0] == self.blank:
+                self.counts[0] += 1
+            else:
+                self.symbols.insert(0, self.blank)
+                self.counts.insert(0, 1)
+
+    def skip(self, direction):
+        """Move the head across the rest of the current run in direction, leaving it on
+        the first cell past the run.  Returns number of cells moved.
+        @raise TmException: if the run is blank and reaches the end of the known tape, 
+            since it would never end
+        """
+        if direction == Tape.RIGHT:
+            count = self.counts[self.run] - self.offset
+            if self.run + 1 == len(self.symbols) and self.symbols[self.run] == self.blank:
+                raise TmException("CompiledTM: machine never halts, moves right over blanks")
+            self.offset = self.counts[self.run] - 1
+        else:
+            count = self.offset + 1
+            if self.run == 0 and self.symbols[0] == self.blank:
+                raise TmException("CompiledTM: machine never halts, moves left over blanks")
+            self.offset = 0
+        self.move(direction)
+        return count
@@ -0,0 +1,129 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Runs of a TM on every input up to a given length, sharing the steps taken on common
+prefixes.
+
+Until the input tape's head first reaches the cell after a prefix p, a run on any input
+starting with p takes the same steps, as that cell and the ones after it haven't been
+read.  So the inputs are walked as a trie, depth first: the configuration at the
+moment the head first reaches cell len(p) is kept, and the run on p itself and on each
+p + symbol carries on from a fork of it, see Execution.fork().  For p + symbol the
+symbol is written into that cell, and the run is taken on to the first time the head
+reaches the cell after it.  If the machine halts, or reaches max_steps, before that,
+every input starting with p + symbol gets the same result without running any of them.
+
+A machine that reads its input left to right and stops early, eg m1, "starts with a 0",
+runs a few steps in all, rather than a few steps for each input.
+
+The RunResult for each input has the same verdict, steps, tape_cells and tape_extents
+as TM.run() on it.  With keep_tapes, its tapes are kept as well, except for inputs that
+go on past the cells the machine read, as those cells are never put on a tape.  Step counters, see
+TM.enable_stats(), count the shared steps once.
+
+Usage:
+    for input, result in tm.enumerate_language(8, '01', max_steps=10000):
+        print input, result, result.steps
+'''
+
+from turing_machine import Execution, RunResult, Symbol, Tape, TapeContents
+
+
+def _extensions(prefix, symbols, max_len):
+    """Generator of prefix, then of prefix extended with symbols up to max_len in all,
+    depth first in the order of symbols, each as a tuple.
+    """
+    stack = [prefix]
+    while stack:
+        prefix = stack.pop()
+        yield prefix
+        if len(prefix) < max_len:
+            stack.extend([prefix + (s,) for s in reversed(symbols)])
+
+def _advance(execution, target, max_steps):
+    """Step execution until the input tape's head is at target, or it halts, or has
+    taken max_steps.
+    @return: RunResult if it halted or reached max_steps, else None
+    """
+    tape = execution.tapes[0]
+    while True:
+        if execution.is_halted():
+            if execution.state == execution.tm.accept_state:
+                verdict = 'accept'
+            else:
+                verdict = 'reject'
+            return RunResult(verdict, execution.step_count, execution.get_num_cells())
+        if tape.get_position() == target:
+            return None
+        if max_steps is not None and execution.step_count >= max_steps:
+            return RunResult('limit', execution.step_count, execution.get_num_cells(),
+                             limit='max_steps')
+        execution.step()
+
+def enumerate_language(tm, max_len, input_symbols=None, max_steps=None, tape_class=None,
+                       keep_tapes=False):
+    """Generator of (input, RunResult) for every input of up to max_len symbols, see the
+    module doc.  Inputs are made depth first, in the order of input_symbols, eg for
+    '01': '', '0', '00', .., '01', .., '1', ..
+    @param max_len: length of the longest inputs
+    @param input_symbols: string, each character a symbol, or list of Symbols, default
+        is tm.alphabet.  Inputs are strings if it is a string, else lists of Symbols
+    @param max_steps: result is "limit" for inputs the machine hasn't halted on after
+        max_steps steps.  Without it, a machine that doesn't halt on some input never
+        gets past it
+    @param tape_class: class of tapes to run on, see Execution, eg PagedTape in the
+        paged module for constant time forks
+    @param keep_tapes: if True, keep the final tapes of the inputs that are read to the
+        end, see the module doc
+    @raise TmException: if an input symbol isn't in the input tape's alphabet
+    """
+    if input_symbols is None:
+        input_symbols = tm.alphabet
+    as_string = isinstance(input_symbols, basestring)
+    if as_string:
+        symbols = [Symbol(s) for s in input_symbols]
+    else:
+        symbols = list(input_symbols)
+    def make_input(prefix):
+        if as_string:
+            return ''.join([str(s) for s in prefix])
+        return list(prefix)
+
+    execution = Execution(tm, tape_class=tape_class)
+    execution.reset([])
+    # prefix and its execution, whose head is on the cell after prefix or is to go on
+    # to it, with the last symbol of prefix written
+    stack = [((), execution)]
+    while stack:
+        prefix, execution = stack.pop()
+        shared = _advance(execution, len(prefix), max_steps)
+        if shared is not None:
+            extents = [t.get_num_cells() for t in execution.tapes]
+            # the known input tape ends after prefix, or after the cell after it if the
+            # machine halted as the head came to it, and longer inputs add their cells
+            # past that
+            end = len(prefix)
+            if execution.step_count and execution.tapes[0].get_position() == end:
+                end += 1
+            for input in _extensions(prefix, symbols, max_len):
+                extra = max(0, len(input) - end)
+                result = RunResult(shared.verdict, shared.steps, shared.tape_cells + extra,
+                                   limit=shared.limit,
+                                   tape_extents=tuple([extents[0] + extra] + extents[1:]))
+                if keep_tapes and input is prefix:
+                    result.tapes = tuple([TapeContents.from_tape(t) for t in execution.tapes])
+                yield make_input(input), result
+            continue
+        yield make_input(prefix), execution.fork().run(True, max_steps=max_steps,
+                                                                keep_tapes=keep_tapes)
+        if len(prefix) < max_len:
+            for i in range(len(symbols) - 1, -1, -1):
+                # the last one on the stack, so the first taken off, needn't be forked
+                child = execution.fork() if i else execution
+                child.tapes[0].do(tm.blank_symbol, symbols[i], Tape.STAY)
+                stack.append((prefix + (symbols[i],), child))
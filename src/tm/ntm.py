@@ -0,0 +1,240 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Nondeterministic runs of a TM by breadth-first search of its configurations.
+
+A TM loaded from a file with more than one delta function for the same state and input
+symbols runs deterministically with TM.run(), using the last of them.  NtmSearch
+instead follows all of them, see TM.get_transitions(), one step of every branch at
+a time, and accepts as soon as any branch accepts.  It rejects when no branch can
+accept: every branch has either halted without accepting, or come to a configuration
+already seen, so a machine that only loops is rejected rather than run forever.
+
+Configurations are kept as plain tuples:
+
+    (state, ((head position, position of first cell, tuple of Symbols), ..))
+
+one entry per tape, with the cells trimmed of blanks at both ends so equal
+configurations are equal tuples (an all blank tape has first cell 0).  Positions are
+relative to the start of the input as in Tape.get_position().
+
+Branches that reach a configuration already seen are dropped.  The configurations
+seen are kept themselves, rather than their hashes, as hash() of small ints collides,
+eg hash(-1) == hash(-2), and would drop branches that are not duplicates.  Their
+cells are mostly tuples shared with other configurations, see _write().  They are kept
+in two generations: once the newer has max_frontier * SEEN_PER_FRONTIER / 2
+configurations, the older is forgotten and the newer takes its place, which can only
+mean some configurations are explored again.
+
+Usage:
+    result = tm.run_ntm('0110', quiet=False)
+    result.depths[3].frontier
+'''
+
+import collections
+import multiprocessing
+
+from turing_machine import Execution, RunResult, TmException
+
+# Search statistics for one step of NtmSearch.run():
+# depth - number of steps taken
+# frontier - number of configurations after the step, that are still running
+# generated - number of running configurations the step made
+# duplicates - number of those already seen, and dropped
+# hit_rate - duplicates / generated
+DepthStats = collections.namedtuple('DepthStats', 'depth frontier generated duplicates hit_rate')
+
+
+def expand(tm, configurations):
+    """Returns (list of running configurations one step on from configurations, True
+    if any branch accepted, number of running configurations made).  Branches that
+    reject are dropped, and so are duplicates in the list.
+    @raise TmException: if a delta function writes a symbol not in the tape's alphabet
+    """
+    blank = tm.blank_symbol
+    alphabets = [set(t.alphabet) for t in tm.tapes]
+    successors = []
+    seen = set()
+    generated = 0
+    for state, tapes in configurations:
+        symbols = []
+        for head, first, cells in tapes:
+            i = head - first
+            symbols.append(cells[i] if 0 <= i < len(cells) else blank)
+        for delta in tm.get_transitions(state, symbols):
+            if delta.goto_state == tm.accept_state:
+                return [], True, generated
+            if delta.goto_state == tm.reject_state:
+                continue
+            generated += 1
+            new_tapes = []
+            for t, (head, first, cells) in enumerate(tapes):
+                output = delta.outputs[t]
+                if not output in alphabets[t]:
+                    raise TmException("NtmSearch: %s writes symbol not in tape %d alphabet"
+                                      % (delta, t))
+                if output != symbols[t]:
+                    cells, first = _write(cells, first, head, output, blank)
+                new_tapes.append((head + delta.directions[t], first, cells))
+            successor = (delta.goto_state, tuple(new_tapes))
+            if not successor in seen:
+                seen.add(successor)
+                successors.append(successor)
+    return successors, False, generated
+
+def _write(cells, first, head, symbol, blank):
+    """Returns (cells, first) of a tape with symbol written at head, trimmed of blanks."""
+    if not cells:
+        first = head
+    elif head < first:
+        cells = (blank,) * (first - head) + cells
+        first = head
+    elif head >= first + len(cells):
+        cells = cells + (blank,) * (head - first - len(cells) + 1)
+    i = head - first
+    cells = cells[:i] + (symbol,) + cells[i + 1:]
+    lo, hi = 0, len(cells)
+    while lo < hi and cells[lo] == blank:
+        lo += 1
+    while hi > lo and cells[hi - 1] == blank:
+        hi -= 1
+    if lo == hi:
+        return (), 0
+    return cells[lo:hi], first + lo
+
+
+# machine of an NtmSearch worker process
+_worker_tm = None
+
+def _init_worker(tm):
+    """Pool initializer for NtmSearch, keeps the machine for all chunks."""
+    global _worker_tm
+    _worker_tm = tm
+
+def _expand_chunk(configurations):
+    """expand() with the worker's machine."""
+    return expand(_worker_tm, configurations)
+
+
+class NtmSearch(object):
+    """Breadth-first search of the configurations of a nondeterministic TM."""
+    # frontiers are split into chunks of this many configurations for the workers
+    CHUNK_SIZE = 1000
+    # configurations seen are kept for up to this many max_frontiers
+    SEEN_PER_FRONTIER = 4
+
+    def __init__(self, tm, max_steps=None, max_frontier=1000000, workers=1):
+        """@param tm: TM, see TM.get_transitions()
+        @param max_steps: stop with "limit" if no branch has halted after this many
+            steps
+        @param max_frontier: stop with "limit" if more than this many configurations
+            are running at once, this bounds the memory used
+        @param workers: number of processes to expand frontiers in, 1 expands them in
+            this process
+        """
+        self.tm = tm
+        self.max_steps = max_steps
+        self.max_frontier = max_frontier
+        self.workers = workers
+
+    def start_configuration(self, input_string):
+        """Returns the start configuration for input_string.
+        @param input_string: string, or list of Symbols
+        """
+        tm = self.tm
+        execution = Execution(tm, input_string)
+        tapes = []
+        for tape in execution.tapes:
+            head, first, cells = tape.get_configuration()
+            if not cells:
+                first = 0
+            tapes.append((head, first, cells))
+        return (tm.start_state, tuple(tapes))
+
+    def run(self, input_string, quiet=True):
+        """Search from the start configuration for input_string.
+        @param quiet: if False, print the statistics of each step
+        @return: RunResult, "accept", "reject" or "limit", where steps is the number of
+            steps to accept or to the end of the search, tape_cells is the number of
+            non-blank cells in the largest frontier configuration, and depths is a list
+            of DepthStats, one per step
+        """
+        tm = self.tm
+        frontier = [self.start_configuration(input_string)]
+        depths = []
+        result = None
+        if tm.start_state == tm.accept_state:
+            result = RunResult('accept', 0, self._cells(frontier))
+        elif tm.start_state == tm.reject_state:
+            result = RunResult('reject', 0, self._cells(frontier))
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, _init_worker, (tm,))
+        # configurations seen so far, newer and older generations
+        seen = set(frontier)
+        older = set()
+        try:
+            while result is None:
+                if self.max_steps is not None and len(depths) >= self.max_steps:
+                    result = RunResult('limit', len(depths), self._cells(frontier),
+                                       limit='max_steps')
+                    break
+                if len(frontier) > self.max_frontier:
+                    result = RunResult('limit', len(depths), self._cells(frontier),
+                                       limit='max_frontier')
+                    break
+                successors, accepted, generated = self._expand(pool, frontier)
+                frontier = []
+                for configuration in successors:
+                    if not configuration in seen and not configuration in older:
+                        if len(seen) >= self.max_frontier * NtmSearch.SEEN_PER_FRONTIER // 2:
+                            older = seen
+                            seen = set()
+                        seen.add(configuration)
+                        frontier.append(configuration)
+                duplicates = generated - len(frontier)
+                stats = DepthStats(len(depths) + 1, len(frontier), generated, duplicates,
+                                   float(duplicates) / generated if generated else 0.0)
+                depths.append(stats)
+                if not quiet:
+                    print ("depth %d: frontier %d, generated %d, duplicates %d (%.1f%%)"
+                           % (stats.depth, stats.frontier, stats.generated,
+                              stats.duplicates, 100 * stats.hit_rate))
+                if accepted:
+                    result = RunResult('accept', len(depths), self._cells(frontier))
+                elif not frontier:
+                    result = RunResult('reject', len(depths), 0)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        result.depths = depths
+        if not quiet:
+            print result
+        return result
+
+    def _expand(self, pool, frontier):
+        """expand() frontier, in chunks in pool if there is one."""
+        if pool is None or len(frontier) <= NtmSearch.CHUNK_SIZE:
+            return expand(self.tm, frontier)
+        chunks = [frontier[i:i + NtmSearch.CHUNK_SIZE]
+                  for i in range(0, len(frontier), NtmSearch.CHUNK_SIZE)]
+        successors = []
+        accepted = False
+        generated = 0
+        for chunk_successors, chunk_accepted, chunk_generated in pool.imap(_expand_chunk,
+                                                                            chunks):
+            successors.extend(chunk_successors)
+            accepted = accepted or chunk_accepted
+            generated += chunk_generated
+        return successors, accepted, generated
+
+    def _cells(self, frontier):
+        """Returns the most non-blank cells of any configuration in frontier."""
+        return max([0] + [sum([len(cells) for head, first, cells in tapes])
+                          for state, tapes in frontier])
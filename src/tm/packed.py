@@ -0,0 +1,160 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Bit-packed tapes, for very long tapes over small alphabets.
+
+A PackedTape keeps each cell as a code of ceil(log2(|alphabet|)) bits, rounded up to
+1, 2, 4 or 8 so a cell never spans two bytes, in a bytearray.  A cell of a binary
+machine's tape, alphabet {B, 0, 1}, takes 2 bits rather than an 8 byte reference to
+a Symbol, so a 10^8 cell tape is 25MB rather than 800MB.  Codes index the tape
+alphabet, with the blank always code 0, so the zero bytes the buffer grows by are
+blank.
+
+Reads and writes are a shift and a mask.  Symbols are only made from codes when they
+are asked for, eg for the window of the tape that is printed.
+
+Usage:
+    execution = Execution(tm, '000111', tape_class=PackedTape)
+'''
+
+import copy
+
+from turing_machine import Tape, TmException
+
+class PackedTape(Tape):
+    """Tape with cells packed in a bytearray, see the module doc.  Positions _lo, _hi,
+    _pos and _base are cell numbers in the buffer, as in Tape.
+    """
+    def _set_alphabet(self, alphabet):
+        # codes change, so contents are decoded and encoded again
+        contents = None
+        if hasattr(self, '_buffer'):
+            contents = self.contents
+        Tape._set_alphabet(self, alphabet)
+        # blank is code 0
+        self._symbols = [self.blank] + [s for s in alphabet if s != self.blank]
+        if len(self._symbols) > 256:
+            raise TmException("PackedTape: alphabet has more than 256 symbols")
+        self._codes = dict([(s, i) for i, s in enumerate(self._symbols)])
+        self._bits = 1
+        while 1 << self._bits < len(self._symbols):
+            self._bits *= 2
+        # cells per byte is 1 << _cell_shift
+        self._cell_shift = {1: 3, 2: 2, 4: 1, 8: 0}[self._bits]
+        self._mask = (1 << self._bits) - 1
+        if contents is not None:
+            self.restore(self.get_position(), self._lo - self._base, contents)
+
+    alphabet = property(Tape._get_alphabet, _set_alphabet,
+                        doc="""list of Symbols, assign a new list rather than modifying in place""")
+
+    def _encode(self, symbol):
+        """Returns code of symbol.
+        @raise TmException: if symbol is not in the alphabet
+        """
+        code = self._codes.get(symbol)
+        if code is None:
+            raise TmException("PackedTape: symbol not in tape alphabet: %s" % symbol)
+        return code
+
+    def init_input(self, input_string, head_pos=0):
+        """Copy input string to tape, with the read/write head at head_pos.
+        @param input_string: list of Symbols
+        @raise TmException: if a symbol is not in the alphabet
+        """
+        per_byte = 1 << self._cell_shift
+        # headroom is a whole number of bytes
+        headroom = max(Tape.MIN_HEADROOM, len(input_string) // 2)
+        headroom += -headroom % per_byte
+        self._buffer = bytearray((2 * headroom + len(input_string)) // per_byte + 1)
+        self._base = self._lo = headroom
+        self._hi = headroom + len(input_string)
+        for i, symbol in enumerate(input_string):
+            self._write(headroom + i, self._encode(symbol))
+        self._pos = self._lo + head_pos
+        # fingerprint, see track_fingerprint()
+        self._zkeys = None
+        self._zhash = 0
+
+    def _read(self, i):
+        """Returns code of cell i of the buffer."""
+        shift = (i & ((1 << self._cell_shift) - 1)) * self._bits
+        return (self._buffer[i >> self._cell_shift] >> shift) & self._mask
+
+    def _write(self, i, code):
+        """Set cell i of the buffer to code."""
+        shift = (i & ((1 << self._cell_shift) - 1)) * self._bits
+        j = i >> self._cell_shift
+        self._buffer[j] = (self._buffer[j] & ~(self._mask << shift) & 0xff) | (code << shift)
+
+    def _get_cells(self, lo, hi):
+        """Returns list of the Symbols in buffer positions lo to hi - 1."""
+        symbols = self._symbols
+        return [symbols[self._read(i)] for i in xrange(lo, hi)]
+
+    def current_symbol(self):
+        """Returns Symbol on tape at head position."""
+        if self._pos < self._lo or self._pos >= self._hi:
+            return self.blank
+        return self._symbols[self._read(self._pos)]
+
+    def do(self, input, output, direction):
+        """Performs instruction of transition function, see Tape.do().
+        @raise TmException: if input isn't under the head, or output or direction are
+            not allowed
+        """
+        current = self.current_symbol()
+        if (current != input
+            or not direction in (Tape.LEFT, Tape.RIGHT, Tape.STAY)
+            or output not in self._alphabet_set):
+            raise TmException("Tape.do(): bad instruction: (input=%s, output=%s, direction=%d)\n"
+                              "Tape: %s" % (input, output, direction,
+                                            [str(s) for s in self.contents]))
+        if self._zkeys is not None:
+            pos = self._pos - self._base
+            self._zhash ^= self._zkeys.cell(pos, current) ^ self._zkeys.cell(pos, output)
+
+        if self._pos < self._lo or self._pos >= self._hi:
+            self._adjust_tape()
+        if output != current:
+            self._write(self._pos, self._codes[output])
+        self._pos += direction
+        if self._pos < self._lo or self._pos >= self._hi:
+            self._adjust_tape()
+
+    def _adjust_tape(self):
+        """Extend the known tape to include the head position, growing the buffer by at
+        least its current size, in whole bytes, if the head is off either end.
+        """
+        cells = len(self._buffer) << self._cell_shift
+        if self._pos < 0:
+            grow = max(cells, -self._pos)
+            grow += -grow % (1 << self._cell_shift)
+            self._buffer[0:0] = bytearray(grow >> self._cell_shift)
+            self._base += grow
+            self._lo += grow
+            self._hi += grow
+            self._pos += grow
+        elif self._pos >= cells:
+            grow = max(cells, self._pos - cells + 1)
+            self._buffer.extend(bytearray((grow >> self._cell_shift) + 1))
+        # cells outside of known tape are always blank in buffer
+        if self._pos < self._lo:
+            self._lo = self._pos
+        elif self._pos >= self._hi:
+            self._hi = self._pos + 1
+
+    def fork(self):
+        """Returns a copy of this tape, which can then be changed independently."""
+        tape = copy.copy(self)
+        tape._buffer = bytearray(self._buffer)
+        return tape
+
+    def get_num_bytes(self):
+        """Returns size of the cell buffer in bytes."""
+        return len(self._buffer)
@@ -0,0 +1,226 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Copy-on-write paged tapes, so a configuration can be forked in constant time.
+
+A PagedTape keeps its cells in pages of PAGE_SIZE Symbols, numbered by position
+relative to the start of the input, position >> PAGE_BITS.  Pages are plain lists,
+shared by reference between tapes and freed by Python's reference counting when no
+tape uses them any more.  A tape only changes a page in place if it owns it, ie it
+made it or copied it since its last fork.  Writing to any other page copies just
+that page first.
+
+A fork freezes the tape's own pages into a snapshot, and the tape and the new fork
+both carry on with no pages of their own on top of it:
+
+    snapshot = (dict of page number -> page, parent snapshot, depth)
+
+Reading a page not in the tape's own dict looks it up the chain of snapshots and
+keeps a reference to it in the dict, so after a fork each tape pays once for each
+page it touches, and nothing for the rest.  Chains longer than MAX_DEPTH are
+flattened into one snapshot on the next fork.
+
+Input can also be a buffer of bytes, see init_buffer(), which is decoded a page at a
+time as it is read.  Pages that are only read are not kept.
+
+Usage:
+    execution = Execution(tm, '000111', tape_class=PagedTape)
+    execution.advance(10)
+    branch = execution.fork()
+'''
+
+from turing_machine import Tape, TmException
+
+class PagedTape(Tape):
+    """Tape with copy-on-write pages, see the module doc.  Positions in the buffer are
+    positions relative to the start of the input, so _base is always 0.
+    """
+    PAGE_BITS = 8
+    PAGE_SIZE = 1 << PAGE_BITS
+    # longest chain of snapshots before a fork flattens it
+    MAX_DEPTH = 16
+
+    def init_input(self, input_string, head_pos=0):
+        """Copy input string to tape, with the read/write head at head_pos.
+        @param input_string: list of Symbols
+        """
+        self._init_pages(input_string, 0)
+        self._pos = head_pos
+
+    def init_buffer(self, data, symbols):
+        """Input from a buffer of bytes, see Tape.init_buffer().  Pages are decoded 
+        from it as they are read, and only kept once they are written, so a large file 
+        can be mapped and run without being copied.
+        """
+        self._init_pages([], 0)
+        self._source = data
+        self._source_symbols = symbols
+        self._hi = len(data)
+        self._pos = 0
+
+    def restore(self, position, first, contents):
+        """Set contents and head position, see Tape.restore()."""
+        self._init_pages(contents, first)
+        self._pos = position
+
+    def _init_pages(self, contents, first):
+        """Set contents to list of Symbols starting at position first, with no
+        snapshot.
+        """
+        self._pages = {}
+        self._owned = set()
+        self._snapshot = None
+        # input buffer and its byte decoding, see init_buffer()
+        self._source = None
+        self._source_symbols = None
+        for i, symbol in enumerate(contents):
+            self._get_page(first + i, True)[(first + i) & (PagedTape.PAGE_SIZE - 1)] = symbol
+        self._base = 0
+        self._lo = first
+        self._hi = first + len(contents)
+        # page the head was last in, see _load_page()
+        self._page_number = None
+        self._page = None
+        self._page_owned = False
+        # fingerprint, see track_fingerprint()
+        self._zkeys = None
+        self._zhash = 0
+
+    def _get_page(self, position, write=False):
+        """Returns page holding position.
+        @param write: if True, the page is copied first if it isn't owned by this tape
+        """
+        number = position >> PagedTape.PAGE_BITS
+        page = self._pages.get(number)
+        if page is None:
+            snapshot = self._snapshot
+            while snapshot is not None and page is None:
+                page = snapshot[0].get(number)
+                snapshot = snapshot[1]
+            if page is None:
+                page = [self.blank] * PagedTape.PAGE_SIZE
+                if self._read_source(number, page) and not write:
+                    return page
+                self._owned.add(number)
+            self._pages[number] = page
+        if write and not number in self._owned:
+            page = self._pages[number] = list(page)
+            self._owned.add(number)
+        return page
+
+    def _read_source(self, number, page):
+        """Decode the input buffer's cells of page number into page.
+        @return: True if the page has any input cells
+        """
+        source = self._source
+        start = number << PagedTape.PAGE_BITS
+        if source is None or start + PagedTape.PAGE_SIZE <= 0 or start >= len(source):
+            return False
+        lo = max(start, 0)
+        hi = min(start + PagedTape.PAGE_SIZE, len(source))
+        symbols = self._source_symbols
+        page[lo - start:hi - start] = [symbols[b] for b in bytearray(source[lo:hi])]
+        return True
+
+    def _get_cells(self, lo, hi):
+        """Returns list of the Symbols in positions lo to hi - 1."""
+        cells = []
+        position = lo
+        while position < hi:
+            offset = position & (PagedTape.PAGE_SIZE - 1)
+            end = min(hi, position - offset + PagedTape.PAGE_SIZE)
+            cells.extend(self._get_page(position)[offset:offset + end - position])
+            position = end
+        return cells
+
+    def current_symbol(self):
+        """Returns Symbol on tape at head position."""
+        pos = self._pos
+        if pos < self._lo or pos >= self._hi:
+            return self.blank
+        if pos >> PagedTape.PAGE_BITS != self._page_number:
+            self._load_page()
+        return self._page[pos & (PagedTape.PAGE_SIZE - 1)]
+
+    def _load_page(self):
+        """Make the page the head is in the current page."""
+        self._page_number = self._pos >> PagedTape.PAGE_BITS
+        self._page = self._get_page(self._pos)
+        self._page_owned = self._page_number in self._owned
+
+    def do(self, input, output, direction):
+        """Performs instruction of transition function, see Tape.do().  Only the page
+        written to is copied, if it is shared with another tape.
+        @raise TmException: if input isn't under the head, or output or direction are
+            not allowed
+        """
+        current = self.current_symbol()
+        if (current != input
+            or not direction in (Tape.LEFT, Tape.RIGHT, Tape.STAY)
+            or output not in self._alphabet_set):
+            raise TmException("Tape.do(): bad instruction: (input=%s, output=%s, direction=%d)\n"
+                              "Tape: %s" % (input, output, direction,
+                                            [str(s) for s in self.contents]))
+        pos = self._pos
+        if self._zkeys is not None:
+            self._zhash ^= self._zkeys.cell(pos, current) ^ self._zkeys.cell(pos, output)
+        # cells outside of known tape are always blank in pages
+        if output != current:
+            if pos >> PagedTape.PAGE_BITS != self._page_number:
+                self._load_page()
+            if not self._page_owned:
+                self._page = self._get_page(pos, True)
+                self._page_owned = True
+            self._page[pos & (PagedTape.PAGE_SIZE - 1)] = output
+        # known tape always includes the head
+        if pos < self._lo:
+            self._lo = pos
+        elif pos >= self._hi:
+            self._hi = pos + 1
+        pos += direction
+        self._pos = pos
+        if pos < self._lo:
+            self._lo = pos
+        elif pos >= self._hi:
+            self._hi = pos + 1
+
+    def fork(self):
+        """Returns a copy of this tape in constant time.  The two share all their pages
+        until either of them writes to one.
+        """
+        if self._pages:
+            if self._snapshot is not None and self._snapshot[2] >= PagedTape.MAX_DEPTH:
+                self._snapshot = (self._flatten(), None, 1)
+            else:
+                depth = 1 if self._snapshot is None else self._snapshot[2] + 1
+                self._snapshot = (self._pages, self._snapshot, depth)
+            self._pages = {}
+            self._owned = set()
+            self._page_owned = False
+        tape = PagedTape.__new__(PagedTape)
+        tape.__dict__.update(self.__dict__)
+        tape._pages = {}
+        tape._owned = set()
+        return tape
+
+    def _flatten(self):
+        """Returns dict of all the pages of this tape."""
+        chain = []
+        snapshot = self._snapshot
+        while snapshot is not None:
+            chain.append(snapshot[0])
+            snapshot = snapshot[1]
+        pages = {}
+        for snapshot_pages in reversed(chain):
+            pages.update(snapshot_pages)
+        pages.update(self._pages)
+        return pages
+
+    def get_num_pages(self):
+        """Returns number of pages this tape has made or copied since its last fork."""
+        return len(self._owned)
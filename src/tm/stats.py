@@ -0,0 +1,157 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Counters of where a TM spends its steps: how often each delta function fires, how
+many steps are taken from each state, and how often a generated rejecting transition
+is taken, see TM.get_transition().
+
+Counting is off unless asked for.  Once TM.enable_stats() is called, every Execution
+of the machine counts each step into tm.stats, including runs in TM.run_many()
+workers, whose counters are merged back as their results come in.  With it off, a
+step costs one attribute test more.  The compiled and vectorized engines don't count.
+
+Delta functions are identified by their index in TM.delta_functions, as in trace
+files, so counters from different runs or processes of the same machine can be merged,
+and saved and loaded as JSON.
+
+Usage:
+    stats = tm.enable_stats()
+    tm.run('000111', True)
+    stats.top_transitions(5)
+    stats.write_csv(open('m4.csv', 'w'))
+'''
+
+import collections
+import csv
+import json
+
+from turing_machine import TmException
+
+try:
+    Counter = collections.Counter
+except AttributeError:
+    # python 2.6, just what is used here
+    class Counter(dict):
+        def __missing__(self, key):
+            return 0
+
+        def update(self, other):
+            for key, count in other.items():
+                self[key] += count
+
+        def most_common(self, n=None):
+            items = sorted(self.items(), key=lambda item: item[1], reverse=True)
+            if n is None:
+                return items
+            return items[:n]
+
+class TmStats(object):
+    """Step counters of a TM, see the module doc."""
+    def __init__(self, tm):
+        """@param tm: TM whose steps are counted, only its delta functions are kept, as
+            strings
+        """
+        # str() of each delta function, in order of tm.delta_functions
+        self.labels = [str(d) for d in tm.delta_functions or []]
+        # start state of each delta function
+        self.label_states = [d.start_state for d in tm.delta_functions or []]
+        # delta function index -> times taken
+        self.transitions = Counter()
+        # state -> steps taken from it
+        self.states = Counter()
+        # (state, tuple of input symbol strings) -> times the generated rejecting
+        # transition was taken for them
+        self.rejects = Counter()
+
+    def count(self, state, index, delta):
+        """Count one step from state.
+        @param index: index of the delta function taken, None for a generated rejecting
+            transition
+        @param delta: the DeltaFunc taken
+        """
+        self.states[state] += 1
+        if index is None:
+            self.rejects[(state, tuple([str(s) for s in delta.inputs]))] += 1
+        else:
+            self.transitions[index] += 1
+
+    def get_steps(self):
+        """Returns total number of steps counted."""
+        return sum(self.states.values())
+
+    def get_reject_count(self):
+        """Returns number of generated rejecting transitions taken."""
+        return sum(self.rejects.values())
+
+    def top_transitions(self, n=None):
+        """Returns list of (count, delta function string) of the n delta functions taken
+        most, most first, all of them if n is None.
+        """
+        return [(count, self.labels[index])
+                for index, count in self.transitions.most_common(n)]
+
+    def merge(self, other):
+        """Add the counters of other, eg from another run or a worker process, to these.
+        @raise TmException: if other counts a different machine
+        """
+        if other.labels != self.labels:
+            raise TmException("TmStats.merge(): counters are for a different machine")
+        self.transitions.update(other.transitions)
+        self.states.update(other.states)
+        self.rejects.update(other.rejects)
+
+    def clear(self):
+        """Reset all counters to 0."""
+        self.transitions.clear()
+        self.states.clear()
+        self.rejects.clear()
+
+    def to_json(self):
+        """Returns the counters as a JSON string, see from_json()."""
+        return json.dumps({
+            'transitions': [[i, self.labels[i], count]
+                            for i, count in sorted(self.transitions.items())],
+            'states': sorted(self.states.items()),
+            'rejects': [[state, list(inputs), count]
+                        for (state, inputs), count in sorted(self.rejects.items())],
+            'labels': self.labels,
+            'label_states': self.label_states,
+        }, indent=1)
+
+    @classmethod
+    def from_json(cls, s):
+        """Returns TmStats from a to_json() string."""
+        data = json.loads(s)
+        stats = cls.__new__(cls)
+        stats.labels = [str(label) for label in data['labels']]
+        stats.label_states = [str(state) for state in data['label_states']]
+        stats.transitions = Counter()
+        for index, _, count in data['transitions']:
+            stats.transitions[index] = count
+        stats.states = Counter()
+        for state, count in data['states']:
+            stats.states[str(state)] = count
+        stats.rejects = Counter()
+        for state, inputs, count in data['rejects']:
+            stats.rejects[(str(state), tuple([str(s) for s in inputs]))] = count
+        return stats
+
+    def write_csv(self, outfile):
+        """Write the counters to file outfile as CSV, with a header row, then one row per
+        counter: kind ("transition", "reject" or "state"), state, delta function index,
+        delta function or input symbols, count.  Rows of each kind are most counted first.
+        """
+        writer = csv.writer(outfile)
+        writer.writerow(['kind', 'state', 'index', 'transition', 'count'])
+        for index, count in self.transitions.most_common():
+            writer.writerow(['transition', self.label_states[index], index, 
+                             self.labels[index], count])
+        for (state, inputs), count in self.rejects.most_common():
+            writer.writerow(['reject', state, '', ' '.join(inputs), count])
+        for state, count in self.states.most_common():
+            writer.writerow(['state', state, '', '', count])
@@ -0,0 +1,268 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Compact binary execution traces of a TM, with random access to the configuration
+at any step.
+
+File layout, all integers little endian:
+
+    header      magic 'TMTRACE1', uint32 length of metadata, metadata as JSON:
+                states, symbols (as (base, super, sub)), goto state id of each delta
+                function, num_tapes, keyframe_interval, symbol code size
+    keyframe 0  configuration before the first step
+    records     one fixed width record per step 1 .. K
+    keyframe K  configuration after step K
+    records     steps K+1 .. 2K
+    ...
+    index       uint32 count, then (uint64 step, uint64 file offset) of each keyframe
+    footer      uint64 offset of index, uint64 number of steps, magic 'TMTRIDX1'
+
+A step record is the uint32 index of the delta function taken in TM.delta_functions
+(0xffffffff for a generated rejecting transition), then for each tape the code of the
+symbol written and the head move as int8.  A keyframe is uint64 step, uint32 state id,
+and for each tape int64 head position and int64 position of the first cell (relative
+to the start of the input, see Tape.get_position()), uint32 number of cells, then the
+cell codes.
+
+To get the configuration at step n, TraceReader memory maps the file, finds the last
+keyframe at or before n in the index, and applies at most keyframe_interval records.
+
+Usage:
+    record_trace(tm, '000111', 'm4.trace')
+    reader = TraceReader('m4.trace')
+    state, tapes = reader.configuration(12)
+'''
+
+import bisect
+import json
+import mmap
+import struct
+
+from turing_machine import Symbol, TmException
+
+MAGIC = 'TMTRACE1'
+INDEX_MAGIC = 'TMTRIDX1'
+# transition id for a generated rejecting transition
+REJECT_TRANSITION = 0xffffffff
+
+_header = struct.Struct('<8sI')
+_footer = struct.Struct('<QQ8s')
+_keyframe = struct.Struct('<QI')
+_keyframe_tape = struct.Struct('<qqI')
+_index_entry = struct.Struct('<QQ')
+
+
+def _record_struct(num_tapes, code_size):
+    """Returns Struct for a step record."""
+    code = 'B' if code_size == 1 else 'H'
+    return struct.Struct('<I' + (code + 'b') * num_tapes)
+
+
+class TraceWriter(object):
+    """Writes StepRecords of a TM to a trace file.  Create it with the machine in the
+    configuration the trace starts from, eg after TM.reset(), then call record() with
+    each StepRecord as the machine steps, and close() at the end.
+    """
+    def __init__(self, tm, path, keyframe_interval=4096):
+        """@param tm: TM to trace, in its starting configuration
+        @param path: file to write
+        @param keyframe_interval: number of steps between full configurations
+        """
+        self.tm = tm
+        self.keyframe_interval = keyframe_interval
+        # ids of states and codes of symbols, blank is 0
+        self.states = [tm.start_state, tm.accept_state, tm.reject_state]
+        for state in tm.get_states() + [d.goto_state for d in tm.delta_functions]:
+            if not state in self.states:
+                self.states.append(state)
+        self.state_ids = dict([(state, i) for i, state in enumerate(self.states)])
+        self.symbols = []
+        self.codes = {}
+        for symbol in ([tm.blank_symbol] + [s for t in tm.tapes for s in t.alphabet] +
+                       [s for t in tm.tapes for s in t.contents]):
+            if not symbol in self.codes:
+                self.codes[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        self.code_size = 1 if len(self.symbols) <= 256 else 2
+        self.record_struct = _record_struct(tm.num_tapes, self.code_size)
+        # DeltaFunc -> transition id
+        self.transition_ids = dict([(id(d), i) for i, d in enumerate(tm.delta_functions)])
+
+        metadata = {'states': self.states,
+                    'symbols': [(s.base, s.super, s.sub) for s in self.symbols],
+                    'gotos': [self.state_ids[d.goto_state] for d in tm.delta_functions],
+                    'reject': self.state_ids[tm.reject_state],
+                    'num_tapes': tm.num_tapes,
+                    'keyframe_interval': keyframe_interval,
+                    'code_size': self.code_size}
+        metadata = json.dumps(metadata)
+        self.file = open(path, 'wb')
+        self.file.write(_header.pack(MAGIC, len(metadata)))
+        self.file.write(metadata)
+        self.index = []
+        self.steps = tm.step_count
+        self.write_keyframe()
+
+    def write_keyframe(self):
+        """Write the current configuration of the machine as a keyframe."""
+        tm = self.tm
+        self.index.append((self.steps, self.file.tell()))
+        self.file.write(_keyframe.pack(self.steps, self.state_ids[tm.state]))
+        code_char = 'B' if self.code_size == 1 else 'H'
+        for tape in tm.tapes:
+            contents = tape.contents
+            first = tape.get_position() - tape.head_pos
+            self.file.write(_keyframe_tape.pack(tape.get_position(), first, len(contents)))
+            codes = [self.codes[s] for s in contents]
+            self.file.write(struct.pack('<%d%s' % (len(codes), code_char), *codes))
+
+    def record(self, record):
+        """Write a step.
+        @param record: StepRecord of the step just taken by the machine
+        """
+        transition = self.transition_ids.get(id(record.delta), REJECT_TRANSITION)
+        values = [transition]
+        for symbol, direction in zip(record.written, record.delta.directions):
+            values.append(self.codes[symbol])
+            values.append(direction)
+        self.file.write(self.record_struct.pack(*values))
+        self.steps = record.step
+        if self.steps % self.keyframe_interval == 0:
+            self.write_keyframe()
+
+    def close(self):
+        """Write the index and footer and close the file."""
+        index_offset = self.file.tell()
+        self.file.write(struct.pack('<I', len(self.index)))
+        for step, offset in self.index:
+            self.file.write(_index_entry.pack(step, offset))
+        self.file.write(_footer.pack(index_offset, self.steps, INDEX_MAGIC))
+        self.file.close()
+
+
+def record_trace(tm, input_string, path, keyframe_interval=4096, max_steps=None):
+    """Run tm on input_string, writing a trace of every step to path.
+    @param max_steps: stop after this many steps if the machine hasn't halted
+    @return: number of steps traced
+    """
+    tm.reset(input_string)
+    writer = TraceWriter(tm, path, keyframe_interval)
+    try:
+        for record in tm.steps():
+            writer.record(record)
+            if max_steps is not None and record.step >= max_steps:
+                break
+    finally:
+        writer.close()
+    return writer.steps
+
+
+class TraceReader(object):
+    """Random access to the steps and configurations of a trace file written by
+    TraceWriter.  The file is memory mapped, so only the parts used are read.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _header.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise TmException("TraceReader: not a trace file: %s" % path)
+        metadata = json.loads(self.data[_header.size:_header.size + length])
+        self.states = [str(s) for s in metadata['states']]
+        self.symbols = [Symbol(*[None if x is None else str(x) for x in s])
+                        for s in metadata['symbols']]
+        self.gotos = metadata['gotos']
+        self.reject = metadata['reject']
+        self.num_tapes = metadata['num_tapes']
+        self.keyframe_interval = metadata['keyframe_interval']
+        self.code_size = metadata['code_size']
+        self.record_struct = _record_struct(self.num_tapes, self.code_size)
+
+        index_offset, self.num_steps, magic = _footer.unpack_from(self.data,
+                                                                   len(self.data) - _footer.size)
+        if magic != INDEX_MAGIC:
+            raise TmException("TraceReader: trace file not closed: %s" % path)
+        count, = struct.unpack_from('<I', self.data, index_offset)
+        self.index = [_index_entry.unpack_from(self.data, index_offset + 4 + i * _index_entry.size)
+                      for i in range(count)]
+        self.index_steps = [step for step, offset in self.index]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def _read_keyframe(self, offset):
+        """Returns (step, state id, tapes, offset of first record after keyframe), where
+        tapes is a list of [head position, first position, list of codes].
+        """
+        step, state = _keyframe.unpack_from(self.data, offset)
+        offset += _keyframe.size
+        code_char = 'B' if self.code_size == 1 else 'H'
+        tapes = []
+        for _ in range(self.num_tapes):
+            head, first, n = _keyframe_tape.unpack_from(self.data, offset)
+            offset += _keyframe_tape.size
+            codes = list(struct.unpack_from('<%d%s' % (n, code_char), self.data, offset))
+            offset += n * self.code_size
+            tapes.append([head, first, codes])
+        return step, state, tapes, offset
+
+    def _keyframe_before(self, n):
+        """Returns index entry of last keyframe at or before step n."""
+        if n < self.index_steps[0] or n > self.num_steps:
+            raise TmException("TraceReader: no step %d, trace has %d steps" % (n, self.num_steps))
+        return self.index[max(0, bisect.bisect_right(self.index_steps, n) - 1)]
+
+    def step(self, n):
+        """Returns step n, starting at 1, as (transition id, tuple of codes written,
+        tuple of head moves).  Transition id indexes TM.delta_functions, or is
+        REJECT_TRANSITION.
+        @raise TmException: if there is no step n
+        """
+        if n < 1 or n > self.num_steps:
+            raise TmException("TraceReader: no step %d, trace has %d steps" % (n, self.num_steps))
+        keyframe_step, offset = self._keyframe_before(n - 1)
+        offset = self._read_keyframe(offset)[3]
+        values = self.record_struct.unpack_from(self.data,
+                    offset + (n - keyframe_step - 1) * self.record_struct.size)
+        return values[0], values[1::2], values[2::2]
+
+    def configuration(self, n):
+        """Returns the configuration after step n (n = 0 is the start), as
+        (state, tapes) where tapes is a list of (head position, first position, list of
+        Symbols), positions being relative to the start of the input.
+        """
+        keyframe_step, offset = self._keyframe_before(n)
+        step, state, tapes, offset = self._read_keyframe(offset)
+        record_size = self.record_struct.size
+        # blank is code 0
+        blank = 0
+        for _ in range(n - step):
+            values = self.record_struct.unpack_from(self.data, offset)
+            offset += record_size
+            transition = values[0]
+            state = self.reject if transition == REJECT_TRANSITION else self.gotos[transition]
+            for t in range(self.num_tapes):
+                # as in Tape, known tape always includes head
+                tape = tapes[t]
+                head, first, codes = tape
+                if not codes:
+                    codes.append(blank)
+                    first = head
+                codes[head - first] = values[1 + 2 * t]
+                head += values[2 + 2 * t]
+                if head < first:
+                    codes.insert(0, blank)
+                    first = head
+                elif head - first == len(codes):
+                    codes.append(blank)
+                tape[0] = head
+                tape[1] = first
+        return (self.states[state],
+                [(head, first, [self.symbols[c] for c in codes]) for head, first, codes in tapes])
+
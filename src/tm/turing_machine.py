@@ -43,6 +43,9 @@ can be inferred from the nature of the alphabet.  So marking a 0 in gamma2 in a
 be input as:
 q3 0    q4 .0    r
 
+Anything after the directions on a delta function line is ignored, so it can end in a comment:
+q3 0    q4 .0    r    # mark the 0
+
 which would be represented as:
 
                    
@@ -85,16 +88,48 @@ whether or not the string is in the language of the input Turing Machine.
 If no Turing Machine file is given, the trivial Turing Machine that 
 decides the language over {0, 1} where all strings start with 0 is used.  
 See example files in tm_files for input file specification for Turing
-Machines. """
+Machines. 
+With --stream, reads one input string per line from stdin, or the file given
+as arg, and writes a line for each as it is run: line number, verdict, steps 
+and tape cells used, tab separated. """
 
 import os, sys
 import optparse
 import subprocess
 import re
+import random
+import time
+import collections
+import marshal
+import array
+import hashlib
+import copy
+import itertools
+import multiprocessing
+import mmap
+import gc
+import tempfile
 
 class TmException(Exception): pass
 
-class Symbol:
+class TmParseError(TmException):
+    """Error in a machine description, see TM.init(), with the line number it is on."""
+    def __init__(self, message, lineno=None):
+        """@param lineno: line number, starting at 1, or None if not known"""
+        if lineno is not None:
+            message = 'line %d: %s' % (lineno, message)
+        TmException.__init__(self, message)
+        self.lineno = lineno
+
+# input types that are read as bytes, a cell at a time as the tape needs them, rather 
+# than copied into a list of Symbols, see Execution.reset()
+try:
+    BUFFER_TYPES = (bytearray, memoryview, buffer, mmap.mmap)
+except NameError:
+    # python 2.6 has no memoryview
+    BUFFER_TYPES = (bytearray, buffer, mmap.mmap)
+
+class Symbol(object):
     """Symbol for an alphabet.  Consists of a base symbol and optional super or
     sub symbols that go above or below it conceptually and on output.  On input,
     a left to right order indicates top to bottom.
@@ -123,19 +158,222 @@ class Symbol:
         """Inequality operator.
         """
         return not self.__eq__(other)
+    
+    def __hash__(self):
+        """Hash consistent with equality, so Symbols can be used as dictionary keys,
+        eg in the transition index of a TM.
+        """
+        return hash((self.base, self.super, self.sub))
+
+class RunResult(str):
+    """Result of TM.run().  It is the verdict string, "accept", "reject", "loop" or 
+    "limit", or "error" from TM.run_many(), so it can be compared to or printed as a 
+    string, with details of the run as attributes.
+    """
+    def __new__(cls, verdict, steps=0, tape_cells=0, cycle_start=None, cycle_period=None, 
+                limit=None, error=None, tape_extents=None, elapsed=None, tapes=None):
+        """@param verdict: "accept", "reject", "loop", "limit" or "error"
+        @param steps: number of transitions taken
+        @param tape_cells: number of tape cells used, over all tapes
+        @param cycle_start: for "loop", the step at which the machine is first in a 
+            configuration that repeats forever
+        @param cycle_period: for "loop", the number of steps in the cycle
+        @param limit: for "limit", which limit was exceeded: "max_steps", 
+            "max_tape_cells", "deadline", or "max_frontier" for TM.run_ntm()
+        @param error: for "error", message of the exception the run raised
+        @param tape_extents: tuple of the number of cells used on each tape
+        @param elapsed: seconds the run took
+        @param tapes: tuple of TapeContents, the final contents of each tape, if they
+            were asked to be kept, see TM.run()
+        """
+        result = str.__new__(cls, verdict)
+        result.verdict = verdict
+        result.steps = steps
+        result.tape_cells = tape_cells
+        result.cycle_start = cycle_start
+        result.cycle_period = cycle_period
+        result.limit = limit
+        result.error = error
+        result.tape_extents = tape_extents
+        result.elapsed = elapsed
+        result.tapes = tapes
+        return result
+    
+class TapeContents(object):
+    """Final contents of a tape, for RunResult.  The cells, trimmed of blanks at both
+    ends, are kept as an array of one or two byte codes that index symbols, and are only
+    turned back into Symbols if asked for, see get_symbols().
+    From a tape, see from_tape(), the cells are only read when the contents are first
+    asked for, or pickled.
+    """
+    # cells read from a tape at a time
+    READ_CHUNK = 1 << 16
+
+    def __init__(self, head, first, codes, symbols):
+        """@param head: head position, relative to the start of the input as for
+            Tape.get_position()
+        @param first: position of the first cell of codes
+        @param codes: array.array of codes
+        @param symbols: list of Symbols, symbols[code] is the Symbol for code, and
+            symbols[0] is blank
+        """
+        self._tape = None
+        self._contents = (head, first, codes, symbols)
+
+    @classmethod
+    def from_tape(cls, tape):
+        """Returns TapeContents of Tape tape, as it is now.  This keeps a fork of the tape,
+        which for a PagedTape is constant time, and reads it when it is first needed.
+        Codes are in the order of tape's alphabet, after the blank.
+        """
+        contents = cls(None, None, None, None)
+        contents._tape = tape.fork()
+        contents._contents = None
+        return contents
+
+    def _get_contents(self):
+        """Returns (head, first, codes, symbols), reading them from the tape if not yet
+        read.
+        """
+        if self._contents is None:
+            self._contents = self._read_tape(self._tape)
+            self._tape = None
+        return self._contents
+
+    def _read_tape(self, tape):
+        """Returns (head, first, codes, symbols) of tape, reading its cells a chunk at a
+        time straight into codes, so a tape with a large input buffer, see PagedTape,
+        is never all decoded to Symbols at once.
+        """
+        symbols = [tape.blank] + [s for s in tape.alphabet if s != tape.blank]
+        code_of = dict([(s, i) for i, s in enumerate(symbols)])
+        codes = array.array('B' if len(symbols) <= 256 else 'H')
+        # buffer position of the first non-blank, and length of codes to its last
+        first = None
+        end = 0
+        position = tape._lo
+        while position < tape._hi:
+            chunk = tape._get_cells(position, min(position + TapeContents.READ_CHUNK,
+                                                  tape._hi))
+            for symbol in chunk:
+                code = code_of.get(symbol)
+                if code is None:
+                    code = code_of[symbol] = len(symbols)
+                    symbols.append(symbol)
+                    if len(symbols) == 257 and codes.typecode == 'B':
+                        codes = array.array('H', codes)
+                if code:
+                    if first is None:
+                        first = position
+                    codes.append(code)
+                    end = len(codes)
+                elif first is not None:
+                    codes.append(code)
+                position += 1
+        del codes[end:]
+        head = tape._pos - tape._base
+        return head, head if first is None else first - tape._base, codes, symbols
+
+    def __getstate__(self):
+        # the tape is read rather than pickled, eg for TM.run_many()
+        return {'_tape': None, '_contents': self._get_contents()}
+
+    def _get_head(self):
+        return self._get_contents()[0]
 
-class Tape:
+    def _get_first(self):
+        return self._get_contents()[1]
+
+    def _get_codes(self):
+        return self._get_contents()[2]
+
+    def _get_symbols_list(self):
+        return self._get_contents()[3]
+
+    head = property(_get_head, doc="""head position, see __init__()""")
+    first = property(_get_first, doc="""position of the first cell of codes""")
+    codes = property(_get_codes, doc="""array.array of codes""")
+    symbols = property(_get_symbols_list, doc="""list of Symbols, indexed by code""")
+
+    def __len__(self):
+        return len(self.codes)
+    
+    def get_symbols(self):
+        """Returns the contents as a list of Symbols."""
+        symbols = self.symbols
+        return [symbols[c] for c in self.codes]
+    
+    def __str__(self):
+        """Returns the contents as a string, the Symbols written as in delta functions,
+        eg '.01' for a marked 0 then a 1.
+        """
+        return ''.join([str(s) for s in self.get_symbols()])
+    
+# Record of one step of a TM, see TM.steps():
+# step - number of the step, starting at 1
+# state - state the transition was taken from
+# delta - DeltaFunc taken
+# head_positions - tuple of head position of each tape after the step, see Tape.get_position()
+# written - tuple of Symbol written on each tape
+StepRecord = collections.namedtuple('StepRecord', 'step state delta head_positions written')
+
+class ZobristKeys(object):
+    """Random 64 bit keys for Zobrist hashing of tape cells and head positions,
+    generated as needed.  A tape's fingerprint is the xor of the keys for each of its
+    (position, symbol) cells, updated on every write, so it costs constant time per step.  
+    Blank cells have a key of 0, so growing the known tape doesn't change it.  Tapes whose 
+    fingerprints are to be compared must share the same keys.
+    """
+    def __init__(self, blank, rng=random):
+        """@param blank: blank Symbol
+        @param rng: source of random bits, random module or a random.Random
+        """
+        self.blank = blank
+        self.rng = rng
+        self.keys = {}
+        
+    def cell(self, pos, symbol):
+        """Returns key for symbol at position pos, relative to start of input."""
+        if symbol == self.blank:
+            return 0
+        return self._key((pos, symbol))
+    
+    def head(self, pos):
+        """Returns key for read/write head at position pos."""
+        return self._key((pos, None))
+    
+    def _key(self, k):
+        key = self.keys.get(k)
+        if key is None:
+            key = self.keys[k] = self.rng.getrandbits(64)
+        return key
+
+class Tape(object):
     """Turing machine tape.  Has an alphabet, keeps track of head position,
     contents.  The alphabet is a list of Symbols. Acts on instructions in the form 
     of ('read_symbol', 'write_symbol', direction).  Assumes list of symbols given 
     as contents are bounded on left and right by infinite number of blanks.  Can 
     define any alphabet, but must contain the Tape.blank symbol.
     Can use Stay for direction if desired.
+    
+    The known part of the tape is kept in a buffer list with blank headroom on both
+    ends, which is grown geometrically when the head runs off either end, so moving
+    and writing past the edges is amortized constant time.  contents and head_pos
+    are computed from positions in the buffer:
+    _lo, _hi - bounds of known tape, ie contents == _cells[_lo:_hi]
+    _pos - head position
+    _base - position of the first cell of the input, which doesn't move
+    Positions relative to _base are used for the fingerprint, see track_fingerprint().
+    Other than in the methods that take steps, the buffer is only read through
+    _get_cells(), so a subclass can keep cells differently, see PagedTape in the paged
+    module.
     """
     # head movement directions
     RIGHT = 1
     LEFT = -1
     STAY = 0
+    # minimum blank headroom on each end of buffer
+    MIN_HEADROOM = 16
     def __init__(self, alphabet=[Symbol('B'), Symbol('0'), Symbol('1')], 
                  blank=Symbol('B'), contents=None, head_pos=0):
         """alphabet and contents are described above,
@@ -144,18 +382,67 @@ class Tape:
         """
         self.blank = blank
         self.alphabet = alphabet
-        self.contents = [] if contents is None else contents
-        self.head_pos = head_pos
+        self.init_input([] if contents is None else contents, head_pos)
         self.symbol_height = self.get_symbol_height()
         
+    def _get_alphabet(self):
+        return self._alphabet
+    
+    def _set_alphabet(self, alphabet):
+        self._alphabet = alphabet
+        # for membership tests in do()
+        self._alphabet_set = set(alphabet)
+        # for parse_symbol()
+        self._base_chars = set([symbol.base for symbol in alphabet])
+        # for get_string_contents()
+        self._glyphs = {}
+        
+    alphabet = property(_get_alphabet, _set_alphabet, 
+                        doc="""list of Symbols, assign a new list rather than modifying in place""")
+    
+    def _get_contents(self):
+        return self._get_cells(self._lo, self._hi)
+    
+    def _set_contents(self, contents):
+        self.init_input(contents, self.head_pos)
+        
+    contents = property(_get_contents, _set_contents, 
+                        doc="""copy of known part of tape as list of Symbols""")
+    
+    def _get_head_pos(self):
+        return self._pos - self._lo
+    
+    def _set_head_pos(self, head_pos):
+        self._pos = self._lo + head_pos
+        
+    head_pos = property(_get_head_pos, _set_head_pos, 
+                        doc="""index in contents of symbol under the read/write head""")
+        
     def init_input(self, input_string, head_pos=0):
         """Copy input string to tape. Tape contents will be initialized as a list with
         the read/write head at head_pos.
         @param input_string: list of Symbols 
         """
-        # deep copy of input
-        self.contents = input_string[:]
-        self.head_pos = head_pos
+        # deep copy of input, with headroom
+        headroom = max(Tape.MIN_HEADROOM, len(input_string) // 2)
+        self._cells = [self.blank] * headroom
+        self._cells.extend(input_string)
+        self._cells.extend([self.blank] * headroom)
+        self._base = self._lo = headroom
+        self._hi = headroom + len(input_string)
+        self._pos = self._lo + head_pos
+        # fingerprint, see track_fingerprint()
+        self._zkeys = None
+        self._zhash = 0
+        
+    def init_buffer(self, data, symbols):
+        """Copy input from a buffer of bytes to tape, with the read/write head at the
+        first byte.  This decodes all of it, see PagedTape for a tape that only decodes
+        the parts that are read.
+        @param data: one of BUFFER_TYPES
+        @param symbols: list of 256 Symbols, symbols[b] is the Symbol for byte b
+        """
+        self.init_input([symbols[b] for b in bytearray(data[:])])
         
     def init_alphabet(self, alphabet):
         """Use to init an alphabet after construction.
@@ -167,7 +454,7 @@ class Tape:
         """Clear this tape's contents.  Contents list will be empty afterword.
         Logically, it will contain an infinite number of blanks.
         """
-        self.contents = []
+        self.init_input([], self.head_pos)
     
     def alpha_has_supers(self):
         """Returns true if any symbols in alphabet have super."""
@@ -202,72 +489,128 @@ class Tape:
             return 1
         return 0
     
-    def get_string_contents(self, head_pos_char):
+    def get_string_contents(self, head_pos_char, start=0, end=None):
         """Returns contents as a list of strings of length equal to symbol_height.
         The list has the strings from top to bottom, formatted to include the head pos
         character before the head position in the line with the base symbols.  The lines
         are synced with each other vertically.  
+        Only the cells in contents[start:end] are formatted, so long tapes can be shown
+        as a window around the head.
         @param head_pos_char: assume single character, but could be string,
         will be just to left of head position 
+        @param start, end: slice of contents to format, default is all of it
         """
-        # array of lines - top down, could be: supers, base, subs; supers, base;
-        #     base, subs; base
+        if end is None:
+            end = self._hi - self._lo
+        cells = self._get_cells(self._lo + start, min(self._lo + end, self._hi))
+        if not cells:
+            return [''] * self.symbol_height
+        # head position in cells
+        head = self.head_pos - start
+        # each line is the column of characters of each symbol for that line, separated
+        # by spaces, except the head pos char goes in the space right before the symbol in
+        # the head pos: a little crowded, but tape positions are not shifted at all due
+        # to its presence.  A blank is put at the start of all lines if the head is not 
+        # at the first cell, which keeps lines from shifting when it is.
+        base = self.get_base_line_index()
         lines = []
-        for _ in range(self.symbol_height):
-            lines.append('')
-        supers = subs = None
-        if self.alpha_has_supers():
-            supers = 0
-            base = 1
-        else:
-            base = 0
-        if self.alpha_has_subs():
-            subs = base + 1
-        # move from right to left across all lines simultaneously
-        # note this style puts the head position char in the space right before
-        # the symbol in the head pos: a little crowded, but tape positions are
-        # not shifted at all due to its presence
-        
-        # add blank to beginning of all lines if head char. position is not 0
-        # keeps lines from shifting when head char is at pos 0
-        if self.head_pos != 0:
-            for i in range(len(lines)):
-                lines[i] += ' '
-        for i in range(len(self.contents)):
-            # handle head character position
-            if i == self.head_pos:
-                if not supers is None: 
-                    if i != 0: lines[supers] = lines[supers][:-1]
-                    lines[supers] += ' ' * len(head_pos_char)
-                if not subs is None: 
-                    if i != 0: lines[subs] = lines[subs][:-1]
-                    lines[subs] += ' ' * len(head_pos_char)
-                if i != 0: lines[base] = lines[base][:-1]
-                lines[base] += head_pos_char
-            sym = self.contents[i]
-            if not supers is None:
-                s = ' ' if sym.super is None else sym.super 
-                lines[supers] += s + ' '
-            if not subs is None:
-                s = ' ' if sym.sub is None else sym.sub 
-                lines[subs] += s + ' '
-            lines[base] += sym.base + ' '
-#            print "len(lines[supers]): %s, len(lines[base]): %s" % (len(lines[supers]), len(lines[base]))
-        
-        # sanity check
-        width = len(lines[0])
-        for line in lines: assert len(line) == width, "uneven lines in get_string_contents"
-        
-        # trim last blank
-        lines = [line[:-1] for line in lines]
+        for i, column in enumerate(zip(*[self._get_glyphs(s) for s in cells])):
+            if 0 <= head < len(cells):
+                head_sep = head_pos_char if i == base else ' ' * len(head_pos_char)
+                if head == 0:
+                    parts = [head_sep, ' '.join(column)]
+                else:
+                    parts = [' ', ' '.join(column[:head]), head_sep, ' '.join(column[head:])]
+            else:
+                parts = [' ', ' '.join(column)]
+            lines.append(''.join(parts))
         return lines
     
+    def _get_glyphs(self, symbol):
+        """Returns tuple of the characters of symbol on each line of get_string_contents(),
+        top to bottom.  These are cached per Symbol, and the cache is cleared when the 
+        alphabet changes.
+        """
+        glyphs = self._glyphs.get(symbol)
+        if glyphs is None:
+            glyphs = []
+            if self.alpha_has_supers():
+                glyphs.append(' ' if symbol.super is None else symbol.super)
+            glyphs.append(symbol.base)
+            if self.alpha_has_subs():
+                glyphs.append(' ' if symbol.sub is None else symbol.sub)
+            glyphs = self._glyphs[symbol] = tuple(glyphs)
+        return glyphs
+    
+    def restore(self, position, first, contents):
+        """Set contents and head position, with positions relative to the start of the 
+        input as for get_position(), eg to restore a saved configuration.
+        @param position: head position
+        @param first: position of the first cell of contents
+        @param contents: list of Symbols
+        """
+        self.init_input(contents, position - first)
+        self._base = self._lo - first
+    
+    def get_position(self):
+        """Returns head position relative to the first cell of the input, which
+        unlike head_pos doesn't change when the known tape grows to the left.
+        """
+        return self._pos - self._base
+    
+    def get_num_cells(self):
+        """Returns number of cells in the known tape."""
+        return self._hi - self._lo
+    
     def current_symbol(self):
         """Returns Symbol on tape at head position.
         """
-        if self.head_pos < 0 or self.head_pos > len(self.contents)-1:
+        if self._pos < self._lo or self._pos >= self._hi:
             return self.blank
-        return self.contents[self.head_pos]
+        return self._cells[self._pos]
+    
+    def track_fingerprint(self, keys):
+        """Start keeping a Zobrist hash of the tape contents, updated by do().
+        Stops when the tape is reinitialized.
+        @param keys: ZobristKeys, shared by tapes to be compared
+        """
+        self._zkeys = keys
+        self._zhash = 0
+        for i, symbol in enumerate(self._get_cells(self._lo, self._hi)):
+            self._zhash ^= keys.cell(self._lo + i - self._base, symbol)
+            
+    def fingerprint(self):
+        """Returns hash of contents and head position, see track_fingerprint().
+        Equal configurations have equal fingerprints, unequal ones almost certainly don't.
+        """
+        return self._zhash ^ self._zkeys.head(self._pos - self._base)
+    
+    def get_configuration(self):
+        """Returns tuple that is equal for tapes with the same contents and head position
+        relative to the start of the input:
+        (head position, position of first non-blank, tuple of symbols trimmed of blanks)
+        """
+        cells = self._get_cells(self._lo, self._hi)
+        lo, hi = 0, len(cells)
+        while lo < hi and cells[lo] == self.blank:
+            lo += 1
+        while hi > lo and cells[hi-1] == self.blank:
+            hi -= 1
+        return (self._pos - self._base, self._lo + lo - self._base, tuple(cells[lo:hi]))
+    
+    def _get_cells(self, lo, hi):
+        """Returns list of the Symbols in buffer positions lo to hi - 1, which are in the
+        known tape.
+        """
+        return self._cells[lo:hi]
+    
+    def fork(self):
+        """Returns a copy of this tape, which can then be changed independently.  This 
+        copies the buffer, see PagedTape for tapes that share their cells instead.
+        """
+        tape = copy.copy(self)
+        tape._cells = list(self._cells)
+        return tape
     
     def do(self, input, output, direction):
         """Performs instruction of transition function, checking that input matches character 
@@ -276,41 +619,51 @@ class Tape:
         @param input: current char/string in alphabet at head position
         @param output: char/string in alphabet to write at head position
         @param direction: one of { Tape.RIGHT, Tape.LEFT, Tape.STAY }
+        @raise TmException: if input isn't under the head, or output or direction are 
+            not allowed
         """
-        if (self.current_symbol() != input 
+        current = self.current_symbol()
+        if (current != input 
             or not direction in (Tape.LEFT, Tape.RIGHT, Tape.STAY)
-            or output not in self.alphabet):
-            print "Tape.do(): bad instruction: (input=%s, output=%s, direction=%d)" % (input, output,
-                                                                                       direction)
-            print "Tape: %s" % self.get_contents()
-            sys.exit(1)
+            or output not in self._alphabet_set):
+            raise TmException("Tape.do(): bad instruction: (input=%s, output=%s, direction=%d)\n"
+                              "Tape: %s" % (input, output, direction, 
+                                            [str(s) for s in self.contents]))
+        if self._zkeys is not None:
+            pos = self._pos - self._base
+            self._zhash ^= self._zkeys.cell(pos, current) ^ self._zkeys.cell(pos, output)
         
         # need to check if we need to change the tape
-        if self.head_pos < 0 or self.head_pos > len(self.contents)-1:
+        if self._pos < self._lo or self._pos >= self._hi:
             self._adjust_tape()
-        self.contents[self.head_pos] = output
-        self.head_pos += direction
+        self._cells[self._pos] = output
+        self._pos += direction
         # check tape again
-        if self.head_pos < 0 or self.head_pos > len(self.contents)-1:
+        if self._pos < self._lo or self._pos >= self._hi:
             self._adjust_tape()
         
     def _adjust_tape(self):
-        """Tape is a list bounded by blanks, if we need to write a non-blank onto a blank  
-        off either end of the known tape, we need to increase the boundaries to include it.
-        Note: could change this to be a dictionary, then it wouldn't matter..
-        """
-        if self.head_pos < 0:
-            # shift known tape to left
-            new_tape = []
-            for i in range(self.head_pos, 0):
-                new_tape.append(self.blank)
-            self.contents = new_tape + self.contents
-        elif self.head_pos > len(self.contents)-1:
-            # add to known tape on right
-            new_tape = []
-            for i in range(len(self.contents)-1, self.head_pos+1):
-                new_tape.append(self.blank)
-            self.contents += new_tape
+        """Extend the known tape to include the head position.  If the head is off
+        either end of the buffer, the buffer is grown on that end by at least its
+        current size, so this is amortized constant time.
+        """
+        if self._pos < 0:
+            # grow buffer to left, all positions shift
+            grow = max(len(self._cells), -self._pos)
+            self._cells[0:0] = [self.blank] * grow
+            self._base += grow
+            self._lo += grow
+            self._hi += grow
+            self._pos += grow
+        elif self._pos >= len(self._cells):
+            # grow buffer to right
+            grow = max(len(self._cells), self._pos - len(self._cells) + 1)
+            self._cells.extend([self.blank] * grow)
+        # cells outside of known tape are always blank in buffer
+        if self._pos < self._lo:
+            self._lo = self._pos
+        elif self._pos >= self._hi:
+            self._hi = self._pos + 1
             
     def parse_symbol(self, str_symbol):
         """Returns Symbol object from string version of symbol, inferring from 
@@ -333,11 +686,10 @@ class Tape:
             sub = str_symbol[2]
         elif len(str_symbol) == 2:
             first, second = str_symbol[0], str_symbol[1]
-            base_chars = [symbol.base for symbol in self.alphabet]
-            if first in base_chars:
+            if first in self._base_chars:
                 base = first
                 sub = second
-            elif second in base_chars:
+            elif second in self._base_chars:
                 super = first
                 base = second
             else:
@@ -347,7 +699,70 @@ class Tape:
         
         return Symbol(base, super, sub)
 
-class DeltaFunc:
+class LoopDetector(object):
+    """Detects a TM running in a cycle of configurations with Brent's algorithm.
+    A checkpoint configuration is kept, and moved to the current configuration after 
+    1, 2, 4, 8, .. steps.  Every step the current configuration is compared to the 
+    checkpoint, first by fingerprint, then exactly if the fingerprints match.  So a cycle 
+    is found within a small multiple of (cycle start + cycle period) steps, and only one 
+    configuration is stored.  A machine that runs forever without repeating a configuration,
+    eg by moving right forever, is not detected.
+    """
+    def __init__(self, num_tapes, blank):
+        rng = random.Random()
+        self.rng = rng
+        self.tape_keys = [ZobristKeys(blank, rng) for _ in range(num_tapes)]
+        self.state_keys = {}
+        
+    def track(self, tapes):
+        """Start fingerprinting list of tapes, must be in current configuration."""
+        for tape, keys in zip(tapes, self.tape_keys):
+            tape.track_fingerprint(keys)
+            
+    def fingerprint(self, state, tapes):
+        """Returns fingerprint of configuration."""
+        fp = self.state_keys.get(state)
+        if fp is None:
+            fp = self.state_keys[state] = self.rng.getrandbits(64)
+        for tape in tapes:
+            fp ^= tape.fingerprint()
+        return fp
+    
+    def same(self, state1, tapes1, state2, tapes2):
+        """Returns True if the two configurations are equal."""
+        if self.fingerprint(state1, tapes1) != self.fingerprint(state2, tapes2):
+            return False
+        return (state1 == state2 and [t.get_configuration() for t in tapes1] == 
+                [t.get_configuration() for t in tapes2])
+            
+    def start(self, state, tapes, steps=0):
+        """Start looking for a cycle, from current configuration.
+        @param steps: number of steps already taken, eg by a resumed execution
+        """
+        self.track(tapes)
+        self.start_step = steps
+        self._set_checkpoint(state, tapes, steps)
+        
+    def _set_checkpoint(self, state, tapes, steps):
+        self.checkpoint_step = steps
+        self.checkpoint_fp = self.fingerprint(state, tapes)
+        self.checkpoint = (state, [t.get_configuration() for t in tapes])
+        # 1, 2, 4, 8, .. steps after the start
+        self.next_checkpoint = steps + max(1, steps - self.start_step)
+        
+    def check(self, state, tapes, steps):
+        """Check configuration after a step.
+        @param steps: number of steps taken
+        @return: cycle period if the configuration is the same as the checkpoint, else None
+        """
+        if (self.fingerprint(state, tapes) == self.checkpoint_fp and 
+            (state, [t.get_configuration() for t in tapes]) == self.checkpoint):
+            return steps - self.checkpoint_step
+        if steps == self.next_checkpoint:
+            self._set_checkpoint(state, tapes, steps)
+        return None
+
+class DeltaFunc(object):
     def __init__(self, tm, start=None, inputs=None, goto=None, outputs=None, directions=None):
         """Encapsulates a transition, assumes multitape, so inputs, outputs, and directions
         are lists of length equal to the number of tapes in order of tapes, with first being 
@@ -457,11 +872,490 @@ class DeltaFunc:
         return ret
         
       
-class TM:
+class Execution(object):
+    """One run of a TM: the current state, tapes, step count and input.  The TM is
+    only read while running, so one TM can have any number of executions going at
+    once, eg in separate threads.
+    """
+    def __init__(self, tm, input_string=None, tapes=None, tape_class=None):
+        """@param tm: TM to run
+        @param input_string: if given, reset() to this input
+        @param tapes: list of Tapes to run on, default is new tapes with the alphabets
+            of tm's tapes
+        @param tape_class: class of the new tapes, default Tape, eg PagedTape in the 
+            paged module, so fork() is constant time, or PackedTape in the packed module
+            for long tapes over small alphabets
+        """
+        self.tm = tm
+        if tapes is None:
+            if tape_class is None:
+                tape_class = Tape
+                if isinstance(input_string, BUFFER_TYPES):
+                    # only decode the parts of the input that are read
+                    from paged import PagedTape
+                    tape_class = PagedTape
+            tapes = [tape_class(t.alphabet, t.blank) for t in tm.tapes]
+        self.tapes = tapes
+        # current state
+        self.state = None
+        # steps taken, and the input as list of Symbols or a buffer, see reset()
+        self.step_count = 0
+        self.input_symbols = []
+        if input_string is not None:
+            self.reset(input_string)
+    
+    def reset(self, input_string):
+        """Put machine in its start configuration with input_string on the input tape,
+        ready for step(), steps() or advance().
+        @param input_string: string, which is translated into Symbols, or list of Symbols,
+            or one of BUFFER_TYPES, eg an mmap of a file, whose bytes are translated as
+            the tape reads them, see TM.get_byte_symbols()
+        """
+        if isinstance(input_string, BUFFER_TYPES):
+            self.input_symbols = input_string
+            self.tapes[0].init_buffer(input_string, self.tm.get_byte_symbols())
+            symbol_string = None
+        elif isinstance(input_string, basestring):
+            symbol_string = [Symbol(s) for s in input_string]
+        else:
+            symbol_string = list(input_string)
+        
+        # check input_string's members are in alphabet
+#        for member in input_string:
+#            if not member in self.alphabet:
+#                print "TM.run(): input not in alphabet. \nInput: %s" % input_string
+#                print "Alphabet: %s" % str(self.alphabet)
+#                sys.exit(1)
+        if symbol_string is not None:
+            self.input_symbols = symbol_string
+            self.tapes[0].init_input(symbol_string)
+        for i in range(1, self.tm.num_tapes):
+            self.tapes[i].init_input([])
+        self.state = self.tm.start_state
+        self.step_count = 0
+        
+    def get_input_symbols(self):
+        """Returns the input as a list of Symbols, decoding it if it is a buffer."""
+        if isinstance(self.input_symbols, BUFFER_TYPES):
+            symbols = self.tm.get_byte_symbols()
+            return [symbols[b] for b in bytearray(self.input_symbols[:])]
+        return self.input_symbols
+    
+    def is_halted(self):
+        """Returns True if machine is in the accept or reject state."""
+        return self.state in (self.tm.accept_state, self.tm.reject_state)
+    
+    def fork(self):
+        """Returns a new Execution in the same configuration, that can then be stepped 
+        independently of this one.  This costs a copy of the tapes, unless they are 
+        PagedTapes, which share their cells until they are written.
+        """
+        execution = Execution(self.tm, tapes=[t.fork() for t in self.tapes])
+        execution.state = self.state
+        execution.step_count = self.step_count
+        execution.input_symbols = self.input_symbols
+        return execution
+    
+    def step(self):
+        """Take one transition from the current configuration.
+        @return: the DeltaFunc taken
+        """
+        delta = self.tm.get_transition(self.state, [t.current_symbol() for t in self.tapes])
+        if self.tm.stats is not None:
+            self.tm.stats.count(self.state, self.tm.delta_ids.get(delta), delta)
+        for i in range(len(self.tapes)):
+            self.tapes[i].do(delta.inputs[i], delta.outputs[i], delta.directions[i])
+        self.state = delta.goto_state
+        self.step_count += 1
+        return delta
+    
+    def steps(self, input_string=None):
+        """Generator of a StepRecord for each step taken, from the current configuration 
+        until the machine halts.  Steps are only taken as records are asked for.
+        @param input_string: if given, reset() to this input first
+        """
+        if input_string is not None:
+            self.reset(input_string)
+        while not self.is_halted():
+            state = self.state
+            delta = self.step()
+            yield StepRecord(self.step_count, state, delta, 
+                             tuple([t.get_position() for t in self.tapes]), tuple(delta.outputs))
+            
+    def advance(self, n):
+        """Take up to n steps, stopping if the machine halts, without making step records.
+        @return: number of steps taken
+        """
+        start = self.step_count
+        while self.step_count - start < n and not self.is_halted():
+            self.step()
+        return self.step_count - start
+    
+    def print_steps(self, records):
+        """Generator that prints the machine state and tapes before each record from
+        records is taken, passing the records on.  This is the verbose output of run().
+        @param records: iterator of StepRecords for this execution, eg steps()
+        """
+        # character to use to fill line with in between printouts of
+        # state and input tape contents
+        line_delim_char = '-'
+        while not self.is_halted():
+            state_str_list = self.get_str_state()
+            print '\n'.join(state_str_list)
+            print line_delim_char * len(state_str_list[0])
+            yield records.next()
+        
+    def get_num_cells(self):
+        """Returns number of tape cells used, over all tapes."""
+        return sum([t.get_num_cells() for t in self.tapes])
+    
+    def run(self, quiet=False, detect_loops=False, max_steps=None, max_tape_cells=None, 
+            deadline=None, checkpoint=None, checkpoint_interval=1000000, keep_tapes=False):
+        """Run from the current configuration until halted or stopped, parameters are
+        as for TM.run().
+        @return: RunResult, "accept", "reject", "loop" or "limit"
+        @raise TmException: if checkpoint is given and checkpoint_interval isn't a positive 
+            int
+        """
+        tm = self.tm
+        if checkpoint is not None and (not isinstance(checkpoint_interval, (int, long)) 
+                                       or checkpoint_interval < 1):
+            raise TmException("run(): checkpoint_interval should be a positive int: %r" 
+                              % (checkpoint_interval,))
+        # verbose output is done by consuming step records, otherwise just step
+        records = None
+        if not quiet:
+            records = self.print_steps(self.steps())
+        detector = None
+        if detect_loops:
+            detector = LoopDetector(tm.num_tapes, tm.blank_symbol)
+            detector.start(self.state, self.tapes, self.step_count)
+        start_time = time.time()
+        if deadline is not None:
+            deadline += start_time
+        result = None
+        while not self.is_halted():
+            # limits
+            limit = None
+            if max_steps is not None and self.step_count >= max_steps:
+                limit = 'max_steps'
+            elif max_tape_cells is not None and self.get_num_cells() > max_tape_cells:
+                limit = 'max_tape_cells'
+            elif (deadline is not None and self.step_count % TM.CLOCK_CHECK_STEPS == 0 
+                  and time.time() > deadline):
+                limit = 'deadline'
+            if limit:
+                result = RunResult('limit', self.step_count, self.get_num_cells(), limit=limit)
+                break
+            if records is None:
+                self.step()
+            else:
+                records.next()
+            if detector:
+                period = detector.check(self.state, self.tapes, self.step_count)
+                if period:
+                    start = self._find_cycle_start(period, detector)
+                    result = RunResult('loop', self.step_count, self.get_num_cells(), 
+                                       start, period)
+                    break
+            if checkpoint is not None and self.step_count % checkpoint_interval == 0:
+                self.save_checkpoint(checkpoint)
+        
+        if result is None:
+            if self.state == tm.accept_state:
+                result = RunResult('accept', self.step_count, self.get_num_cells())
+            elif self.state == tm.reject_state:
+                result = RunResult('reject', self.step_count, self.get_num_cells())
+            else:
+                print "TM.run(): error, end loop without accepting or rejecting"
+        result.tape_extents = tuple([t.get_num_cells() for t in self.tapes])
+        if keep_tapes:
+            result.tapes = tuple([TapeContents.from_tape(t) for t in self.tapes])
+        result.elapsed = time.time() - start_time
+        
+        if not quiet:    
+            print result
+            if result == 'loop':
+                print "cycle start: step %d, cycle period: %d steps" % (result.cycle_start, 
+                                                                        result.cycle_period)
+            elif result == 'limit':
+                print "%s exceeded after %d steps" % (result.limit, result.steps)
+        
+        return result
+    
+    def save_checkpoint(self, path):
+        """Save the current configuration: state, step count, input and every tape's 
+        contents and head position, to file path, for load_checkpoint().  Tape cells are 
+        stored as one or two byte codes.  The file is replaced atomically, so an 
+        interrupted save leaves the previous checkpoint.
+        """
+        symbols = []
+        codes = {}
+        input_symbols = self.get_input_symbols()
+        tapes = [(t.get_position(), t.get_position() - t.head_pos, t.contents) 
+                 for t in self.tapes]
+        for symbol in input_symbols + [s for tape in tapes for s in tape[2]]:
+            if not symbol in codes:
+                codes[symbol] = len(symbols)
+                symbols.append(symbol)
+        typecode = 'B' if len(symbols) <= 256 else 'H'
+        def encode(contents):
+            return array.array(typecode, [codes[s] for s in contents]).tostring()
+        data = (TM.CHECKPOINT_VERSION, self.tm.get_checkpoint_id(), self.state, self.step_count,
+                [(s.base, s.super, s.sub) for s in symbols], typecode, 
+                encode(input_symbols),
+                [(position, first, encode(contents)) for position, first, contents in tapes])
+        tmp = path + '.tmp'
+        f = open(tmp, 'wb')
+        try:
+            marshal.dump(data, f)
+        finally:
+            f.close()
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp, path)
+        
+    def load_checkpoint(self, path):
+        """Restore a configuration saved by save_checkpoint().  Nothing is changed if the
+        file can't be loaded.
+        @raise TmException: if the file is not a checkpoint of this machine, or is damaged
+        """
+        f = open(path, 'rb')
+        try:
+            data = marshal.load(f)
+        except (EOFError, ValueError, TypeError):
+            raise TmException("load_checkpoint(): not a checkpoint file: %s" % path)
+        finally:
+            f.close()
+        if not isinstance(data, tuple) or len(data) != 8 or data[0] != TM.CHECKPOINT_VERSION:
+            raise TmException("load_checkpoint(): not a checkpoint file: %s" % path)
+        if data[1] != self.tm.get_checkpoint_id():
+            raise TmException("load_checkpoint(): %s is not a checkpoint of this machine" % path)
+        _, _, state, step_count, symbols, typecode, input_codes, tapes = data
+        try:
+            if (not isinstance(state, str) or not isinstance(step_count, (int, long)) 
+                or step_count < 0 or not typecode in ('B', 'H') 
+                or not isinstance(tapes, list) or len(tapes) != len(self.tapes)):
+                raise ValueError("bad layout")
+            symbols = [Symbol(*s) for s in symbols]
+            def decode(codes):
+                return [symbols[c] for c in array.array(typecode, codes)]
+            input_symbols = decode(input_codes)
+            contents = []
+            for position, first, codes in tapes:
+                if not isinstance(position, (int, long)) or not isinstance(first, (int, long)):
+                    raise ValueError("bad tape position")
+                contents.append((position, first, decode(codes)))
+        except (IndexError, ValueError, TypeError):
+            raise TmException("load_checkpoint(): damaged checkpoint file: %s" % path)
+        self.state = state
+        self.step_count = step_count
+        self.input_symbols = input_symbols
+        for tape, (position, first, cells) in zip(self.tapes, contents):
+            tape.restore(position, first, cells)
+    
+    def _find_cycle_start(self, period, detector):
+        """Returns the first step at which the machine is in a configuration that it
+        returns to period steps later.  Reruns the machine from the start in two 
+        executions, one period steps ahead of the other, until they are the same.
+        This execution is left as is.
+        @raise TmException: if there is no such step before this execution's step count,
+            which can only be if it wasn't run from its input
+        """
+        tape_class = type(self.tapes[0])
+        behind = Execution(self.tm, tape_class=tape_class)
+        ahead = Execution(self.tm, tape_class=tape_class)
+        for execution in (behind, ahead):
+            execution.reset(self.input_symbols)
+            detector.track(execution.tapes)
+        ahead.advance(period)
+        start = 0
+        while not detector.same(behind.state, behind.tapes, ahead.state, ahead.tapes):
+            if start + period >= self.step_count:
+                raise TmException("run(): no cycle of period %d from the input" % period)
+            behind.step()
+            ahead.step()
+            start += 1
+        return start
+
+    def get_str_state(self):
+        """Return terse version of machine state as list of strings, one per line.
+        The first has current state and tape[0] contents, then tape contents of
+        remaining tapes on further lines with all tapes vertically aligned.
+        Tapes with more than TM.view_cells cells are shown as a window of that many cells 
+        around the head.
+        """
+        retlist = []
+        for j in range(len(self.tapes)):
+            # long tapes are shown as a window of view_cells around the head
+            tape = self.tapes[j]
+            start, end = 0, tape.get_num_cells()
+            if end > self.tm.view_cells:
+                start = max(0, min(tape.head_pos - self.tm.view_cells // 2, end - self.tm.view_cells))
+                end = start + self.tm.view_cells
+            tape_contents = tape.get_string_contents(self.tm.head_pos_indicator, start, end)
+            
+            retstr = ''
+            spaces = ' ' * len(self.state)
+            for i in range(len(tape_contents)):
+                if j==0 and i == self.tapes[j].get_base_line_index():
+                    s = self.state
+                else:
+                    s = spaces
+                retstr += "%-6s %s\n" % (s, tape_contents[i])
+            retlist.append( retstr.rstrip() )
+        return retlist
+
+# Values of the name = value lines of a TM.init() file are read with a tokenizer rather
+# than eval(), and can only be literals: strings, integers, None, Symbol(..) and lists and
+# tuples of them.  A # outside a string starts a comment.
+_value_token = re.compile(r"""\s*(?:('[^']*'|"[^"]*")|(-?\d+)|([A-Za-z_]\w*)|([\[\](),])|(#.*)|(\S))""")
+_value_names = {'None': None, 'True': True, 'False': False}
+
+def _tokenize_value(text, lineno):
+    """Returns list of (kind, text) tokens of text, kind is 'str', 'int', 'name' or 
+    'punct'.
+    @raise TmParseError: for a character that can't start a token
+    """
+    tokens = []
+    for string, number, name, punct, comment, bad in _value_token.findall(text):
+        if string:
+            tokens.append(('str', string[1:-1]))
+        elif number:
+            tokens.append(('int', number))
+        elif name:
+            tokens.append(('name', name))
+        elif punct:
+            tokens.append(('punct', punct))
+        elif comment:
+            break
+        elif bad:
+            raise TmParseError("unexpected character: %s" % bad, lineno)
+    return tokens
+
+def _parse_value(tokens, lineno):
+    """Returns the value of a list of _tokenize_value() tokens, tuples with a single item
+    and no comma are that item, as in python.
+    @raise TmParseError: if they aren't one literal
+    """
+    value, i = _parse_item(tokens, 0, lineno)
+    if i != len(tokens):
+        raise TmParseError("unexpected %s after value" % tokens[i][1], lineno)
+    return value
+
+def _parse_item(tokens, i, lineno):
+    """Returns (value of the item starting at tokens[i], index of the token after it)."""
+    if i >= len(tokens):
+        raise TmParseError("value missing", lineno)
+    kind, text = tokens[i]
+    if kind == 'str':
+        return text, i + 1
+    if kind == 'int':
+        return int(text), i + 1
+    if kind == 'name':
+        if text in _value_names:
+            return _value_names[text], i + 1
+        if text == 'Symbol' and i + 1 < len(tokens) and tokens[i + 1][1] == '(':
+            args, i, _ = _parse_sequence(tokens, i + 2, ')', lineno)
+            return _make_symbol(tuple(args), lineno), i
+        raise TmParseError("unknown name: %s" % text, lineno)
+    if text == '[':
+        items, i, _ = _parse_sequence(tokens, i + 1, ']', lineno)
+        return items, i
+    if text == '(':
+        items, i, comma = _parse_sequence(tokens, i + 1, ')', lineno)
+        if len(items) == 1 and not comma:
+            return items[0], i
+        return tuple(items), i
+    raise TmParseError("unexpected %s" % text, lineno)
+
+def _parse_sequence(tokens, i, close, lineno):
+    """Returns (list of the comma separated items from tokens[i] up to close, index of the 
+    token after close, True if there was a comma).
+    """
+    items = []
+    comma = False
+    while i < len(tokens) and tokens[i][1] != close:
+        item, i = _parse_item(tokens, i, lineno)
+        items.append(item)
+        if i < len(tokens) and tokens[i][1] == ',':
+            comma = True
+            i += 1
+        elif i < len(tokens) and tokens[i][1] != close:
+            raise TmParseError("expected , or %s, not %s" % (close, tokens[i][1]), lineno)
+    if i >= len(tokens):
+        raise TmParseError("missing %s" % close, lineno)
+    return items, i + 1, comma
+
+def _make_symbol(value, lineno):
+    """Returns Symbol for a value from an init() file: a Symbol, or a string or tuple of
+    up to 3 strings that are the arguments of Symbol(), eg ('0', '.').
+    @raise TmParseError: if it isn't one of those
+    """
+    if isinstance(value, Symbol):
+        return value
+    if isinstance(value, basestring):
+        value = tuple(value)
+    if (not isinstance(value, tuple) or not 1 <= len(value) <= 3 
+        or [v for v in value if not (v is None or isinstance(v, basestring))]):
+        raise TmParseError("not a symbol: %r" % (value,), lineno)
+    return Symbol(*value)
+
+def _encode_setting(value):
+    """Returns value of a setting with its Symbols as (base, super, sub) tuples, which 
+    _make_symbol() takes back, for marshal.
+    """
+    if isinstance(value, Symbol):
+        return (value.base, value.super, value.sub)
+    if isinstance(value, list):
+        return [_encode_setting(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple([_encode_setting(v) for v in value])
+    return value
+
+def _without_gc(func, *args):
+    """Returns func(*args), with the cyclic garbage collector paused.  For loading large
+    machines: the many objects made are none of them garbage, and the collector going 
+    over them again and again would make loading superlinear.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return func(*args)
+    finally:
+        if collecting:
+            gc.enable()
+
+def _make_alphabet(value, lineno):
+    """Returns list of Symbols for a list of _make_symbol() values.
+    @raise TmParseError: if it isn't a list of them
+    """
+    if not isinstance(value, list):
+        raise TmParseError("alphabet should be a list of symbols: %r" % (value,), lineno)
+    return [_make_symbol(v, lineno) for v in value]
+
+
+class TM(object):
     """Turing Machine with multiple tapes possible.  Always assume that the first
     tape is the input tape.  So regular machine has tape list of length 1.
     Note that all tapes use the same blank symbol, kept as an attribute of the tm.
     """
+    # how often run() looks at the clock when it has a deadline
+    CLOCK_CHECK_STEPS = 1024
+    # format of save_checkpoint() files
+    CHECKPOINT_VERSION = 1
+    # run_many() sizes chunks of inputs to take about this many seconds in a worker,
+    # up to RUN_MANY_MAX_CHUNK inputs, with at most this many chunks per worker queued
+    RUN_MANY_CHUNK_SECONDS = 0.1
+    RUN_MANY_MAX_CHUNK = 10000
+    RUN_MANY_CHUNKS_PER_WORKER = 2
+    # init() keeps machines loaded from sources of at least CACHE_MIN_BYTES in this 
+    # directory, None for no cache, see get_cache_path()
+    CACHE_DIR = os.environ.get('TM_CACHE_DIR', 
+                               os.path.join(os.path.expanduser('~'), '.cache', 'turing_machine'))
+    CACHE_MIN_BYTES = 8192
+    # format of cache files
+    CACHE_VERSION = 1
     def __init__(self, description='', 
                  start_state='q0', accept_state='q1', reject_state='q2',  
                  alphabet=[Symbol('0'), Symbol('1')], num_tapes=1, tape_alphabets=None, 
@@ -495,6 +1389,8 @@ class TM:
         else:
             for _ in range(self.num_tapes):
                 self.tapes.append( Tape(blank=self.blank_symbol) )
+        # the TM's own execution, on its tapes, see reset()
+        self.execution = Execution(self, tapes=self.tapes)
             
         self.start_state = start_state
         self.accept_state = accept_state
@@ -503,77 +1399,234 @@ class TM:
         # description of tm
         self.description = description
         
-        # current state
-        self.state = None
-        
         # all delta funcs
         self.delta_functions = None
+        # (state, tuple of input symbols) -> DeltaFunc, see build_delta_index()
+        self.delta_index = {}
+        # (state, tuple of input symbols) -> list of all DeltaFuncs for it
+        self.delta_choices = {}
+        # implicitly generated rejecting transitions, same keys as delta_index
+        self.reject_deltas = {}
+        # DeltaFunc -> its index in delta_functions
+        self.delta_ids = {}
+        # start state -> list of its DeltaFuncs, and start states in order of first
+        # delta function, see build_delta_index()
+        self.state_deltas = {}
+        self.delta_states = []
+        # step counters, see enable_stats()
+        self.stats = None
+        # string to indicate read/write head position in state output
+        self.head_pos_indicator = '>'
+        # max number of cells of each tape shown in state output
+        self.view_cells = 36
         
-        # init from source - file or string (see init())
+        # init from source - file or string (see init()), after the defaults, as it can
+        # set any of TM.SETTINGS
         if not init_source is None:
             self.init(init_source)
-        
-        # string to indicate read/write head position in state output
-        self.head_pos_indicator = '>'
 
 
-    def run(self, input_string, quiet=False):
+    def run(self, input_string, quiet=False, detect_loops=False, 
+            max_steps=None, max_tape_cells=None, deadline=None,
+            checkpoint=None, checkpoint_interval=1000000, tape_class=None, keep_tapes=False):
         """Run TM on input_string.
         Can take input as string, but translates into Symbols.
         If input alphabet has complex symbols in it (ie they contain supers or subs)
         then input string should be a list of symbols.
+        Input can also be bytes in one of BUFFER_TYPES, eg an mmap of a large file, which
+        are translated to Symbols as the input tape reads them, see Execution.reset().
+        The run is a new Execution, so the TM is not changed and can be run on other 
+        inputs at the same time.
         Returns string of results.
         @param quiet: if True, does not print anything. 
-        @return: "accept", or "reject"
+        @param detect_loops: if True, stop with "loop" if the machine repeats a
+            configuration, see LoopDetector
+        @param max_steps: stop with "limit" if the machine hasn't halted after this 
+            many steps
+        @param max_tape_cells: stop with "limit" if the machine uses more than this 
+            many tape cells, over all tapes
+        @param deadline: stop with "limit" if the machine hasn't halted after this many
+            seconds of wall-clock time, checked every CLOCK_CHECK_STEPS steps
+        @param checkpoint: file to save_checkpoint() to every checkpoint_interval steps,
+            the run can be continued from it with resume()
+        @param tape_class: class of tapes to run on, see Execution, eg PackedTape for 
+            very long tapes
+        @param keep_tapes: if True, the result's tapes are the final contents of the 
+            tapes, see TapeContents, else they are None
+        @return: RunResult, "accept", "reject", "loop" or "limit"
         """
-        if isinstance(input_string, basestring):
-            symbol_string = [Symbol(s) for s in input_string]
-        else:
-            raise TmException('run(): implement symbol string input')
-        
-        # check input_string's members are in alphabet
-#        for member in input_string:
-#            if not member in self.alphabet:
-#                print "TM.run(): input not in alphabet. \nInput: %s" % input_string
-#                print "Alphabet: %s" % str(self.alphabet)
-#                sys.exit(1)
+        execution = Execution(self, input_string, tape_class=tape_class)
         if not quiet:
             print 'Tape read/write head position = "%s"' % self.head_pos_indicator
             print "Input:"
             print "%s \n" % input_string 
             print 'State  Tape'
         
-        # string containing state and tape contents
-        state_string = ''
-        # character to use to fill line with in between printouts of
-        # state and input tape contents
-        line_delim_char = '-'
-        self.tapes[0].init_input(symbol_string)
-        for i in range(1, self.num_tapes):
-            self.tapes[i].clear()
-        self.state = self.start_state
-        while self.state not in (self.accept_state, self.reject_state):
-            state_str_list = self.get_str_state()
-            if not quiet:
-                print '\n'.join(state_str_list)
-                print line_delim_char * len(state_str_list[0])
-            # symbols under head of each tape
-            current_symbols = [t.current_symbol() for t in self.tapes]
-            self.handle_transition(current_symbols)
-        
-        result = ''
-        if self.state == self.accept_state:
-            result = 'accept'
-        elif self.state == self.reject_state:
-            result = 'reject'
-        else:
-            print "TM.run(): error, end loop without accepting or rejecting"
+        return execution.run(quiet, detect_loops, max_steps, max_tape_cells, deadline, 
+                             checkpoint, checkpoint_interval, keep_tapes)
+    
+    def resume(self, checkpoint, quiet=False, detect_loops=False, 
+               max_steps=None, max_tape_cells=None, deadline=None, checkpoint_interval=1000000,
+               keep_tapes=False):
+        """Continue a run from a file saved by run() with checkpoint, or save_checkpoint().
+        Parameters are as for run(), the checkpoint file continues to be saved every
+        checkpoint_interval steps (None for never), and max_steps counts the steps before 
+        the checkpoint too.
+        @return: RunResult, "accept", "reject", "loop" or "limit"
+        """
+        execution = Execution(self)
+        execution.load_checkpoint(checkpoint)
+        if not quiet:
+            print 'Resuming at step %d' % execution.step_count
+            print 'State  Tape'
+        if checkpoint_interval is None:
+            checkpoint = None
+        return execution.run(quiet, detect_loops, max_steps, max_tape_cells, deadline, 
+                             checkpoint, checkpoint_interval, keep_tapes)
+    
+    def run_many(self, inputs, workers=None, detect_loops=False, 
+                 max_steps=None, max_tape_cells=None, deadline=None, keep_tapes=False):
+        """Run TM quietly on each of inputs, in a pool of worker processes.
+        The machine is sent to each worker once, when it starts, then inputs are sent in 
+        chunks, sized as the run goes to take about RUN_MANY_CHUNK_SECONDS each.  Only a
+        few chunks per worker are queued at a time, so inputs can be a long or endless
+        iterator.
+        A run that raises an exception, eg for an input symbol not in the tape alphabet, 
+        gives an "error" RunResult with the message as its error attribute, and the other
+        inputs carry on.
+        @param inputs: iterable of input strings, or lists of Symbols, see run()
+        @param workers: number of worker processes, default is the number of cpus, 1 runs
+            in this process
+        @param detect_loops, max_steps, max_tape_cells, deadline, keep_tapes: as for run(), 
+            deadline is per input.  Kept tapes are read and sent back with the results
+        @return: iterator of RunResults, in the order of inputs
+        """
+        options = (detect_loops, max_steps, max_tape_cells, deadline, keep_tapes)
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if workers <= 1:
+            return itertools.imap(lambda input_string: self._run_isolated(input_string, options), 
+                                  inputs)
+        return self._run_pool(iter(inputs), workers, options)
+    
+    def _run_pool(self, inputs, workers, options):
+        """Generator of run_many() results from a pool of worker processes."""
+        pool = multiprocessing.Pool(workers, _init_worker, (self, options))
+        try:
+            # chunks sent to workers, in order of inputs
+            pending = collections.deque()
+            chunk_size = 1
+            while True:
+                while len(pending) < workers * TM.RUN_MANY_CHUNKS_PER_WORKER:
+                    chunk = list(itertools.islice(inputs, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.apply_async(_run_chunk, (chunk,)))
+                if not pending:
+                    break
+                results, seconds, stats = pending.popleft().get()
+                if stats is not None:
+                    self.stats.merge(stats)
+                target = chunk_size * 2
+                if seconds > 0:
+                    target = int(TM.RUN_MANY_CHUNK_SECONDS * len(results) / seconds)
+                # grow at most double, so one fast chunk doesn't make the next one huge
+                chunk_size = max(1, min(target, chunk_size * 2, TM.RUN_MANY_MAX_CHUNK))
+                for result in results:
+                    yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    
+    def _run_isolated(self, input_string, options):
+        """Quietly run input_string, see run_many(), catching any exception as an "error"
+        RunResult.
+        @param options: (detect_loops, max_steps, max_tape_cells, deadline, keep_tapes)
+        """
+        detect_loops, max_steps, max_tape_cells, deadline, keep_tapes = options
+        execution = Execution(self)
+        try:
+            execution.reset(input_string)
+            return execution.run(True, detect_loops, max_steps, max_tape_cells, deadline,
+                                 keep_tapes=keep_tapes)
+        except Exception, e:
+            return RunResult('error', execution.step_count, execution.get_num_cells(), 
+                             error='%s: %s' % (e.__class__.__name__, e))
+    
+    def get_checkpoint_id(self):
+        """Returns hash identifying this machine's tapes and delta functions, so checkpoints
+        are only loaded by the same machine.
+        """
+        return hashlib.sha1(str(self)).hexdigest()
         
-        if not quiet:    
-            print result
+    # The TM's own execution, on its tapes, for stepping it directly.  These delegate to
+    # it, see Execution.
+    
+    state = property(lambda self: self.execution.state, 
+                     lambda self, state: setattr(self.execution, 'state', state))
+    step_count = property(lambda self: self.execution.step_count, 
+                          lambda self, n: setattr(self.execution, 'step_count', n))
+    input_symbols = property(lambda self: self.execution.input_symbols, 
+                             lambda self, s: setattr(self.execution, 'input_symbols', s))
+    
+    def reset(self, input_string):
+        """Put machine in its start configuration, see Execution.reset()."""
+        self.execution.reset(input_string)
         
-        return result
+    def is_halted(self):
+        """Returns True if machine is in the accept or reject state."""
+        return self.execution.is_halted()
+    
+    def step(self):
+        """Take one transition, see Execution.step()."""
+        return self.execution.step()
+    
+    def steps(self, input_string=None):
+        """Generator of a StepRecord for each step taken, see Execution.steps()."""
+        return self.execution.steps(input_string)
+    
+    def advance(self, n):
+        """Take up to n steps, see Execution.advance()."""
+        return self.execution.advance(n)
+    
+    def print_steps(self, records):
+        """Print the machine before each step, see Execution.print_steps()."""
+        return self.execution.print_steps(records)
+    
+    def get_num_cells(self):
+        """Returns number of tape cells used, over all tapes."""
+        return self.execution.get_num_cells()
+    
+    def get_str_state(self):
+        """Return terse version of machine state, see Execution.get_str_state()."""
+        return self.execution.get_str_state()
+    
+    def save_checkpoint(self, path):
+        """Save the current configuration, see Execution.save_checkpoint()."""
+        self.execution.save_checkpoint(path)
+        
+    def load_checkpoint(self, path):
+        """Restore a configuration, see Execution.load_checkpoint()."""
+        self.execution.load_checkpoint(path)
+    
+    def enable_stats(self):
+        """Start counting the steps every execution of this machine takes, by delta 
+        function and state, into a new TmStats, see the stats module.  Set stats to None
+        to stop.  Load the delta functions first.
+        @return: the TmStats, also kept as the stats attribute
+        """
+        from stats import TmStats
+        self.stats = TmStats(self)
+        return self.stats
     
+    def compile(self):
+        """Returns an integer encoded version of this TM with a much faster run(),
+        see CompiledTM in the compiled module.  Compile again if the delta functions
+        change.
+        """
+        from compiled import CompiledTM
+        return CompiledTM(self)
+
     def handle_transition(self, input_symbols):
         """Given current state and list of input symbols for current input symbol
         on each tape, selects appropriate delta function (or generates reject)
@@ -587,68 +1640,103 @@ class TM:
         
         
     def get_delta_func(self, symbols):
-        """Get the transition function for the current state and input symbols.
+        """Get the transition function for the current state and input symbols, see
+        get_transition().
+        @param symbols: list of input symbols, ie symbol under each head for each tape in tape order
+        """
+        return self.get_transition(self.state, symbols)
+    
+    def get_transition(self, state, symbols):
+        """Get the transition function for state and input symbols.
         Input symbols are the symbols under the head of each tape in order.  So on
         single tape machine, list of length 1, ie just symbol_0.
         Automatically generate a rejecting transition of the form:
         (q_current, symbol_0, symbol_1, ..)  -> (q_reject, symbol_0, symbol_1, .., Tape.RIGHT, Tape.RIGHT, ..)
-        If no transition for (q_current, symbol_0) exists, where q_current is 
-        the current state.
+        If no transition for (q_current, symbol_0) exists.
+        Lookup is done in delta_index, and generated rejecting transitions are cached 
+        in reject_deltas, so this is constant time in the number of delta functions.
+        @param state: state the machine is in
         @param symbols: list of input symbols, ie symbol under each head for each tape in tape order
         """
-        delta = None
-        for d in self.delta_functions:
-            if self.state == d.start_state and symbols == d.inputs:
-                delta = d
+        key = (state, tuple(symbols))
+        delta = self.delta_index.get(key)
         if delta is None:
-#            print "TM.get_delta_func(): no delta for input symbol: %s" % symbol
-#            print "current state: %s" % self.state
-#            sys.exit(1)
-            directions = []
-            for _ in range(self.num_tapes): directions.append(Tape.RIGHT)
-            delta = DeltaFunc(self, self.state, symbols, self.reject_state, symbols, directions)
+            delta = self.reject_deltas.get(key)
+            if delta is None:
+                directions = [Tape.RIGHT] * self.num_tapes
+                delta = DeltaFunc(self, state, list(symbols), self.reject_state, 
+                                  list(symbols), directions)
+                # setdefault, so concurrent executions get the same DeltaFunc
+                delta = self.reject_deltas.setdefault(key, delta)
         
         return delta
         
-    def get_str_state(self):
-        """Return terse version of machine state as list of strings, one per line.
-        The first has current state and tape[0] contents, then tape contents of
-        remaining tapes on further lines with all tapes vertically aligned.
+    def get_byte_symbols(self):
+        """Returns list of the Symbol for each byte value of input given as a buffer, 
+        see Execution.reset(): the input tape alphabet's Symbol written as that character
+        if there is one, else a new Symbol of that character, as for string input.
         """
-        retlist = []
-        for j in range(len(self.tapes)):
-            tape_contents = self.tapes[j].get_string_contents(self.head_pos_indicator)
-            if len(tape_contents[0]) > 72:
-                raise TmException("print_state(): implement printing long tape")
-            
-            retstr = ''
-            spaces = ' ' * len(self.state)
-            for i in range(len(tape_contents)):
-                if j==0 and i == self.tapes[j].get_base_line_index():
-                    s = self.state
-                else:
-                    s = spaces
-                retstr += "%-6s %s\n" % (s, tape_contents[i])
-            retlist.append( retstr.rstrip() )
-        return retlist
+        symbols = [Symbol(chr(b)) for b in range(256)]
+        for symbol in self.tapes[0].alphabet:
+            if len(str(symbol)) == 1:
+                symbols[ord(str(symbol))] = symbol
+        return symbols
+    
+    def get_transitions(self, state, symbols):
+        """Returns list of all the transition functions for state and input symbols, in
+        the order they were given, for nondeterministic machines.  If there are none, 
+        this is the rejecting transition of get_transition().
+        """
+        deltas = self.delta_choices.get((state, tuple(symbols)))
+        if deltas is None:
+            return [self.get_transition(state, symbols)]
+        return deltas
+    
+    def is_deterministic(self):
+        """Returns True if no state and input symbols have more than one transition."""
+        return len(self.delta_choices) == len(self.delta_functions)
+        
+    def run_ntm(self, input_string, quiet=True, max_steps=None, max_frontier=1000000, 
+                workers=1):
+        """Run as a nondeterministic machine, using every transition for a state and 
+        input symbols rather than just the last, see NtmSearch in the ntm module.
+        @return: RunResult, "accept", "reject" or "limit", with search statistics for each
+            step as its depths attribute
+        """
+        from ntm import NtmSearch
+        return NtmSearch(self, max_steps, max_frontier, workers).run(input_string, quiet)
 
+    def enumerate_language(self, max_len, input_symbols=None, max_steps=None, 
+                           tape_class=None, keep_tapes=False):
+        """Run on every input up to max_len symbols long, taking the steps on a prefix 
+        the inputs share only once, see the language module.
+        @param input_symbols: string or list of Symbols, default is the input alphabet
+        @param max_steps: stop the run on each input after max_steps steps
+        @param keep_tapes: keep the final tapes, as for run(), where they are known
+        @return: generator of (input, RunResult), depth first over the inputs
+        """
+        from language import enumerate_language
+        return enumerate_language(self, max_len, input_symbols, max_steps, tape_class, 
+                                  keep_tapes)
+    
     def init(self, init_source):
         """Input a TM from a file or string.
         Input format:
         # is a comment
         # blank lines ignored
-        # name = value section, right side will be eval()ed and
-        #    assigned to tm.left_side, for any = found
+        # name = value section, the right side is a python literal: a string, integer,
+        #    Symbol(..) or list or tuple of them, see _parse_value()
         description = "tm description"
         blank_symbol = Symbol('B')
         num_tapes = 1
         
-        # the alphabets are handled specially, and must be in this format
+        # the alphabets are handled specially
         # note that the tape_alphabets uses an underscore rather than a dot
         # alphabets are parsed as lists of tuples of parameters to the appropriate
         # symbol constructor
         # the tape_alphabets is a list of alphabets for each tape in tape order
         # all tape alphabets must contain the blank symbol
+        # a value can run over several lines, until its brackets are closed
         alphabet      = [('0'), ('1')]
         tape_alphabets    = [
         [('B'), ('B', '.'), ('0'), ('0', '.'), ('1'), ('1', '.')]
@@ -662,75 +1750,111 @@ class TM:
         q0 1    q_accept 1 r
         q0 B    qaccept B r
         ...
+        
+        The names that can be set are those in TM.SETTINGS.  The source is read in one
+        pass, and nothing in it is executed.
+        @param init_source: file name, or string
+        @raise TmParseError: with the line number, for anything that doesn't parse
         """
-        # parsing state: 
-        # 0 = reading names and values
-        # 1 = reading delta functions
-        state = 0
-        delta_funcs = []
         if os.path.isfile(init_source):
-            lines = open(init_source).readlines()
+            source = open(init_source).read()
         elif isinstance(init_source, basestring):
-            lines = init_source.splitlines()
-        # state to clumsily handle reading multiline input
-        reading_tape_alphabets = False
-        tape_alpha_string = ''
-        for line in lines:
+            source = init_source
+        cache = self.get_cache_path(source)
+        if cache is not None and self._load_cache(cache):
+            return
+        numbered = enumerate(source.splitlines(), 1)
+        # names set, and the tape_alphabets, which are set up after all the others
+        names = set()
+        tape_alphabets = None
+        # (name, value) of each setting in order, for the cache
+        settings = []
+        # name, line number and tokens of a value still being read
+        name = lineno = None
+        tokens = []
+        depth = 0
+        for number, line in numbered:
             line = line.strip()
             if not line or line.startswith('#'): continue
-            
-            if state == 0:
+            if name is None:
                 if line.startswith('q') or line.startswith('Q'):
-                    state = 1
-                elif reading_tape_alphabets:
-                    tape_alpha_string += line.strip()
-                    if tape_alpha_string.endswith((']]', '],]')):
-                        reading_tape_alphabets = False
-#                        print "done: tape_alpha_string: "
-#                        print tape_alpha_string
-                        try:
-                            tape_alpha_string = tape_alpha_string.split('=')[1]
-                            tape_alphabets = eval(tape_alpha_string)
-                            for i in range(len(tape_alphabets)):
-                                alpha = [Symbol(*s) for s in tape_alphabets[i]]
-                                try:
-                                    self.tapes[i].init_alphabet(alpha)
-                                except IndexError:
-                                    t = Tape(blank=self.blank_symbol)
-                                    t.init_alphabet(alpha)
-                                    self.tapes.append(t)
-                        except Exception as e:                            
-                            print "error parsing tape_alphabets"
-                            print e
-                            print "string val:"
-                            print tape_alpha_string
-#                        exec """tapes = %s;self.tape_alphabets = [Symbol(*s) for s in %s]""" % (
-#                                                            tape_alpha_string)
-                    
-                elif '=' in line:
-                    try:
-                        # create alphabets by calling Symbol() constructor on tuples of params
-                        if line.find('alphabet') != -1:
-                            if line.find('tape_alphabet') != -1:
-                                reading_tape_alphabets = True
-                                tape_alpha_string += line
-                            else:
-                                exec """%s""" % line
-                                s1 = "alphabet"
-                                exec_stmt = """self.%s = [Symbol(*s) for s in %s]""" % (s1, s1)
-                                exec exec_stmt
-                        else:
-                            exec_stmt = """self.%s""" % line
-                            exec exec_stmt
-                    except:
-                        print "error: exec_stmt: %s" % exec_stmt
-                        
-                    
-            if state == 1:
-                delta_funcs.append(line + '\n')
-            
-        self.load_delta_functions("\n".join(delta_funcs))
+                    numbered = itertools.chain([(number, line)], numbered)
+                    break
+                name, equals, value = line.partition('=')
+                name = name.strip()
+                if not equals or not name in TM.SETTINGS:
+                    raise TmParseError("not a setting or delta function: %s" % line, number)
+                names.add(name)
+                lineno = number
+                line = value
+            for token in _tokenize_value(line, number):
+                tokens.append(token)
+                if token[1] in ('[', '('):
+                    depth += 1
+                elif token[1] in (']', ')'):
+                    depth -= 1
+            if tokens and depth <= 0:
+                value = _parse_value(tokens, lineno)
+                settings.append((name, value))
+                if name == 'tape_alphabets':
+                    tape_alphabets = (value, lineno)
+                else:
+                    self._set_setting(name, value, lineno)
+                name = None
+                tokens = []
+                depth = 0
+        if name is not None:
+            raise TmParseError("value of %s not finished" % name, lineno)
+        self._init_tapes(tape_alphabets, 'num_tapes' in names)
+        self._load_deltas(numbered)
+        if cache is not None:
+            self._save_cache(cache, settings)
         
+    # settings of init() files, name -> type of value
+    SETTINGS = {'description': str, 'start_state': str, 'accept_state': str, 
+                'reject_state': str, 'num_tapes': int, 'blank_symbol': Symbol, 
+                'alphabet': list, 'tape_alphabets': list, 'head_pos_indicator': str, 
+                'view_cells': int}
+    
+    def _set_setting(self, name, value, lineno):
+        """Set attribute name from an init() file to value.
+        @raise TmParseError: if value is the wrong type for name
+        """
+        kind = TM.SETTINGS[name]
+        if kind is Symbol:
+            value = _make_symbol(value, lineno)
+        elif kind is list:
+            value = _make_alphabet(value, lineno)
+        elif not isinstance(value, kind):
+            raise TmParseError("%s should be a %s: %r" % (name, kind.__name__, value), lineno)
+        setattr(self, name, value)
+        
+    def _init_tapes(self, tape_alphabets, num_tapes_set):
+        """Set up the tapes after the settings of an init() file, one per tape alphabet if 
+        they are given, else num_tapes.  The tapes list is changed in place, as the 
+        machine's execution uses it.
+        @param tape_alphabets: None, or (value of tape_alphabets, its line number)
+        @param num_tapes_set: True if the file set num_tapes
+        @raise TmParseError: if tape_alphabets doesn't match num_tapes
+        """
+        if tape_alphabets is not None:
+            value, lineno = tape_alphabets
+            if not isinstance(value, list):
+                raise TmParseError("tape_alphabets should be a list of alphabets", lineno)
+            alphabets = [_make_alphabet(alphabet, lineno) for alphabet in value]
+            if num_tapes_set and self.num_tapes != len(alphabets):
+                raise TmParseError("%d tape alphabets for %d tapes" 
+                                   % (len(alphabets), self.num_tapes), lineno)
+            self.num_tapes = len(alphabets)
+            for i, alphabet in enumerate(alphabets):
+                if i == len(self.tapes):
+                    self.tapes.append(Tape(blank=self.blank_symbol))
+                self.tapes[i].init_alphabet(alphabet)
+        while len(self.tapes) < self.num_tapes:
+            self.tapes.append(Tape(blank=self.blank_symbol))
+        del self.tapes[self.num_tapes:]
+        for tape in self.tapes:
+            tape.blank = self.blank_symbol
         
     def load_delta_functions(self, delta_functions):
         """Load the machine's delta, or transition, functions. 
@@ -747,26 +1871,257 @@ class TM:
         The delta functions are maintained in the TM as a list of DeltaFunc objects
                 
         @param delta_functions: multiline string
+        @raise TmParseError: with the line number in delta_functions, for a line that 
+            doesn't parse
+        """
+        self._load_deltas(enumerate(delta_functions.splitlines(), 1))
+        
+    def _load_deltas(self, numbered_lines):
+        """Load delta functions, see load_delta_functions(), from iterator of (line 
+        number, line).  Symbols, states and directions are looked up in tables made once,
+        so this is linear in the length of the lines.
         """
+        _without_gc(self._parse_deltas, numbered_lines)
+        
+    def _parse_deltas(self, numbered_lines):
+        """Set delta_functions from iterator of (line number, line), and index them, see 
+        _load_deltas().
+        """
+        num_tapes = self.num_tapes
+        # symbol string -> Symbol, for each tape, from its alphabet, and then any
+        # other symbols parsed, see Tape.parse_symbol()
+        symbol_tables = [dict([(str(s), s) for s in t.alphabet]) for t in self.tapes]
+        directions = {'r': Tape.RIGHT, 'l': Tape.LEFT, 's': Tape.STAY}
+        # goto state string -> state
+        states = {}
         self.delta_functions = []
-        lines = delta_functions.splitlines()
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'): continue
-#            print "line: %s" % line
-            d = DeltaFunc(self)
-            d.init_from_string(line)
-#            print d
-            self.delta_functions.append(d)
+        for lineno, line in numbered_lines:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'): continue
+            # as before, fields past the directions, eg a trailing comment, are ignored
+            if len(parts) < 2 + 3 * num_tapes:
+                raise TmParseError("delta function should have %d fields for %d tapes: %s" 
+                                   % (2 + 3 * num_tapes, num_tapes, line.strip()), lineno)
+            inputs = parts[1:1 + num_tapes]
+            outputs = parts[2 + num_tapes:2 + 2 * num_tapes]
+            for i in range(num_tapes):
+                inputs[i] = self._lookup_symbol(symbol_tables[i], i, inputs[i], lineno)
+                outputs[i] = self._lookup_symbol(symbol_tables[i], i, outputs[i], lineno)
+            goto = parts[1 + num_tapes]
+            goto_state = states.get(goto)
+            if goto_state is None:
+                if not goto.startswith('q'):
+                    raise TmParseError("state should start with q: %s" % goto, lineno)
+                goto_state = goto
+                if goto.find("accept") != -1:
+                    goto_state = self.accept_state
+                elif goto.find("reject") != -1:
+                    goto_state = self.reject_state
+                states[goto] = goto_state
+            moves = []
+            for direction in parts[2 + 2 * num_tapes:2 + 3 * num_tapes]:
+                move = directions.get(direction[0].lower())
+                if move is None:
+                    raise TmParseError("bad direction: %s" % direction, lineno)
+                moves.append(move)
+            self.delta_functions.append(DeltaFunc(self, parts[0], inputs, goto_state, 
+                                                  outputs, moves))
+        self.build_delta_index()
+        
+    def _lookup_symbol(self, table, tape, text, lineno):
+        """Returns Symbol for text on tape number tape, from table, parsing it and adding
+        it to table if it isn't there.
+        @raise TmParseError: if text isn't a symbol
+        """
+        symbol = table.get(text)
+        if symbol is None:
+            try:
+                symbol = table[text] = self.tapes[tape].parse_symbol(text)
+            except TmException, e:
+                raise TmParseError(str(e), lineno)
+        return symbol
+            
+    def get_cache_path(self, source):
+        """Returns the file in CACHE_DIR that init() keeps source loaded into this machine
+        in, or None if it isn't cached: CACHE_DIR is None, or source is shorter than 
+        CACHE_MIN_BYTES.  The file is named by a hash of the source and the settings it
+        doesn't set, so an edited source is loaded again.
+        """
+        if not TM.CACHE_DIR or len(source) < TM.CACHE_MIN_BYTES:
+            return None
+        defaults = (TM.CACHE_VERSION, self.num_tapes, self.accept_state, self.reject_state,
+                    str(self.blank_symbol), [[str(s) for s in t.alphabet] for t in self.tapes])
+        key = hashlib.sha1(repr(defaults) + '\n' + source).hexdigest()
+        return os.path.join(TM.CACHE_DIR, key + '.tmc')
+    
+    def _save_cache(self, path, settings):
+        """Save the loaded machine to cache file path, see init().  Delta functions are
+        stored as arrays of state and symbol codes.  Any error writing is ignored, the 
+        cache only saves time.
+        @param settings: list of (name, value) of each setting the source made
+        """
+        states = []
+        state_codes = {}
+        symbols = []
+        symbol_codes = {}
+        starts, gotos = array.array('I'), array.array('I')
+        inputs, outputs = array.array('H'), array.array('H')
+        directions = array.array('b')
+        for d in self.delta_functions:
+            for state, codes in ((d.start_state, starts), (d.goto_state, gotos)):
+                if not state in state_codes:
+                    state_codes[state] = len(states)
+                    states.append(state)
+                codes.append(state_codes[state])
+            for symbols_in, codes in ((d.inputs, inputs), (d.outputs, outputs)):
+                for symbol in symbols_in:
+                    if not symbol in symbol_codes:
+                        symbol_codes[symbol] = len(symbols)
+                        symbols.append(symbol)
+                    codes.append(symbol_codes[symbol])
+            directions.extend(d.directions)
+        data = (TM.CACHE_VERSION, [(name, _encode_setting(value)) for name, value in settings],
+                states, [(s.base, s.super, s.sub) for s in symbols], len(self.delta_functions),
+                starts.tostring(), gotos.tostring(), inputs.tostring(), outputs.tostring(), 
+                directions.tostring())
+        try:
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # unique temporary file, as other processes may be saving the same machine
+            fd, tmp = tempfile.mkstemp('.tmp', '', directory)
+            f = os.fdopen(fd, 'wb')
+            try:
+                marshal.dump(data, f)
+            finally:
+                f.close()
+            if os.name == 'nt' and os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp, path)
+        except (IOError, OSError):
+            pass
+    
+    def _load_cache(self, path):
+        """Load the machine from a cache file saved by init(), with one read.
+        @return: False if there is no such file, or it can't be read or is damaged, and 
+            nothing was changed
+        """
+        try:
+            f = open(path, 'rb')
+            try:
+                data = marshal.loads(f.read())
+            finally:
+                f.close()
+        except (IOError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(data, tuple) or len(data) != 10 or data[0] != TM.CACHE_VERSION:
+            return False
+        # a file that unmarshals but is damaged can fail part way, so what it changes is
+        # put back, the tapes list in place, as for _init_tapes()
+        saved = dict(self.__dict__)
+        tapes = [(tape, tape.alphabet, tape.blank) for tape in self.tapes]
+        try:
+            settings = data[1]
+            tape_alphabets = None
+            for name, value in settings:
+                if name == 'tape_alphabets':
+                    tape_alphabets = (value, None)
+                else:
+                    self._set_setting(name, value, None)
+            self._init_tapes(tape_alphabets, 'num_tapes' in [name for name, _ in settings])
+            _without_gc(self._restore_deltas, *data[2:])
+        except (IndexError, KeyError, TypeError, ValueError, TmException):
+            self.__dict__.clear()
+            self.__dict__.update(saved)
+            self.tapes[:] = [tape for tape, _, _ in tapes]
+            for tape, alphabet, blank in tapes:
+                tape.alphabet = alphabet
+                tape.blank = blank
+            return False
+        return True
+        
+    def _restore_deltas(self, states, symbols, count, starts, gotos, inputs, outputs, 
+                        directions):
+        """Set delta_functions from their codes in a cache file, and index them.
+        @raise TmException: if the codes don't fit the tapes, eg the file is damaged
+        """
+        symbols = [Symbol(*s) for s in symbols]
+        arrays = []
+        for typecode, codes in (('I', starts), ('I', gotos), ('H', inputs), ('H', outputs), 
+                                ('b', directions)):
+            a = array.array(typecode)
+            a.fromstring(codes)
+            arrays.append(a.tolist())
+        starts, gotos, inputs, outputs, directions = arrays
+        k = self.num_tapes
+        if (len(starts) != count or len(gotos) != count or len(directions) != count * k
+            or len(inputs) != count * k or len(outputs) != count * k 
+            or not set(directions) <= set([Tape.LEFT, Tape.RIGHT, Tape.STAY])):
+            raise TmException("cache: delta function codes don't fit %d tapes" % k)
+        self.delta_functions = [DeltaFunc(self, states[starts[i]], 
+                                          [symbols[c] for c in inputs[i * k:i * k + k]], 
+                                          states[gotos[i]], 
+                                          [symbols[c] for c in outputs[i * k:i * k + k]], 
+                                          directions[i * k:i * k + k]) 
+                                for i in xrange(count)]
+        self.build_delta_index()
+        
+    def build_delta_index(self):
+        """Build the dictionary used by get_delta_func() from the delta_functions list, 
+        keyed by (start_state, tuple of input Symbols).  If more than one delta function 
+        has the same key, the last one in the list is used.  All of them are kept, in 
+        order, in delta_choices, for nondeterministic runs, see get_transitions().
+        The delta functions of each state are grouped in state_deltas.
+        Call this again if delta_functions is modified directly.
+        """
+        self.delta_index = {}
+        self.delta_choices = {}
+        self.reject_deltas = {}
+        self.delta_ids = dict([(d, i) for i, d in enumerate(self.delta_functions)])
+        self.state_deltas = {}
+        self.delta_states = []
+        for d in self.delta_functions:
+            key = (d.start_state, tuple(d.inputs))
+            self.delta_index[key] = d
+            self.delta_choices.setdefault(key, []).append(d)
+            group = self.state_deltas.get(d.start_state)
+            if group is None:
+                group = self.state_deltas[d.start_state] = []
+                self.delta_states.append(d.start_state)
+            group.append(d)
             
     def get_states(self):
         """Returns list of states in machine.
         """
         ret = [ self.start_state, self.accept_state, self.reject_state ]
-        for d in self.delta_functions:
-            if not d.start_state in ret:
-                ret.append(d.start_state)
+        ret.extend([s for s in self.delta_states if not s in ret[:3]])
         return ret
+    
+    def get_state_deltas(self, state):
+        """Returns list of the delta functions from state, in order."""
+        return self.state_deltas.get(state, [])
+    
+    def prune(self, input_symbols=None):
+        """Remove the delta functions that can never be taken, and so the states that 
+        can never be reached, see find_live() in the analysis module.  A machine that 
+        has other delta functions for the same state and input symbols, see 
+        get_transitions(), keeps all of them if they can be taken.
+        @param input_symbols: symbols input can have, default is the input alphabet
+        @return: PruneReport of what was removed
+        """
+        from analysis import prune
+        return prune(self, input_symbols)
+    
+    def minimize(self):
+        """Merge states that behave the same, see equivalent_states() in the analysis 
+        module.  The delta functions of a merged state are removed, and ones going to it
+        go to the state it was merged into, so the machine takes the same steps as 
+        before on every input.
+        @return: dict of each state merged away -> the state it was merged into
+        @raise TmException: if the machine is not deterministic
+        """
+        from analysis import minimize
+        return minimize(self)
             
     def __str__(self):
         """String representation of this TM, for all you math heads ..
@@ -791,8 +2146,7 @@ Delta Functions:
 """ % (self.description, str(alphabet), str(tape_alphabets), 
        self.get_states(), self.start_state, self.accept_state, 
        self.reject_state)
-        for d in self.delta_functions:
-            strval += "%s\n" % str(d)
+        strval += ''.join(["%s\n" % str(d) for d in self.delta_functions])
         
         return strval
 
@@ -810,6 +2164,88 @@ Delta Functions:
             print
             
 
+# machine and run options of a TM.run_many() worker process
+_worker_tm = None
+_worker_options = None
+
+def _init_worker(tm, options):
+    """Pool initializer for TM.run_many(), keeps the machine for all chunks."""
+    global _worker_tm, _worker_options
+    _worker_tm, _worker_options = tm, options
+    if tm.stats is not None:
+        # only this worker's counts go back to the caller
+        tm.enable_stats()
+
+def _run_chunk(inputs):
+    """Run the worker's machine on list of inputs, see TM.run_many().
+    @return: (list of RunResults, seconds taken, TmStats counted for them or None if the
+        machine isn't counting)
+    """
+    start = time.time()
+    results = [_worker_tm._run_isolated(input_string, _worker_options) 
+               for input_string in inputs]
+    stats = _worker_tm.stats
+    if stats is not None:
+        # counted from zero for each chunk, as they are merged into the caller's
+        _worker_tm.enable_stats()
+    return results, time.time() - start, stats
+
+
+def run_stream(tm, infile, outfile, workers=1, max_steps=None, max_tape_cells=None, 
+               deadline=None):
+    """Run tm on each line of infile, writing a record to outfile for each, in order, as 
+    it finishes: line number, starting at 1, verdict, steps and tape cells used, tab 
+    separated.  Lines are read as they are needed, so memory use doesn't grow with the 
+    input.  The message of an "error" result is written to stderr.
+    @param infile: file with one input string per line
+    @param workers: number of processes to run in, see TM.run_many()
+    @param max_steps, max_tape_cells, deadline: limits for each input, see TM.run()
+    @return: number of inputs run
+    """
+    # readline rather than file iteration, which reads ahead and would hold up
+    # results for lines already read from a pipe
+    lines = iter(infile.readline, '')
+    inputs = itertools.imap(lambda line: line.rstrip('\r\n'), lines)
+    count = 0
+    for count, result in enumerate(tm.run_many(inputs, workers, max_steps=max_steps, 
+                                               max_tape_cells=max_tape_cells, 
+                                               deadline=deadline), 1):
+        outfile.write('%d\t%s\t%d\t%d\n' % (count, result, result.steps, result.tape_cells))
+        outfile.flush()
+        if result == 'error':
+            print >> sys.stderr, '%d: %s' % (count, result.error)
+    return count
+
+
+def write_stats(stats, path):
+    """Write TmStats stats to file path, as CSV if path ends in .csv, else as JSON."""
+    f = open(path, 'wb')
+    try:
+        if path.endswith('.csv'):
+            stats.write_csv(f)
+        else:
+            f.write(stats.to_json())
+    finally:
+        f.close()
+
+
+def write_prune_report(report, outfile):
+    """Write PruneReport report, from TM.prune(), to file outfile."""
+    outfile.write('pruned %d transitions, %d states\n' % (len(report.transitions), 
+                                                         len(report.states)))
+    for delta in report.transitions:
+        outfile.write('    %s\n' % delta)
+    if report.states:
+        outfile.write('unreachable states: %s\n' % ' '.join(report.states))
+
+
+def write_merged_states(merged, outfile):
+    """Write dict of merged states, from TM.minimize(), to file outfile."""
+    outfile.write('merged %d states\n' % len(merged))
+    for state in sorted(merged):
+        outfile.write('    %s -> %s\n' % (state, merged[state]))
+
+
 def main(argv=None):
     if argv is None:
         argv = sys.argv
@@ -824,6 +2260,40 @@ def main(argv=None):
                   'provided as the only arg on the commandline.  Runs the Turing Machine on the given ' +
                   'string and outputs "accept" or "reject".',)
 
+    op.add_option('-s', '--stream', action="store_true", dest='stream',
+                  help='Assumes that an input file is given with a Turing Machine.  Runs the ' +
+                  'Turing Machine on each line of stdin, or of the file given as the only arg, ' +
+                  'and outputs "line number, verdict, steps, tape cells" for each, tab delimited.',)
+    op.add_option('-l', '--language', type='int', dest='language',
+                  help='Assumes that an input file is given with a Turing Machine.  Runs the ' +
+                  'Turing Machine on every string over its input alphabet up to LANGUAGE ' +
+                  'symbols long, and outputs "string, verdict, steps, tape cells" for each, ' +
+                  'tab delimited.',)
+    op.add_option('-j', '--jobs', type='int', dest='jobs', default=1,
+                  help='with -s, run inputs in JOBS processes, 0 for one per cpu',)
+
+    op.add_option('--max-steps', type='int', dest='max_steps',
+                  help='with -r, -s or -l, output "limit" if the machine has not halted ' +
+                  'after MAX_STEPS steps',)
+    op.add_option('--max-tape-cells', type='int', dest='max_tape_cells',
+                  help='with -r or -s, output "limit" if the machine uses more than ' +
+                  'MAX_TAPE_CELLS tape cells, over all tapes',)
+    op.add_option('--deadline', type='float', dest='deadline',
+                  help='with -r or -s, output "limit" if the machine has not halted after ' +
+                  'DEADLINE seconds',)
+    op.add_option('--no-cache', action="store_true", dest='no_cache',
+                  help='always parse the TM file, rather than using or saving a parsed copy ' +
+                  'in the cache directory, $TM_CACHE_DIR or ~/.cache/turing_machine',)
+    op.add_option('--prune', action="store_true", dest='prune',
+                  help='with -r, -s or -l, first remove the transitions that can never be ' +
+                  'taken, and list them on stderr',)
+    op.add_option('--minimize', action="store_true", dest='minimize',
+                  help='with -r, -s or -l, first merge states that behave the same, and ' +
+                  'list them on stderr',)
+    op.add_option('--stats', dest='stats',
+                  help='with -r or -s, count how often each transition and state is used ' +
+                  'and write the counts to file STATS, as CSV if it ends in .csv, else JSON',)
+
     (opts, args) = op.parse_args(args=argv)
 
 #    print "opts: %s" % str(opts)
@@ -838,17 +2308,64 @@ def main(argv=None):
             return 0
         if opts.infile:
             infile = open(opts.infile).read()
+        if opts.no_cache:
+            TM.CACHE_DIR = None
         
     if opts.run_string:
         try:
             input = args[1]
             tm = TM(init_source=infile)
-            print tm.run(input, True)
+            if opts.prune:
+                write_prune_report(tm.prune(), sys.stderr)
+            if opts.minimize:
+                write_merged_states(tm.minimize(), sys.stderr)
+            if opts.stats:
+                tm.enable_stats()
+            result = tm.run(input, True, max_steps=opts.max_steps, 
+                            max_tape_cells=opts.max_tape_cells, deadline=opts.deadline)
+            print result
+            if result == 'limit':
+                print "%s exceeded after %d steps" % (result.limit, result.steps)
+            if opts.stats:
+                write_stats(tm.stats, opts.stats)
             return 0
         
         except Exception:
             return 1
     
+    if opts.stream:
+        tm = TM(init_source=infile)
+        if opts.prune:
+            write_prune_report(tm.prune(), sys.stderr)
+        if opts.minimize:
+            write_merged_states(tm.minimize(), sys.stderr)
+        if opts.stats:
+            tm.enable_stats()
+        if len(args) > 1 and args[1] != '-':
+            lines = open(args[1])
+        else:
+            lines = sys.stdin
+        try:
+            run_stream(tm, lines, sys.stdout, opts.jobs or None, max_steps=opts.max_steps,
+                       max_tape_cells=opts.max_tape_cells, deadline=opts.deadline)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+        if opts.stats:
+            write_stats(tm.stats, opts.stats)
+        return 0
+    
+    if opts.language is not None:
+        tm = TM(init_source=infile)
+        if opts.prune:
+            write_prune_report(tm.prune(), sys.stderr)
+        if opts.minimize:
+            write_merged_states(tm.minimize(), sys.stderr)
+        for input, result in tm.enumerate_language(opts.language, max_steps=opts.max_steps):
+            print '%s\t%s\t%d\t%d' % (''.join([str(s) for s in input]), result, 
+                                       result.steps, result.tape_cells)
+        return 0
+    
     # most trivial tm
     m1_delta = """
     description = "{ w | w starts with a 0 }"
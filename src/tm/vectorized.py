@@ -0,0 +1,166 @@
+##
+# Dave Rogers
+# dave at drogers dot us
+# This software is for instructive purposes.  Use at your own risk - not meant to be robust at all.
+# Feel free to use anything, credit is appreciated if warranted.
+##
+
+'''
+Lockstep simulation of one TM on many inputs at once with NumPy.
+
+The N configurations are kept as arrays: a state vector, a tape matrix per tape
+(N rows of cells), a head position vector per tape, and the halting step of each.
+Each step is one gather from the transition tables of a CompiledTM for all of the
+configurations still running, one scatter of the symbols written and one add of the
+head moves, so the time per step is a few NumPy calls however large N is.
+Configurations that halt are dropped from the running set.
+
+The tape matrices are as wide as the widest tape of any configuration, so this suits
+batches of inputs that use similar amounts of tape, eg all strings of a given length.
+
+Usage:
+    vtm = VectorizedTM(tm.compile())
+    results = vtm.run(['000111', '001011', '010101'])   # -> RunResults
+'''
+
+import numpy
+
+from turing_machine import RunResult
+
+class VectorizedTM(object):
+    """Runs a CompiledTM on many inputs in lockstep."""
+    # blank cells added to each end of the tape matrices to start with, and the number 
+    # of steps between checks for a head near the end of them
+    MIN_HEADROOM = 16
+
+    def __init__(self, ctm):
+        """@param ctm: CompiledTM, see TM.compile()
+        """
+        self.ctm = ctm
+        self.num_tapes = ctm.num_tapes
+        self.num_symbols = ctm.num_symbols
+        self.code_type = numpy.uint8 if ctm.num_symbols <= 256 else numpy.uint16
+        # as the compiled tables, except the accept and reject states stay where they 
+        # are, so halted configurations can keep stepping until they are dropped
+        self.next_state = numpy.array(ctm.next_state, dtype=numpy.int64)
+        self.writes = [numpy.array(w, dtype=self.code_type) for w in ctm.writes]
+        self.moves = [numpy.array(m, dtype=numpy.int64) for m in ctm.moves]
+        halting = slice(0, 2 * ctm.stride)
+        self.next_state[halting] = numpy.arange(2 * ctm.stride) // ctm.stride
+        for moves in self.moves:
+            moves[halting] = 0
+
+    def run(self, inputs, max_steps=None):
+        """Run on each of inputs, with the same results as TM.run() in quiet mode.
+        @param inputs: list of strings or lists of Symbols
+        @param max_steps: stop configurations that haven't halted after this many steps
+            with "limit"
+        @return: list of RunResults, "accept", "reject" or "limit", in order of inputs
+        @raise TmException: if an input symbol is not in any tape alphabet
+        """
+        ctm = self.ctm
+        num_tapes = self.num_tapes
+        headroom = VectorizedTM.MIN_HEADROOM
+        codes = [ctm.encode_input(s) for s in inputs]
+        lengths = numpy.array([len(c) for c in codes], dtype=numpy.int64)
+        results = [None] * len(codes)
+
+        # configurations still in the arrays: their index in inputs, state, and for each
+        # tape a row of cells, head column and lowest and highest columns visited
+        rows = numpy.arange(len(codes))
+        states = numpy.empty(len(codes), dtype=numpy.int64)
+        states.fill(ctm.start)
+        width = 2 * headroom + max([1] + [len(c) for c in codes])
+        tapes = [numpy.empty((len(codes), width), dtype=self.code_type) 
+                 for _ in range(num_tapes)]
+        for tape in tapes:
+            tape.fill(ctm.blank)
+        for i, c in enumerate(codes):
+            tapes[0][i, headroom:headroom + len(c)] = c
+        heads = [numpy.empty(len(codes), dtype=numpy.int64) for _ in range(num_tapes)]
+        for head in heads:
+            head.fill(headroom)
+        # the first write includes the head's starting cell, even for empty input
+        lows = [head.copy() for head in heads]
+        highs = [heads[0] + numpy.maximum(lengths - 1, 0)] + [head.copy() for head in heads[1:]]
+        # start of each row in the flattened tapes
+        offsets = rows * width
+        
+        step = 0
+        halted_count = 0
+        halted = states <= 1
+        # step each configuration halted at, -1 for still running
+        halt_steps = numpy.empty(len(codes), dtype=numpy.int64)
+        halt_steps.fill(-1)
+        while True:
+            # record newly halted configurations, drop them once they are half the arrays
+            count = int(halted.sum())
+            if count > halted_count:
+                halt_steps[halted & (halt_steps < 0)] = step
+                halted_count = count
+            if halted_count and (halted_count * 2 >= len(rows) or 
+                                 (max_steps is not None and step >= max_steps)):
+                done = numpy.flatnonzero(halted)
+                cells = sum([highs[t][done] + 1 - lows[t][done] for t in range(num_tapes)])
+                for i, row in enumerate(rows[done]):
+                    verdict = 'accept' if states[done[i]] == ctm.ACCEPT else 'reject'
+                    steps = int(halt_steps[done[i]])
+                    if steps == 0:
+                        results[row] = RunResult(verdict, 0, int(lengths[row]))
+                    else:
+                        results[row] = RunResult(verdict, steps, int(cells[i]))
+                keep = ~halted
+                rows = rows[keep]
+                states = states[keep]
+                halt_steps = halt_steps[keep]
+                for t in range(num_tapes):
+                    tapes[t] = tapes[t][keep]
+                    heads[t] = heads[t][keep]
+                    lows[t] = lows[t][keep]
+                    highs[t] = highs[t][keep]
+                offsets = numpy.arange(len(rows)) * width
+                halted = states <= 1
+                halted_count = 0
+            if not len(rows) or (max_steps is not None and step >= max_steps):
+                break
+            
+            # grow tape matrices if a head could get off either end before the next check
+            if step % headroom == 0:
+                left = max([0] + [headroom - int(low.min()) for low in lows])
+                right = max([0] + [int(high.max()) + 1 + headroom - width for high in highs])
+                if left > 0 or right > 0:
+                    grow_left = max(left, width) if left > 0 else 0
+                    grow_right = max(right, width) if right > 0 else 0
+                    for t in range(num_tapes):
+                        tape = numpy.empty((len(rows), width + grow_left + grow_right), 
+                                           dtype=self.code_type)
+                        tape.fill(ctm.blank)
+                        tape[:, grow_left:grow_left + width] = tapes[t]
+                        tapes[t] = tape
+                        heads[t] += grow_left
+                        lows[t] += grow_left
+                        highs[t] += grow_left
+                    width += grow_left + grow_right
+                    offsets = numpy.arange(len(rows)) * width
+
+            # the step: gather transitions, scatter writes, move heads
+            step += 1
+            cells = [offsets + head for head in heads]
+            flat_tapes = [tape.reshape(-1) for tape in tapes]
+            index = states * ctm.stride
+            per = 1
+            for t in range(num_tapes):
+                index += flat_tapes[t][cells[t]].astype(numpy.int64) * per
+                per *= self.num_symbols
+            for t in range(num_tapes):
+                flat_tapes[t][cells[t]] = self.writes[t][index]
+                heads[t] += self.moves[t][index]
+                numpy.minimum(lows[t], heads[t], lows[t])
+                numpy.maximum(highs[t], heads[t], highs[t])
+            states = self.next_state[index]
+            halted = states <= 1
+
+        for i, row in enumerate(rows):
+            cells = sum([int(highs[t][i]) + 1 - int(lows[t][i]) for t in range(num_tapes)])
+            results[row] = RunResult('limit', step, cells, limit='max_steps')
+        return results